@@ -0,0 +1,140 @@
+"""
+Deterministic stand-ins for the Gemini LLM, used by the offline benchmarks.
+
+Both fakes wait a configurable latency per call (and per streamed chunk),
+then return scripted outputs, so that a benchmark measures the code around
+the LLM and not the network.
+"""
+
+import re
+import json
+import asyncio
+from typing import Any, Sequence
+
+from llama_index.core.base.llms.generic_utils import (
+    astream_completion_response_to_chat_response,
+    completion_response_to_chat_response,
+)
+from llama_index.core.llms import (
+    ChatMessage,
+    ChatResponse,
+    CompletionResponse,
+    CustomLLM,
+    LLMMetadata,
+)
+from llama_index.core.llms.callbacks import llm_chat_callback, llm_completion_callback
+
+
+ANSWER = (
+    "Theo Điều 117 Bộ luật Dân sự, giao dịch dân sự có hiệu lực khi chủ thể có năng lực "
+    "pháp luật dân sự, năng lực hành vi dân sự phù hợp và hoàn toàn tự nguyện; mục đích và "
+    "nội dung của giao dịch không vi phạm điều cấm của luật, không trái đạo đức xã hội. "
+) * 4
+# User messages of a ReAct prompt: a question, or the observation of a tool call
+TURN = re.compile(r"^user: (Observation:)?", re.MULTILINE)
+
+
+class FakeGeminiClient:
+    """
+    Replaces llm_client.GeminiClient in src_nhien.
+
+    Keyword-extraction prompts get the scripted keywords of the question they
+    contain ({} if none); every other prompt gets a fixed answer.
+    """
+
+    def __init__(self, keywords, latency=0.0, chunk_latency=0.0, chunk_words=8):
+        self.keywords = keywords
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.chunk_words = chunk_words
+        self.calls = 0
+
+    @property
+    def settings(self):
+        return {"model": "fake", "temperature": 0}
+
+    def _respond(self, prompt):
+        self.calls += 1
+        if "civil_keywords" in prompt:
+            for question, keywords in self.keywords.items():
+                if question in prompt:
+                    return json.dumps(keywords, ensure_ascii=False)
+            return "{}"
+        return ANSWER
+
+    async def generate(self, prompt):
+        await asyncio.sleep(self.latency)
+        return self._respond(prompt)
+
+    async def stream(self, prompt):
+        await asyncio.sleep(self.latency)
+        words = self._respond(prompt).split(" ")
+        for i in range(0, len(words), self.chunk_words):
+            await asyncio.sleep(self.chunk_latency)
+            yield " ".join(words[i:i + self.chunk_words]) + " "
+
+    def stats(self):
+        return {"model": "fake", "calls": self.calls}
+
+
+class ScriptedLLM(CustomLLM):
+    """
+    Replaces the GoogleGenAI model of the src agent.
+
+    A script is the ReAct steps (Thought/Action/Answer) of one question. The
+    step to answer is the number of observations since the last question of
+    the prompt, so concurrent requests each follow the script from the start.
+    """
+
+    script: list[str] = []
+    latency: float = 0.0
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(is_chat_model=False, model_name="scripted")
+
+    def _next(self, prompt: str) -> str:
+        step = 0
+        for observation in reversed(TURN.findall(prompt)):
+            if not observation:
+                break
+            step += 1
+        return self.script[min(step, len(self.script) - 1)]
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return CompletionResponse(text=self._next(prompt))
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        await asyncio.sleep(self.latency)
+        return CompletionResponse(text=self._next(prompt))
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        text = self._next(prompt)
+
+        def gen():
+            yield CompletionResponse(text=text, delta=text)
+        return gen()
+
+    @llm_completion_callback()
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        await asyncio.sleep(self.latency)
+        text = self._next(prompt)
+
+        async def gen():
+            yield CompletionResponse(text=text, delta=text)
+        return gen()
+
+    # CustomLLM answers async chats with the sync completion, which would
+    # block the event loop for the latency
+    @llm_chat_callback()
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        response = await self.acomplete(self.messages_to_prompt(messages), formatted=True)
+        return completion_response_to_chat_response(response)
+
+    @llm_chat_callback()
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        responses = await self.astream_complete(self.messages_to_prompt(messages), formatted=True)
+        return astream_completion_response_to_chat_response(responses)
@@ -0,0 +1,354 @@
+"""
+HTTP load test of the /chat endpoint of either API over a concurrency sweep.
+
+Replays a corpus of Vietnamese legal questions (the examples of the UI and
+the questions of benchmarks/stages.py) with a weighted mix of plan types,
+against a running server (--url) or against one uvicorn worker of --app
+started here with the stubbed LLM of benchmarks/fakes.py, so that the
+results measure the overhead of the API itself. Every level of the sweep
+runs closed-loop users (one request at a time each) for --duration seconds
+and reports the throughput, the p50/p95/p99 latency and the error rate. The
+run is written as JSON to --output, to compare runs over time.
+
+Run from the repository root:
+
+    python benchmarks/load.py --app nhien [--concurrency 1,2,4,8,16,32] [--duration 20] [--llm-latency 0.5]
+    python benchmarks/load.py --app src --plans free=3,pro=1 --slo-p95 5
+    python benchmarks/load.py --url http://localhost:8001 --plans free,pro,premium
+
+The stub server uses the in-memory graph (--graph-backend neo4j for the
+database of the environment) and disables the answer and LLM caches, as
+the corpus repeats (--keep-caches to measure them).
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import types
+import random
+import socket
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from stages import QUESTIONS, ROOT, agent_script
+
+
+# The examples of ui/main.py and the keywords the stubbed LLM extracts from them
+EXAMPLES = {
+    "Chồng của tôi đã bỏ nhà đi 15 năm mà không liên lạc với gia đình. Hiện tại, tôi không biết chồng của tôi đang ở đâu, làm gì, liệu có còn sống không. Vì vậy, tôi muốn hỏi trường hợp như chồng tôi đã được coi là mất tích hay chưa? Tài sản mà vợ chồng tôi đã có trước khi anh bỏ nhà đi sẽ được chia như thế nào? Xin cảm ơn!": {
+        "civil_keywords": ["mất tích", "tuyên bố mất tích", "tài sản của người mất tích", "chia tài sản"],
+        "criminal_keywords": [],
+    },
+    "Nếu nam nữ không đăng ký kết hôn, sống chung với nhau như vợ chồng thì pháp luật có cho phép được hưởng tài sản thừa kế của nhau khi một người chết không? Có thể chứng minh việc chung sống như vợ chồng bằng cách nào để được Tòa án chấp nhận thưa Luật sư? Xin cảm ơn!": {
+        "civil_keywords": ["thừa kế", "người thừa kế", "thừa kế theo pháp luật", "di sản"],
+        "criminal_keywords": [],
+    },
+    "Có những cách thanh lý tài sản cầm cố nào theo quy định pháp luật? Nếu trong trường hợp tài sản cầm cố phải thanh lý thì thứ tự ưu tiên thanh toán tiền thu được sau khi thanh lý tài sản cầm cố như thế nào? Xin cảm ơn!": {
+        "civil_keywords": ["cầm cố tài sản", "xử lý tài sản cầm cố", "thứ tự ưu tiên thanh toán"],
+        "criminal_keywords": [],
+    },
+}
+CORPUS = {**EXAMPLES, **QUESTIONS}
+REPORTS = Path(__file__).resolve().parent / "reports"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def serve(app, port, llm_latency):
+    """Runs one uvicorn worker of `app` with the stubbed LLM (child process)."""
+    import uvicorn
+
+    sys.path.insert(0, str(ROOT / ("src" if app == "src" else "src_nhien")))
+    if app == "src":
+        from fakes import ScriptedLLM
+
+        # The agent imports its model from configs.gemini, which needs the network
+        llm = ScriptedLLM(latency=llm_latency)
+        gemini = types.ModuleType("configs.gemini")
+        gemini.model = llm
+        sys.modules["configs.gemini"] = gemini
+
+        import main
+        from configs.graph import backend
+
+        chapters = (await backend.get_chapters())[:2]
+        llm.script = agent_script(chapters)
+        # The pro agent reads the articles with their references
+        main.agent.pro_agent.llm = ScriptedLLM(
+            latency=llm_latency,
+            script=agent_script(chapters, "get_article_content_and_references"),
+        )
+    else:
+        from fakes import FakeGeminiClient
+
+        import LLM_gemini
+        LLM_gemini.client = FakeGeminiClient(CORPUS, latency=llm_latency)
+        import main
+
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning")
+    await uvicorn.Server(config).serve()
+
+
+def start_server(args, port):
+    env = dict(os.environ)
+    env.update({
+        "GRAPH_BACKEND": args.graph_backend,
+        "LAW_DATA_PATH": str(ROOT / "data" / "chung.json"),
+        "SESSION_STORE_PATH": ":memory:",
+        "DEBUG_SAMPLE_RATE": "0",
+    })
+    env.setdefault("GOOGLE_GENAI_API_KEY", "offline")
+    if not args.keep_caches:
+        env.update({"ANSWER_CACHE_BACKEND": "off", "LLM_CACHE_MAXSIZE": "0"})
+    return subprocess.Popen(
+        [sys.executable, __file__, "--serve", args.app, "--port", str(port),
+         "--llm-latency", str(args.llm_latency)],
+        cwd=ROOT, env=env,
+    )
+
+
+async def wait_ready(url, server, timeout=120):
+    """Waits until the server answers its health check (HTTP 200)."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                raise RuntimeError(f"Server exited with code {server.returncode}")
+            try:
+                if (await client.get(f"{url}/healthcheck")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def parse_plans(spec):
+    """"free=3,pro=1" to {"free": 3, "pro": 1}; the weight defaults to 1."""
+    plans = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        plans[name.strip()] = float(weight or 1)
+    return plans
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def latency_summary(latencies):
+    latencies = sorted(latencies)
+    ms = lambda value: None if value is None else round(value * 1000, 2)  # noqa: E731
+    return {
+        "p50": ms(percentile(latencies, 50)),
+        "p95": ms(percentile(latencies, 95)),
+        "p99": ms(percentile(latencies, 99)),
+        "mean": ms(statistics.fmean(latencies)) if latencies else None,
+        "max": ms(latencies[-1]) if latencies else None,
+    }
+
+
+async def send(client, url, rng, plans, timeout):
+    """One /chat request: (plan type, seconds, status or error name, ok)."""
+    question = rng.choice(list(CORPUS))
+    plan_type = rng.choices(list(plans), weights=list(plans.values()))[0]
+    start = time.perf_counter()
+    try:
+        response = await client.post(f"{url}/chat", timeout=timeout, json={
+            "question": question,
+            "histories": [],
+            "plan_type": plan_type,
+        })
+        status = str(response.status_code)
+        ok = response.status_code == 200 and response.json().get("error") is None
+    except (httpx.HTTPError, ValueError) as exc:
+        status, ok = type(exc).__name__, False
+    return plan_type, time.perf_counter() - start, status, ok
+
+
+async def run_level(url, concurrency, duration, warmup, plans, timeout, seed):
+    """Closed-loop users for `warmup` (discarded) then `duration` seconds."""
+    results = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits) as client:
+        async def user(index, deadline, record):
+            rng = random.Random(f"{seed}-{concurrency}-{index}")
+            while time.perf_counter() < deadline:
+                result = await send(client, url, rng, plans, timeout)
+                if record:
+                    results.append(result)
+
+        if warmup > 0:
+            deadline = time.perf_counter() + warmup
+            await asyncio.gather(*(user(i, deadline, False) for i in range(concurrency)))
+
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(user(i, deadline, True) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    ok = [seconds for _, seconds, _, success in results if success]
+    statuses = {}
+    for _, _, status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    by_plan = {}
+    for plan_type in plans:
+        plan = [r for r in results if r[0] == plan_type]
+        plan_ok = sorted(seconds for _, seconds, _, success in plan if success)
+        by_plan[plan_type] = {
+            "requests": len(plan),
+            "errors": len(plan) - len(plan_ok),
+            "latency_ms": latency_summary(plan_ok),
+        }
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "error_rate": round((len(results) - len(ok)) / len(results), 4) if results else None,
+        "throughput_rps": round(len(ok) / elapsed, 2),
+        # Of the successful requests
+        "latency_ms": latency_summary(ok),
+        "status_codes": statuses,
+        "by_plan": by_plan,
+    }
+
+
+def sustained(levels, max_error_rate, slo_p95):
+    """Highest concurrency within the error rate (and p95 latency) objectives."""
+    best = None
+    for level in levels:
+        if level["error_rate"] is None or level["error_rate"] > max_error_rate:
+            continue
+        if slo_p95 is not None and (level["latency_ms"]["p95"] or math.inf) > slo_p95 * 1000:
+            continue
+        best = level["concurrency"] if best is None else max(best, level["concurrency"])
+    return best
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def sweep(args, url):
+    plans = parse_plans(args.plans)
+    levels = []
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        level = await run_level(
+            url, concurrency, args.duration, args.warmup, plans, args.timeout, args.seed)
+        levels.append(level)
+        latency = level["latency_ms"]
+        print(f"{concurrency:>11}{level['requests']:>10}{level['throughput_rps']:>10.2f}"
+              f"{latency['p50'] or 0:>10.1f}{latency['p95'] or 0:>10.1f}{latency['p99'] or 0:>10.1f}"
+              f"{level['error_rate'] or 0:>9.1%}", flush=True)
+        if level["error_rate"] is not None and level["error_rate"] > args.stop_error_rate:
+            print(f"Stopping the sweep: error rate above {args.stop_error_rate:.0%}")
+            break
+    return plans, levels
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of a running API")
+    target.add_argument("--app", choices=["src", "nhien"],
+                        help="start one worker of this API with the stubbed LLM")
+    target.add_argument("--serve", choices=["src", "nhien"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32",
+                        help="comma-separated concurrent users of the sweep")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per level")
+    parser.add_argument("--warmup", type=float, default=2, help="discarded seconds per level")
+    parser.add_argument("--plans", default="free=3,pro=1",
+                        help="plan types and their weights, e.g. free=3,pro=1")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds per request")
+    parser.add_argument("--llm-latency", type=float, default=0.5,
+                        help="seconds the stubbed LLM waits per call (--app)")
+    parser.add_argument("--graph-backend", choices=["memory", "neo4j"], default="memory")
+    parser.add_argument("--keep-caches", action="store_true",
+                        help="keep the answer and LLM caches of the stub server")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="error rate of a sustainable level")
+    parser.add_argument("--slo-p95", type=float, default=None,
+                        help="p95 latency (seconds) of a sustainable level")
+    parser.add_argument("--stop-error-rate", type=float, default=0.5,
+                        help="stop the sweep above this error rate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None,
+                        help="JSON report (default: benchmarks/reports/load-<target>-<time>.json)")
+    args = parser.parse_args()
+
+    if args.serve:
+        asyncio.run(serve(args.serve, args.port, args.llm_latency))
+        sys.exit(0)
+
+    server = None
+    url = args.url.rstrip("/") if args.url else None
+    if args.app:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = start_server(args, port)
+    started_at = datetime.now(timezone.utc)
+    try:
+        asyncio.run(wait_ready(url, server))
+        print(f"{'concurrency':>11}{'requests':>10}{'req/s':>10}{'p50 ms':>10}"
+              f"{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+        plans, levels = asyncio.run(sweep(args, url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "target": {
+            "url": args.url,
+            "app": args.app,
+            "stub_llm": bool(args.app),
+            "llm_latency": args.llm_latency if args.app else None,
+            "graph_backend": args.graph_backend if args.app else None,
+            "caches": args.keep_caches if args.app else None,
+        },
+        "settings": {
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "plans": plans,
+            "timeout": args.timeout,
+            "seed": args.seed,
+            "questions": len(CORPUS),
+        },
+        "environment": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "levels": levels,
+        "sustained_concurrency": sustained(levels, args.max_error_rate, args.slo_p95),
+    }
+    output = Path(args.output) if args.output else REPORTS / (
+        f"load-{args.app or 'url'}-{started_at:%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n")
+    print(f"Sustained concurrency: {report['sustained_concurrency']}")
+    print(f"Report written to {output}")
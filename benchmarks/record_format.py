@@ -0,0 +1,91 @@
+"""
+Micro-benchmark of the src_nhien retrieval results: neo4j.Record rows
+stringified into the prompt (the former path) against ArticleRecord objects
+rendered as citations.
+
+Run from the repository root:
+
+    python benchmarks/record_format.py [--rows 20] [--repeat 200]
+"""
+
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src_nhien"))
+
+from neo4j import Record  # noqa: E402
+from law_corpus import ArticleRecord, load_corpus  # noqa: E402
+from context_packer import estimate_tokens  # noqa: E402
+
+
+DATA = Path(__file__).resolve().parents[1] / "data" / "chung.json"
+
+
+def neo4j_rows(articles):
+    return [Record({
+        "d.dieu_number": a["dieu_number"],
+        "d.title": a["title"],
+        "d.content": a["content"],
+        "referenced_articles": list(a["refs"]),
+        "score": 1.0,
+    }) for a in articles]
+
+
+def article_records(articles):
+    return [
+        ArticleRecord(a["law"], a["dieu_number"], a["title"], a["content"], a["refs"], 1.0)
+        for a in articles
+    ]
+
+
+def render_neo4j(rows):
+    return str(rows)
+
+
+def render_records(records):
+    return "\n\n".join(record.render() for record in records)
+
+
+def measure(build, render, articles, repeat):
+    # Memory held by the result objects (the strings are shared by both paths)
+    tracemalloc.start()
+    results = build(articles)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = render(build(articles))
+    elapsed = (time.perf_counter() - start) / repeat
+
+    return {
+        "memory_bytes": memory,
+        "build_and_render_ms": elapsed * 1000,
+        "chars": len(text),
+        "tokens": estimate_tokens(text),
+        "rows": len(results),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", default=str(DATA))
+    parser.add_argument("--rows", type=int, default=20,
+                        help="rows per request (RETRIEVAL_TOP_K)")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    _, corpus = load_corpus(args.data)
+    # The longest articles of one request are the worst case for the prompt
+    articles = sorted(corpus, key=lambda a: len(a["content"]), reverse=True)[:args.rows]
+
+    before = measure(neo4j_rows, render_neo4j, articles, args.repeat)
+    after = measure(article_records, render_records, articles, args.repeat)
+
+    print(f"{'':24}{'str(Record)':>14}{'ArticleRecord':>16}{'change':>10}")
+    for key in ("memory_bytes", "build_and_render_ms", "chars", "tokens"):
+        change = (after[key] - before[key]) / before[key] if before[key] else 0.0
+        print(f"{key:24}{before[key]:>14.2f}{after[key]:>16.2f}{change:>10.1%}")
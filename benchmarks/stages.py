@@ -0,0 +1,291 @@
+"""
+Offline stage-level benchmark of both APIs, against a baseline.
+
+Runs without Neo4j or Gemini: the graph is the in-memory backend of each
+app (GRAPH_BACKEND=memory, seeded from data/chung.json) and the LLM is a
+deterministic fake from benchmarks/fakes.py with a configurable latency.
+The answer cache is off and the tool and LLM caches are cleared before
+every iteration, so every run takes the full path.
+
+Stages (the median and p95 of one iteration over all the questions):
+
+    nhien.keyword_query     build_keyword_query of every law
+    nhien.retrieval         extract_data_from_graph (search + REFERS_TO expansion)
+    nhien.formatting        pack_context of the retrieved ArticleRecords
+    nhien.prompt_build      build_prompt of every plan
+    nhien.process_question  process_question end to end, free and pro plans
+    src.tool.*              the agent tools, uncached
+    src.agent_chat          Agents.chat end to end with a scripted ReAct run
+
+Run from the repository root:
+
+    python benchmarks/stages.py [--app all|src|nhien] [--repeat 20] [--llm-latency 0]
+    python benchmarks/stages.py --update-baseline
+
+The run fails (exit code 1) when the median of a stage exceeds its baseline
+by more than --tolerance. The baseline is machine dependent: regenerate it
+with --update-baseline on the machine that runs the check.
+"""
+
+import os
+import sys
+import json
+import time
+import types
+import asyncio
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# Questions and the keywords the fake LLM extracts from them
+QUESTIONS = {
+    "Hợp đồng mua bán tài sản có hiệu lực khi nào?": {
+        "civil_keywords": ["hợp đồng", "mua bán tài sản", "hiệu lực"],
+        "criminal_keywords": [],
+    },
+    "Trộm cắp tài sản bị phạt tù bao nhiêu năm?": {
+        "civil_keywords": ["tài sản"],
+        "criminal_keywords": ["trộm cắp tài sản", "phạt tù"],
+    },
+    "Quyền thừa kế của con nuôi được quy định như thế nào?": {
+        "civil_keywords": ["thừa kế", "con nuôi"],
+        "criminal_keywords": [],
+    },
+    "Lừa đảo chiếm đoạt tài sản thì phải bồi thường thiệt hại không?": {
+        "civil_keywords": ["bồi thường thiệt hại"],
+        "criminal_keywords": ["lừa đảo chiếm đoạt tài sản"],
+    },
+}
+# Articles the scripted agent reads, and the depth of their references
+AGENT_ARTICLES = ["Điều 117", "Điều 385", "Điều 651"]
+REFERENCE_DEPTH = 2
+
+
+def offline_environment():
+    os.environ.update({
+        "GRAPH_BACKEND": "memory",
+        "LAW_DATA_PATH": str(ROOT / "data" / "chung.json"),
+        "ANSWER_CACHE_BACKEND": "off",
+        "SESSION_STORE_PATH": ":memory:",
+        "DEBUG_SAMPLE_RATE": "0",
+    })
+    os.environ.setdefault("GOOGLE_GENAI_API_KEY", "offline")
+
+
+async def measure(fn, repeat, warmup=2):
+    for _ in range(warmup):
+        await fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        "median_ms": statistics.median(times) * 1000,
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))] * 1000,
+    }
+
+
+async def bench_nhien(repeat, llm_latency):
+    sys.path.insert(0, str(ROOT / "src_nhien"))
+    sys.path.insert(0, str(ROOT / "benchmarks"))
+    from fakes import FakeGeminiClient
+
+    import LLM_gemini
+    LLM_gemini.client = FakeGeminiClient(QUESTIONS, latency=llm_latency)
+
+    import main
+    from answer_generator import build_prompt
+    from context_packer import pack_context
+    from extract_data_from_graph import LAW_KEYWORDS, extract_data_from_graph
+    from graph_backend import get_backend
+    from query_generator import build_keyword_query
+    from config import CONTEXT_BUDGETS, REFERENCE_DEPTHS
+
+    get_backend()
+    await main.health.probe()
+
+    retrieved = {}
+    for question, keywords in QUESTIONS.items():
+        ds, hs, _ = await extract_data_from_graph(keywords, depth=REFERENCE_DEPTHS["pro"])
+        retrieved[question] = {"luat dan su": ds, "luat hinh su": hs}
+    packed = {
+        question: pack_context(results, CONTEXT_BUDGETS["pro"])[0]
+        for question, results in retrieved.items()
+    }
+
+    async def keyword_query():
+        for keywords in QUESTIONS.values():
+            for law_key, group in LAW_KEYWORDS.items():
+                build_keyword_query(law_key, keywords[group])
+
+    async def retrieval():
+        for keywords in QUESTIONS.values():
+            await extract_data_from_graph(keywords, depth=REFERENCE_DEPTHS["pro"])
+
+    async def formatting():
+        for results in retrieved.values():
+            pack_context(results, CONTEXT_BUDGETS["pro"])
+
+    async def prompt_build():
+        for question, context in packed.items():
+            for plan_type in CONTEXT_BUDGETS:
+                build_prompt(question, "", context["luat dan su"], context["luat hinh su"], plan_type)
+
+    async def process_question():
+        LLM_gemini.llm_cache.clear()
+        for question in QUESTIONS:
+            for plan_type in (main.PlanType.FREE, main.PlanType.PRO):
+                await main.process_question(question, [], plan_type)
+
+    return {
+        "nhien.keyword_query": await measure(keyword_query, repeat),
+        "nhien.retrieval": await measure(retrieval, repeat),
+        "nhien.formatting": await measure(formatting, repeat),
+        "nhien.prompt_build": await measure(prompt_build, repeat),
+        "nhien.process_question": await measure(process_question, repeat),
+    }
+
+
+def agent_script(chapters, content_tool="get_article_content"):
+    """ReAct steps of one question: chapters, articles, contents, answer."""
+    return [
+        "Thought: Tôi cần danh sách các chương.\nAction: get_chapters\nAction Input: {}",
+        "Thought: Tôi cần các điều của chương liên quan.\nAction: get_articles\n"
+        f"Action Input: {json.dumps({'chapter_names': chapters}, ensure_ascii=False)}",
+        f"Thought: Tôi cần nội dung các điều.\nAction: {content_tool}\n"
+        f"Action Input: {json.dumps({'article_names': AGENT_ARTICLES}, ensure_ascii=False)}",
+        "Thought: Tôi có thể trả lời mà không cần thêm công cụ.\n"
+        "Answer: Theo Điều 117 Bộ luật Dân sự, giao dịch dân sự có hiệu lực khi đủ các điều kiện luật định.",
+    ]
+
+
+async def bench_src(repeat, llm_latency):
+    sys.path.insert(0, str(ROOT / "src"))
+    sys.path.insert(0, str(ROOT / "benchmarks"))
+    from fakes import ScriptedLLM
+
+    # The agent imports its model from configs.gemini, which needs the network
+    llm = ScriptedLLM(latency=llm_latency)
+    gemini = types.ModuleType("configs.gemini")
+    gemini.model = llm
+    sys.modules["configs.gemini"] = gemini
+
+    from configs.graph import backend
+    from agent import Agents, PlanType
+    from agent.tools import (
+        tool_cache,
+        get_chapters,
+        get_articles,
+        get_articles_content,
+        get_articles_content_and_references
+    )
+
+    chapters = (await backend.get_chapters())[:2]
+    agents = Agents()
+    llm.script = agent_script(chapters)
+
+    async def uncached(call):
+        tool_cache.clear()
+        await call()
+
+    async def agent_chat():
+        tool_cache.clear()
+        for question in QUESTIONS:
+            await agents.chat(question, [], PlanType.FREE)
+
+    return {
+        "src.tool.get_chapters": await measure(
+            lambda: uncached(get_chapters), repeat),
+        "src.tool.get_articles": await measure(
+            lambda: uncached(lambda: get_articles(chapter_names=chapters)), repeat),
+        "src.tool.get_articles_content": await measure(
+            lambda: uncached(lambda: get_articles_content(article_names=AGENT_ARTICLES)), repeat),
+        "src.tool.get_articles_content_and_references": await measure(
+            lambda: uncached(lambda: get_articles_content_and_references(
+                article_names=AGENT_ARTICLES, depth=REFERENCE_DEPTH)), repeat),
+        "src.agent_chat": await measure(agent_chat, repeat),
+    }
+
+
+def run_app(app, repeat, llm_latency):
+    """Runs the stages of one app in a child process, as both apps have a `main` module."""
+    output = subprocess.run(
+        [sys.executable, __file__, "--app", app, "--json",
+         "--repeat", str(repeat), "--llm-latency", str(llm_latency)],
+        check=True, capture_output=True, text=True, cwd=ROOT,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Stages whose median regressed by more than `tolerance` (and `min_delta_ms`)."""
+    regressions = []
+    for stage, result in results.items():
+        base = baseline.get(stage)
+        if base is None:
+            continue
+        delta = result["median_ms"] - base["median_ms"]
+        if delta > min_delta_ms and result["median_ms"] > base["median_ms"] * (1 + tolerance):
+            regressions.append(stage)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--app", choices=["all", "src", "nhien"], default="all")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.0,
+                        help="seconds the fake LLM waits per call")
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown of a stage median over its baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="slowdowns smaller than this are noise")
+    parser.add_argument("--json", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.json:
+        # Child process of one app: print its results as JSON
+        offline_environment()
+        bench = bench_src if args.app == "src" else bench_nhien
+        print(json.dumps(asyncio.run(bench(args.repeat, args.llm_latency))))
+        sys.exit(0)
+
+    apps = ["nhien", "src"] if args.app == "all" else [args.app]
+    results = {}
+    for app in apps:
+        results.update(run_app(app, args.repeat, args.llm_latency))
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    stages = baseline.get("stages", {})
+    regressions = compare(results, stages, args.tolerance, args.min_delta_ms)
+
+    print(f"{'stage':46}{'median ms':>11}{'p95 ms':>10}{'baseline':>10}{'change':>9}")
+    for stage, result in results.items():
+        base = stages.get(stage, {}).get("median_ms")
+        shown = f"{base:.3f}" if base else "-"
+        change = f"{result['median_ms'] / base - 1:+.0%}" if base else ""
+        flag = "  REGRESSION" if stage in regressions else ""
+        print(f"{stage:46}{result['median_ms']:>11.3f}{result['p95_ms']:>10.3f}"
+              f"{shown:>10}{change:>9}{flag}")
+
+    if args.update_baseline:
+        stages.update(results)
+        baseline_path.write_text(json.dumps({
+            "llm_latency": args.llm_latency,
+            "repeat": args.repeat,
+            "stages": stages,
+        }, indent=2) + "\n")
+        print(f"Baseline written to {baseline_path}")
+    elif regressions:
+        print(f"{len(regressions)} stage(s) slower than the baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
@@ -1,78 +1,128 @@
 # Run this script to migrate the data
 
 from neo4j import GraphDatabase
+import argparse
+import hashlib
 import json
 import re
+import time
+
+from schema import apply_schema
 
 
 DATA = "chung.json"
-CREATE_CHAPTER_CYPHER = """MATCH (b:BOOK {{name: "Bộ luật dân sự"}})
-CREATE (b)-[:HAS]->(c:CHAPTER {{name: "{name}"}})"""
-CREATE_ARTICLE_CYPHER = """MATCH (c:CHAPTER {{name: "{chapter_name}"}})
-CREATE (c)-[:HAS]->(a:ARTICLE {{name: "{article_name}", title: "{article_title}", content: "{article_content}"}})"""
-CREATE_REF_CYPHER = """MATCH (a:ARTICLE {{name: "{article_name}"}}), (b:ARTICLE {{name: "{ref_name}"}})
-CREATE (a)-[:REFERS_TO]->(b)"""
+BOOK_NAME = "Bộ luật dân sự"
+BATCH_SIZE = 1000
 
-db = GraphDatabase.driver("bolt://localhost:7687")
+CREATE_BOOK_CYPHER = "MERGE (b:BOOK {name: $name})"
+CREATE_CHAPTER_CYPHER = """UNWIND $rows AS row
+MATCH (b:BOOK {name: $book})
+MERGE (c:CHAPTER {name: row.name})
+MERGE (b)-[:HAS]->(c)"""
+CREATE_ARTICLE_CYPHER = """UNWIND $rows AS row
+MATCH (c:CHAPTER {name: row.chapter_name})
+MERGE (a:ARTICLE {name: row.article_name})
+SET a.title = row.article_title, a.content = row.article_content
+MERGE (c)-[:HAS]->(a)"""
+CREATE_REF_CYPHER = """UNWIND $rows AS row
+MATCH (a:ARTICLE {name: row.article_name}), (b:ARTICLE {name: row.ref_name})
+MERGE (a)-[:REFERS_TO]->(b)"""
+SET_VERSION_CYPHER = "MATCH (b:BOOK {name: $name}) SET b.version = $version"
 
 
 def find_article_ref(content: str) -> list[str]:
-    pattern = r"(?i)Điều\s+\d+"
-    return re.findall(pattern, content)
+    pattern = r"(?i)Điều\s+(\d+)"
+    return [f"Điều {number}" for number in re.findall(pattern, content)]
 
 
-if __name__ == "__main__":
-    # 1. Read the JSON file
-    with open(DATA, 'r', encoding="utf-8") as f:
-        data = json.load(f)
+def corpus_version(path: str) -> str:
+    """Content hash of the source file, used by the API caches as a version stamp."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
 
-    # 2. Format the data
-    law_content = data['Luat']['content']['luat dan su']
+
+def format_law_content(law_content: dict) -> dict[str, dict]:
+    """Group the articles by chapter name (one chapter per Mục when a chapter has Mục)."""
     format_law_content = {}
     for content in law_content.values():
         # Kiểm tra nếu content là các Mục
         if 'Mục 1' in content['content'].keys():
             for c in content['content'].values():
-                # Kiểm tra nếu tiêu đề đã tồn tại trong format_law_content
-                if c['title'] not in format_law_content:
-                    format_law_content[c['title']] = {}
-                # Nếu tiêu đề đã tồn tại, thêm nội dung vào danh sách
-                for k, v in c['dieu'].items():
-                    format_law_content[c['title']][k] = v
-                    format_law_content[c['title']][k]["ref"] = find_article_ref(
-                        v['content'])
+                # Gom các điều của Mục và của các Tiểu mục bên trong
+                articles = dict(c.get('dieu') or {})
+                for tieu_muc in (c.get('tieu_muc') or {}).values():
+                    articles.update(tieu_muc.get('dieu') or {})
+                format_law_content.setdefault(c['title'], {}).update(articles)
         # Nếu không, thêm tiêu đề của content vào danh sách
         else:
-            if content['title'] not in format_law_content:
-                format_law_content[content['title']] = {}
-            # Nếu tiêu đề đã tồn tại, thêm nội dung vào danh sách
-            for k, v in content['content'].items():
-                format_law_content[content['title']][k] = v
-                format_law_content[content['title']
-                                   ][k]["ref"] = find_article_ref(v['content'])
-
-    # 3. Create a master node
-    db.execute_query("CREATE (b:BOOK {name: 'Bộ luật dân sự'})")
-
-    # 4. Add chapters and articles to the database
-    for chaper, articles in format_law_content.items():
-        # Create a chapter node
-        db.execute_query(CREATE_CHAPTER_CYPHER.format(name=chaper))
-        # Create article nodes and relationships
-        for article, content in articles.items():
-            db.execute_query(CREATE_ARTICLE_CYPHER.format(
-                chapter_name=chaper,
-                article_name=article,
-                article_title=content['title'],
-                article_content=content['content']
-            ))
-
-    # 5. Add article references to the database
-    for chaper, articles in format_law_content.items():
-        for article, content in articles.items():
-            for ref in set(content['ref']):
-                # Create a reference relationship between articles
-                db.execute_query(CREATE_REF_CYPHER.format(
-                    article_name=article,
-                    ref_name=ref
-                ))
+            format_law_content.setdefault(
+                content['title'], {}).update(content['content'])
+    return format_law_content
+
+
+def flatten(format_law_content: dict[str, dict]) -> tuple[list, list, list]:
+    """Turn the grouped articles into chapter, article and reference rows."""
+    chapters, articles, refs = [], [], []
+    for chapter, chapter_articles in format_law_content.items():
+        chapters.append({"name": chapter})
+        for article, content in chapter_articles.items():
+            articles.append({
+                "chapter_name": chapter,
+                "article_name": article,
+                "article_title": content['title'],
+                "article_content": content['content'],
+            })
+            for ref in dict.fromkeys(find_article_ref(content['content'])):
+                refs.append({"article_name": article, "ref_name": ref})
+    return chapters, articles, refs
+
+
+def load_rows(session, query: str, rows: list[dict], batch_size: int, label: str, **params):
+    """Write rows in batched UNWIND transactions and report the throughput."""
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch_size):
+        batch = rows[i:i + batch_size]
+        session.execute_write(lambda tx: tx.run(
+            query, rows=batch, **params).consume())
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {len(rows)} rows in {elapsed:.2f}s "
+          f"({len(rows) / elapsed if elapsed else 0:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the civil code into Neo4j.")
+    parser.add_argument("--uri", default="bolt://localhost:7687")
+    parser.add_argument("--data", default=DATA)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = GraphDatabase.driver(args.uri)
+
+    # 1. Read the JSON file
+    with open(args.data, 'r', encoding="utf-8") as f:
+        data = json.load(f)
+
+    # 2. Format the data
+    chapters, articles, refs = flatten(
+        format_law_content(data['Luat']['content']['luat dan su']))
+
+    with db.session() as session:
+        # 3. Create the constraints (and their indexes) before loading
+        apply_schema(session, "civil")
+
+        # 4. Create a master node
+        session.run(CREATE_BOOK_CYPHER, name=BOOK_NAME).consume()
+
+        # 5. Add chapters, articles and article references in batches
+        load_rows(session, CREATE_CHAPTER_CYPHER, chapters,
+                  args.batch_size, "Chapters", book=BOOK_NAME)
+        load_rows(session, CREATE_ARTICLE_CYPHER, articles,
+                  args.batch_size, "Articles")
+        load_rows(session, CREATE_REF_CYPHER, refs,
+                  args.batch_size, "References")
+
+        # 6. Stamp the corpus version once everything is loaded
+        session.run(SET_VERSION_CYPHER, name=BOOK_NAME,
+                    version=corpus_version(args.data)).consume()
+
+    db.close()
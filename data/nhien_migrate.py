@@ -1,84 +1,213 @@
 from neo4j import GraphDatabase
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import csv
+import hashlib
 import json
 from pathlib import Path
 import re
+import time
+
+from schema import apply_schema
+
+
+BATCH_SIZE = 1000
+
+# --- NODE --- one UNWIND statement per label, in write order
+NODE_CYPHER = {
+    "Chapter": """UNWIND $rows AS row
+        MERGE (c:Chapter {law: row.law, key: row.key})
+        SET c.title = row.title, c.hash = row.hash""",
+    "Muc": """UNWIND $rows AS row
+        MERGE (m:Muc {law: row.law, parent: row.parent, title: row.title})
+        SET m.hash = row.hash""",
+    "TieuMuc": """UNWIND $rows AS row
+        MERGE (t:TieuMuc {law: row.law, parent: row.parent, title: row.title})
+        SET t.hash = row.hash""",
+    "Dieu": """UNWIND $rows AS row
+        MERGE (d:Dieu {law: row.law, parent: row.parent, dieu_number: row.dieu_number})
+        SET d.title = row.title, d.content = row.content, d.hash = row.hash""",
+}
+
+# Properties identifying a node within its law
+NODE_KEYS = {
+    "Chapter": ("key",),
+    "Muc": ("parent", "title"),
+    "TieuMuc": ("parent", "title"),
+    "Dieu": ("parent", "dieu_number"),
+}
+
+# --- SYNC --- incremental re-migration
+# The IS NOT NULL predicates let the planner seek the (law, ...) composite indexes
+READ_HASHES_CYPHER = {
+    label: f"""MATCH (n:{label})
+        WHERE n.law = $law AND {" AND ".join(f"n.{k} IS NOT NULL" for k in keys)}
+        RETURN {", ".join(f"n.{k} AS {k}" for k in keys)}, n.hash AS hash"""
+    for label, keys in NODE_KEYS.items()
+}
+DELETE_NODES_CYPHER = {
+    label: f"""UNWIND $rows AS row
+        MATCH (n:{label} {{law: $law, {", ".join(f"{k}: row.{k}" for k in keys)}}})
+        DETACH DELETE n"""
+    for label, keys in NODE_KEYS.items()
+}
+# Incoming hierarchy edges of updated nodes are dropped, then re-created
+DELETE_PARENT_EDGES_CYPHER = {
+    label: f"""UNWIND $rows AS row
+        MATCH (n:{label} {{law: row.law, {", ".join(f"{k}: row.{k}" for k in keys)}}})<-[r]-(p)
+        WHERE NOT p:Dieu
+        DELETE r"""
+    for label, keys in NODE_KEYS.items()
+}
+READ_REFS_CYPHER = """MATCH (a:Dieu)-[:REFERS_TO]->(b:Dieu)
+    WHERE a.law = $law AND a.dieu_number IS NOT NULL AND b.law = $law
+    RETURN a.dieu_number AS dieu_number, b.dieu_number AS ref_number"""
+DELETE_REFS_CYPHER = """UNWIND $rows AS row
+    MATCH (a:Dieu {law: $law, dieu_number: row.dieu_number})-[r:REFERS_TO]->(b:Dieu {law: $law, dieu_number: row.ref_number})
+    DELETE r"""
+DELETE_LAWS_CYPHER = """MATCH (l:Law) WHERE NOT l.key IN $keys
+    CALL { WITH l MATCH (n:Dieu) WHERE n.law = l.key AND n.dieu_number IS NOT NULL DETACH DELETE n }
+    CALL { WITH l MATCH (n:TieuMuc) WHERE n.law = l.key AND n.parent IS NOT NULL AND n.title IS NOT NULL DETACH DELETE n }
+    CALL { WITH l MATCH (n:Muc) WHERE n.law = l.key AND n.parent IS NOT NULL AND n.title IS NOT NULL DETACH DELETE n }
+    CALL { WITH l MATCH (n:Chapter) WHERE n.law = l.key AND n.key IS NOT NULL DETACH DELETE n }
+    DETACH DELETE l"""
+SET_VERSION_CYPHER = "MATCH (r:Root {title: $t}) SET r.version = $version"
+
+
+def content_hash(*parts) -> str:
+    return hashlib.sha256("\x1f".join(map(str, parts)).encode("utf-8")).hexdigest()[:16]
+
+# --- REL --- one UNWIND statement per (start label, type, end label), in write order
+EDGE_CYPHER = {
+    ("Law", "HAS_CHAPTER", "Chapter"): """UNWIND $rows AS row
+        MATCH (l:Law {key: row.law}), (c:Chapter {law: row.law, key: row.chapter})
+        MERGE (l)-[:HAS_CHAPTER]->(c)""",
+    ("Chapter", "HAS_MUC", "Muc"): """UNWIND $rows AS row
+        MATCH (c:Chapter {law: row.law, key: row.chapter}),
+              (m:Muc {law: row.law, parent: row.chapter, title: row.title})
+        MERGE (c)-[:HAS_MUC]->(m)""",
+    ("Chapter", "HAS_DIEU", "Dieu"): """UNWIND $rows AS row
+        MATCH (c:Chapter {law: row.law, key: row.chapter}),
+              (d:Dieu {law: row.law, parent: row.chapter, dieu_number: row.dieu_number})
+        MERGE (c)-[:HAS_DIEU]->(d)""",
+    ("Muc", "HAS_TIEUMUC", "TieuMuc"): """UNWIND $rows AS row
+        MATCH (m:Muc {law: row.law, parent: row.chapter, title: row.parent_title}),
+              (t:TieuMuc {law: row.law, parent: row.chapter, title: row.title})
+        MERGE (m)-[:HAS_TIEUMUC]->(t)""",
+    ("TieuMuc", "HAS_SUBTM", "TieuMuc"): """UNWIND $rows AS row
+        MATCH (p:TieuMuc {law: row.law, parent: row.chapter, title: row.parent_title}),
+              (t:TieuMuc {law: row.law, parent: row.chapter, title: row.title})
+        MERGE (p)-[:HAS_SUBTM]->(t)""",
+    ("Muc", "HAS_DIEU", "Dieu"): """UNWIND $rows AS row
+        MATCH (m:Muc {law: row.law, parent: row.chapter, title: row.parent_title}),
+              (d:Dieu {law: row.law, parent: row.chapter, dieu_number: row.dieu_number})
+        MERGE (m)-[:HAS_DIEU]->(d)""",
+    ("TieuMuc", "HAS_DIEU", "Dieu"): """UNWIND $rows AS row
+        MATCH (t:TieuMuc {law: row.law, parent: row.chapter, title: row.parent_title}),
+              (d:Dieu {law: row.law, parent: row.chapter, dieu_number: row.dieu_number})
+        MERGE (t)-[:HAS_DIEU]->(d)""",
+    ("Dieu", "REFERS_TO", "Dieu"): """UNWIND $rows AS row
+        MATCH (a:Dieu {law: row.law, dieu_number: row.dieu_number}),
+              (b:Dieu {law: row.law, dieu_number: row.ref_number})
+        MERGE (a)-[:REFERS_TO]->(b)""",
+}
 
 
 class LawGraphImporter:
-    def __init__(self, uri, json_file):
+    """
+    Two-phase importer: `flatten_law` turns the JSON of a law into typed node
+    and edge rows, then `write_law` writes them with batched UNWIND
+    transactions. Laws are written in parallel, one worker per law.
+    """
+
+    def __init__(self, uri, json_file, batch_size=BATCH_SIZE):
         self.driver = GraphDatabase.driver(uri)
-        self.data = json.loads(Path(json_file).read_text(encoding="utf-8"))
-        self.article_refs: dict[str, list[str]] = {}
+        raw = Path(json_file).read_bytes()
+        self.data = json.loads(raw)
+        # Version stamp of the corpus, recorded on the Root node for the API caches
+        self.version = hashlib.sha256(raw).hexdigest()[:16]
+        self.batch_size = batch_size
 
     def find_article_refs(self, content: str) -> list[str]:
         pattern = r"(?i)Điều\s+\d+"
         matches = re.findall(pattern, content)
         return [m.strip().capitalize() for m in matches]
 
-    def import_data(self):
+    def laws(self):
         root = self.data.get("Luat", {})
-        root_title = root.get("title", "Luật Việt Nam")
-
-        with self.driver.session() as ses:
-            ses.execute_write(self.create_root, root_title)
-
-            for law_key, law_data in (root.get("content") or {}).items():
-                if not isinstance(law_data, dict):
-                    continue
-
-                law_title = law_data.get("title", law_key)
-                ses.execute_write(self.create_law, law_key, law_title)
-                ses.execute_write(self.rel_root_to_law, root_title, law_key)
-
-                chapters = law_data.get("content") or {
-                    k: v for k, v in law_data.items() if k != "title"
-                }
-
-                for chap_key, chap_data in chapters.items():
-                    chap_title = chap_data.get("title", chap_key)
-                    ses.execute_write(self.create_chapter,
-                                      law_key, chap_key, chap_title)
-                    ses.execute_write(
-                        self.rel_law_to_chapter, law_key, chap_key)
-
-                    self._walk_level(
-                        ses,
-                        law_key,
-                        chap_key,
-                        chap_data.get("content")
-                        or chap_data.get("muc")
-                        or chap_data.get("dieu")
-                        or {},
-                    )
-
-            # Tạo REFERS_TO sau khi các node đã được tạo
-            for article, refs in self.article_refs.items():
-                key, law = article.split(":")
-                for ref in set(refs):
-                    ref = ref.strip().capitalize()
-                    ses.execute_write(
-                        self.rel_dieu_to_dieu, law, key, ref, "REFERS_TO"
-                    )
-
-    def close(self):
-        self.driver.close()
-
-    def _walk_level(self, ses, law, chap, node_dict, parent_type=None, parent_title=None):
+        for law_key, law_data in (root.get("content") or {}).items():
+            if isinstance(law_data, dict):
+                yield law_key, law_data
+
+    # ---------- Phase 1: flatten ----------
+    def flatten_law(self, law_key, law_data):
+        """
+        Returns the nodes of a law grouped by label and its edges grouped by
+        (start label, type, end label), as lists of plain dict rows.
+        """
+        nodes = {label: [] for label in NODE_CYPHER}
+        edges = {edge: [] for edge in EDGE_CYPHER}
+        refs = {}
+
+        chapters = law_data.get("content") or {
+            k: v for k, v in law_data.items() if k != "title"
+        }
+        for chap_key, chap_data in chapters.items():
+            chap_title = chap_data.get("title", chap_key)
+            nodes["Chapter"].append({
+                "law": law_key,
+                "key": chap_key,
+                "title": chap_title,
+                "hash": content_hash(chap_title),
+            })
+            edges[("Law", "HAS_CHAPTER", "Chapter")].append(
+                {"law": law_key, "chapter": chap_key})
+
+            self._walk_level(
+                nodes,
+                edges,
+                refs,
+                law_key,
+                chap_key,
+                chap_data.get("content")
+                or chap_data.get("muc")
+                or chap_data.get("dieu")
+                or {},
+            )
+
+        # REFERS_TO only between articles of the same law
+        parents = {row["dieu_number"]: row["parent"] for row in nodes["Dieu"]}
+        for dieu_number, dieu_refs in refs.items():
+            for ref in dict.fromkeys(dieu_refs):
+                if ref in parents:
+                    edges[("Dieu", "REFERS_TO", "Dieu")].append({
+                        "law": law_key,
+                        "dieu_number": dieu_number,
+                        "ref_number": ref,
+                        "chapter": parents[dieu_number],
+                        "ref_chapter": parents[ref],
+                    })
+
+        return nodes, edges
+
+    def _walk_level(self, nodes, edges, refs, law, chap, node_dict, parent_type=None, parent_title=None):
         for k, v in node_dict.items():
             if k.startswith("Mục"):
                 muc_title = v.get("title", k)
-                ses.execute_write(self.create_muc, law, chap, muc_title)
-                target_rel = "HAS_MUC" if parent_type is None else "HAS_TIEUMUC"
-
-                if parent_type == "Muc":
-                    ses.execute_write(self.rel_muc_to_tieumuc, law,
-                                      chap, parent_title, muc_title, target_rel)
-                elif parent_type is None:
-                    ses.execute_write(self.rel_chapter_to_node,
-                                      law, chap, muc_title, target_rel)
+                nodes["Muc"].append({
+                    "law": law,
+                    "parent": chap,
+                    "title": muc_title,
+                    "hash": content_hash(muc_title, parent_type, parent_title),
+                })
+                if parent_type is None:
+                    edges[("Chapter", "HAS_MUC", "Muc")].append(
+                        {"law": law, "chapter": chap, "title": muc_title})
 
                 self._walk_level(
-                    ses,
+                    nodes,
+                    edges,
+                    refs,
                     law,
                     chap,
                     v.get("tieu_muc") or v.get("dieu") or {},
@@ -88,17 +217,23 @@ class LawGraphImporter:
 
             elif k.startswith("Tiểu mục"):
                 tm_title = v.get("title", k)
-                ses.execute_write(self.create_tieumuc, law, chap, tm_title)
-
+                nodes["TieuMuc"].append({
+                    "law": law,
+                    "parent": chap,
+                    "title": tm_title,
+                    "hash": content_hash(tm_title, parent_type, parent_title),
+                })
+                row = {"law": law, "chapter": chap,
+                       "parent_title": parent_title, "title": tm_title}
                 if parent_type == "Muc":
-                    ses.execute_write(self.rel_muc_to_tieumuc, law,
-                                      chap, parent_title, tm_title, "HAS_TIEUMUC")
+                    edges[("Muc", "HAS_TIEUMUC", "TieuMuc")].append(row)
                 elif parent_type == "TieuMuc":
-                    ses.execute_write(
-                        self.rel_tieumuc_to_tieumuc, law, chap, parent_title, tm_title, "HAS_SUBTM")
+                    edges[("TieuMuc", "HAS_SUBTM", "TieuMuc")].append(row)
 
                 self._walk_level(
-                    ses,
+                    nodes,
+                    edges,
+                    refs,
                     law,
                     chap,
                     v.get("dieu") or {},
@@ -109,113 +244,304 @@ class LawGraphImporter:
             elif k.startswith("Điều"):
                 dieu_match = re.search(r"\d+", k)
                 dieu_number = f"Điều {dieu_match.group()}" if dieu_match else k
-                d_title = v.get("title", k)
                 d_content = v.get("content") if isinstance(v, dict) else str(v)
 
                 d_refs = self.find_article_refs(d_content)
                 if d_refs:
-                    self.article_refs[f"{dieu_number}:{law}"] = d_refs
-
-                print(f"Creating node Dieu: {dieu_number}, Title: {d_title}")
-                ses.execute_write(self.create_dieu, law, chap,
-                                  dieu_number, d_title, d_content)
+                    refs[dieu_number] = d_refs
 
+                d_title = v.get("title", k)
+                nodes["Dieu"].append({
+                    "law": law,
+                    "parent": chap,
+                    "dieu_number": dieu_number,
+                    "title": d_title,
+                    "content": d_content,
+                    # The position is hashed too, so a moved Điều gets re-linked
+                    "hash": content_hash(d_title, d_content, parent_type, parent_title),
+                })
+                row = {"law": law, "chapter": chap,
+                       "parent_title": parent_title, "dieu_number": dieu_number}
                 if parent_type == "Muc":
-                    ses.execute_write(self.rel_muc_to_dieu, law,
-                                      chap, parent_title, d_title, "HAS_DIEU")
+                    edges[("Muc", "HAS_DIEU", "Dieu")].append(row)
                 elif parent_type == "TieuMuc":
-                    ses.execute_write(self.rel_tieumuc_to_dieu,
-                                      law, chap, parent_title, d_title, "HAS_DIEU")
+                    edges[("TieuMuc", "HAS_DIEU", "Dieu")].append(row)
                 else:
-                    ses.execute_write(self.rel_chapter_to_node,
-                                      law, chap, d_title, "HAS_DIEU")
-
-    # --- NODE ---
-    @staticmethod
-    def create_root(tx, title):
-        tx.run("MERGE (:Root {title:$t})", t=title)
+                    edges[("Chapter", "HAS_DIEU", "Dieu")].append(row)
 
-    @staticmethod
-    def create_law(tx, key, title):
-        tx.run("MERGE (l:Law {key:$k}) SET l.title=$t", k=key, t=title)
+    # ---------- Phase 2: batched writes ----------
+    def create_indexes(self):
+        with self.driver.session() as ses:
+            apply_schema(ses, "law")
 
-    @staticmethod
-    def create_chapter(tx, law, chap, title):
-        tx.run(
-            "MERGE (c:Chapter {law:$l, key:$k}) SET c.title=$t", l=law, k=chap, t=title)
+    def import_data(self):
+        root = self.data.get("Luat", {})
+        root_title = root.get("title", "Luật Việt Nam")
+        laws = list(self.laws())
 
-    @staticmethod
-    def create_muc(tx, law, chap, title):
-        tx.run("MERGE (:Muc {law:$l, parent:$c, title:$t})",
-               l=law, c=chap, t=title)
+        self.create_indexes()
+        with self.driver.session() as ses:
+            ses.execute_write(self.create_root_and_laws, root_title, [
+                {"key": law_key, "title": law_data.get("title", law_key)}
+                for law_key, law_data in laws
+            ])
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(len(laws), 1)) as pool:
+            rows = sum(pool.map(lambda law: self.write_law(*law), laws))
+        elapsed = time.perf_counter() - start
+        print(f"Imported {rows} rows in {elapsed:.2f}s "
+              f"({rows / elapsed if elapsed else 0:.0f} rows/s)")
 
-    @staticmethod
-    def create_tieumuc(tx, law, chap, title):
-        tx.run(
-            "MERGE (:TieuMuc {law:$l, parent:$c, title:$t})", l=law, c=chap, t=title)
+        with self.driver.session() as ses:
+            ses.run(SET_VERSION_CYPHER, t=root_title, version=self.version).consume()
+
+    def sync_data(self):
+        """
+        Applies the difference between the JSON and the graph: only inserted,
+        updated and deleted nodes and changed REFERS_TO edges are written,
+        in one transaction per law, so the graph is never half-populated.
+        """
+        root = self.data.get("Luat", {})
+        root_title = root.get("title", "Luật Việt Nam")
+        laws = list(self.laws())
 
-    @staticmethod
-    def create_dieu(tx, law, chap, dieu_number, title, content):
-        tx.run("""
-            MERGE (d:Dieu {law:$l, parent:$c, dieu_number:$n})
-            SET d.title = $t, d.content = $ct
-            """, l=law, c=chap, n=dieu_number, t=title, ct=content)
+        self.create_indexes()
+        with self.driver.session() as ses:
+            ses.execute_write(self.create_root_and_laws, root_title, [
+                {"key": law_key, "title": law_data.get("title", law_key)}
+                for law_key, law_data in laws
+            ])
+            ses.run(DELETE_LAWS_CYPHER, keys=[law_key for law_key, _ in laws]).consume()
 
-    # --- REL ---
-    @staticmethod
-    def rel_root_to_law(tx, root_title, law_key):
-        tx.run("""MATCH (r:Root {title:$r}),(l:Law {key:$k})
-                  MERGE (r)-[:HAS_LAW]->(l)""", r=root_title, k=law_key)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(len(laws), 1)) as pool:
+            list(pool.map(lambda law: self.sync_law(*law), laws))
 
-    @staticmethod
-    def rel_law_to_chapter(tx, law_key, chap_key):
-        tx.run("""MATCH (l:Law {key:$k}),(c:Chapter {law:$k,key:$c})
-                  MERGE (l)-[:HAS_CHAPTER]->(c)""", k=law_key, c=chap_key)
+        with self.driver.session() as ses:
+            ses.run(SET_VERSION_CYPHER, t=root_title, version=self.version).consume()
+        print(f"Synced to version {self.version} in {time.perf_counter() - start:.2f}s")
 
-    @staticmethod
-    def rel_chapter_to_node(tx, law, chap, node_title, rel):
-        tx.run(f"""MATCH (c:Chapter {{law:$l,key:$c}}),
-                          (n {{law:$l,parent:$c,title:$t}})
-                   MERGE (c)-[:{rel}]->(n)""", l=law, c=chap, t=node_title)
+    def sync_law(self, law_key, law_data):
+        nodes, edges = self.flatten_law(law_key, law_data)
+        with self.driver.session() as ses:
+            stats = ses.execute_write(self._sync_law, law_key, nodes, edges)
+        print(f"[{law_key}] " + ", ".join(f"{k}: {v}" for k, v in stats.items()))
 
     @staticmethod
-    def rel_muc_to_tieumuc(tx, law, chap, muc_title, tm_title, rel):
-        tx.run(f"""MATCH (m:Muc {{law:$l,parent:$c,title:$m}}),
-                          (t:TieuMuc {{law:$l,parent:$c,title:$tm}})
-                   MERGE (m)-[:{rel}]->(t)""", l=law, c=chap, m=muc_title, tm=tm_title)
+    def _sync_law(tx, law_key, nodes, edges):
+        stats = {"inserted": 0, "updated": 0, "deleted": 0,
+                 "refs_added": 0, "refs_removed": 0}
+        upserted = set()
+
+        # 1. Nodes: delete the missing ones, upsert the new and changed ones
+        for label, keys in NODE_KEYS.items():
+            old = {
+                tuple(record[k] for k in keys): record["hash"]
+                for record in tx.run(READ_HASHES_CYPHER[label], law=law_key)
+            }
+            new = {tuple(row[k] for k in keys): row for row in nodes[label]}
+
+            deleted = [dict(zip(keys, key)) for key in old if key not in new]
+            changed = [row for key, row in new.items() if old.get(key) != row["hash"]]
+            if deleted:
+                tx.run(DELETE_NODES_CYPHER[label], law=law_key, rows=deleted).consume()
+            if changed:
+                tx.run(DELETE_PARENT_EDGES_CYPHER[label], rows=changed).consume()
+                tx.run(NODE_CYPHER[label], rows=changed).consume()
+
+            upserted.update((label,) + tuple(row[k] for k in keys) for row in changed)
+            stats["deleted"] += len(deleted)
+            stats["inserted"] += sum(1 for row in changed if tuple(row[k] for k in keys) not in old)
+            stats["updated"] += sum(1 for row in changed if tuple(row[k] for k in keys) in old)
+
+        # 2. Hierarchy edges of the upserted nodes
+        for edge, rows in edges.items():
+            if edge[1] == "REFERS_TO":
+                continue
+            rows = [row for row in rows if LawGraphImporter._edge_end(edge, row) in upserted]
+            if rows:
+                tx.run(EDGE_CYPHER[edge], rows=rows).consume()
+
+        # 3. REFERS_TO edges
+        old_refs = {
+            (record["dieu_number"], record["ref_number"])
+            for record in tx.run(READ_REFS_CYPHER, law=law_key)
+        }
+        new_refs = {
+            (row["dieu_number"], row["ref_number"]): row
+            for row in edges[("Dieu", "REFERS_TO", "Dieu")]
+        }
+        removed = [{"dieu_number": a, "ref_number": b}
+                   for a, b in old_refs if (a, b) not in new_refs]
+        added = [row for key, row in new_refs.items() if key not in old_refs]
+        if removed:
+            tx.run(DELETE_REFS_CYPHER, law=law_key, rows=removed).consume()
+        if added:
+            tx.run(EDGE_CYPHER[("Dieu", "REFERS_TO", "Dieu")], rows=added).consume()
+        stats["refs_added"] = len(added)
+        stats["refs_removed"] = len(removed)
+        return stats
 
     @staticmethod
-    def rel_muc_to_dieu(tx, law, chap, muc_title, dieu_title, rel):
-        tx.run(f"""MATCH (m:Muc {{law:$l,parent:$c,title:$m}}),
-                          (d:Dieu {{law:$l,parent:$c,title:$d}})
-                   MERGE (m)-[:{rel}]->(d)""", l=law, c=chap, m=muc_title, d=dieu_title)
-
+    def _edge_end(edge, row):
+        """
+        Returns the (label, *key) of the end node of a hierarchy edge row.
+        """
+        end_label = edge[2]
+        if end_label == "Chapter":
+            return ("Chapter", row["chapter"])
+        if end_label == "Dieu":
+            return ("Dieu", row["chapter"], row["dieu_number"])
+        return (end_label, row["chapter"], row["title"])
+
+    def write_law(self, law_key, law_data):
+        """
+        Writes the nodes, then the edges of one law. Returns the number of rows.
+        """
+        nodes, edges = self.flatten_law(law_key, law_data)
+        count = 0
+        with self.driver.session() as ses:
+            for label, rows in nodes.items():
+                count += self.write_rows(ses, NODE_CYPHER[label], rows)
+            for edge, rows in edges.items():
+                count += self.write_rows(ses, EDGE_CYPHER[edge], rows)
+        print(f"[{law_key}] " + ", ".join(
+            [f"{label}: {len(rows)}" for label, rows in nodes.items()]
+            + [f"{edge[1]}: {len(rows)}" for edge, rows in edges.items() if rows]
+        ))
+        return count
+
+    def write_rows(self, ses, query, rows):
+        for i in range(0, len(rows), self.batch_size):
+            batch = rows[i:i + self.batch_size]
+            ses.execute_write(lambda tx: tx.run(query, rows=batch).consume())
+        return len(rows)
+
+    # ---------- neo4j-admin CSV export ----------
     @staticmethod
-    def rel_tieumuc_to_tieumuc(tx, law, chap, parent_tm, child_tm, rel):
-        tx.run(f"""MATCH (p:TieuMuc {{law:$l,parent:$c,title:$p}}),
-                          (ch:TieuMuc {{law:$l,parent:$c,title:$ch}})
-                   MERGE (p)-[:{rel}]->(ch)""", l=law, c=chap, p=parent_tm, ch=child_tm)
+    def _node_id(label, row):
+        if label == "Root":
+            key = (row["title"],)
+        elif label == "Law":
+            key = (row["key"],)
+        elif label == "Chapter":
+            key = (row["law"], row["key"])
+        elif label == "Dieu":
+            key = (row["law"], row["parent"], row["dieu_number"])
+        else:
+            key = (row["law"], row["parent"], row["title"])
+        return "|".join((label,) + key)
+
+    @classmethod
+    def _edge_ids(cls, edge, row):
+        start_label, rel, end_label = edge
+        law, chap = row["law"], row.get("chapter")
+        if start_label == "Law":
+            start = cls._node_id("Law", {"key": law})
+        elif start_label == "Chapter":
+            start = cls._node_id("Chapter", {"law": law, "key": chap})
+        elif start_label == "Dieu":
+            start = cls._node_id("Dieu", {"law": law, "parent": chap, "dieu_number": row["dieu_number"]})
+        else:
+            start = cls._node_id(start_label, {"law": law, "parent": chap, "title": row["parent_title"]})
+
+        if end_label == "Chapter":
+            end = cls._node_id("Chapter", {"law": law, "key": chap})
+        elif rel == "REFERS_TO":
+            end = cls._node_id("Dieu", {"law": law, "parent": row["ref_chapter"], "dieu_number": row["ref_number"]})
+        elif end_label == "Dieu":
+            end = cls._node_id("Dieu", {"law": law, "parent": chap, "dieu_number": row["dieu_number"]})
+        else:
+            end = cls._node_id(end_label, {"law": law, "parent": chap, "title": row["title"]})
+        return start, end
+
+    def export_csv(self, out_dir):
+        """
+        Writes node and relationship CSVs for `neo4j-admin database import full`,
+        for cold-start loads into an empty database.
+        """
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        root = self.data.get("Luat", {})
+        root_title = root.get("title", "Luật Việt Nam")
+        root_id = self._node_id("Root", {"title": root_title})
+
+        # Rows are keyed by node id so that nodes sharing a MERGE key are written once
+        node_rows = {"Root": {root_id: {"title": root_title}}, "Law": {}}
+        node_rows.update({label: {} for label in NODE_CYPHER})
+        rel_rows = {"HAS_LAW": {}}
+
+        for law_key, law_data in self.laws():
+            law = {"key": law_key, "title": law_data.get("title", law_key)}
+            law_id = self._node_id("Law", law)
+            node_rows["Law"][law_id] = law
+            rel_rows["HAS_LAW"][(root_id, law_id)] = None
+
+            nodes, edges = self.flatten_law(law_key, law_data)
+            for label, rows in nodes.items():
+                for row in rows:
+                    node_rows[label][self._node_id(label, row)] = row
+            for edge, rows in edges.items():
+                for row in rows:
+                    rel_rows.setdefault(edge[1], {})[self._edge_ids(edge, row)] = None
+
+        for label, rows in node_rows.items():
+            fields = list(next(iter(rows.values()), {}))
+            with open(out / f"nodes_{label}.csv", "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["id:ID", *fields, ":LABEL"])
+                for node_id, row in rows.items():
+                    writer.writerow([node_id, *[row[k] for k in fields], label])
+
+        for rel, pairs in rel_rows.items():
+            with open(out / f"rels_{rel}.csv", "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow([":START_ID", ":END_ID", ":TYPE"])
+                for start, end in pairs:
+                    writer.writerow([start, end, rel])
+
+        args = " ".join(
+            [f"--nodes={out / f'nodes_{label}.csv'}" for label in node_rows]
+            + [f"--relationships={out / f'rels_{rel}.csv'}" for rel in rel_rows]
+        )
+        print("Import into an empty database with:\n"
+              f"  neo4j-admin database import full --multiline-fields=true {args} neo4j\n"
+              "then run this script with --indexes-only to create the indexes.")
 
-    @staticmethod
-    def rel_tieumuc_to_dieu(tx, law, chap, tm_title, dieu_title, rel):
-        tx.run(f"""MATCH (t:TieuMuc {{law:$l,parent:$c,title:$tm}}),
-                          (d:Dieu {{law:$l,parent:$c,title:$d}})
-                   MERGE (t)-[:{rel}]->(d)""", l=law, c=chap, tm=tm_title, d=dieu_title)
+    def close(self):
+        self.driver.close()
 
+    # --- ROOT / LAW ---
     @staticmethod
-    def rel_dieu_to_dieu(tx, law, article_number, ref_number, rel):
-        print(f"[REFERS_TO] {article_number} -> {ref_number} (Law: {law})")
-        tx.run(f"""MATCH (a:Dieu {{dieu_number:$a, law:$l}}),
-                          (b:Dieu {{dieu_number:$b, law:$l}})
-                   MERGE (a)-[:{rel}]->(b)""", a=article_number, b=ref_number, l=law)
+    def create_root_and_laws(tx, root_title, laws):
+        tx.run("""MERGE (r:Root {title: $t})
+                  WITH r
+                  UNWIND $laws AS law
+                  MERGE (l:Law {key: law.key}) SET l.title = law.title
+                  MERGE (r)-[:HAS_LAW]->(l)""", t=root_title, laws=laws)
 
 
 if __name__ == "__main__":
-    uri = "bolt://localhost:7687"
-    # user = "neo4j"
-    # password = "factories-class-researcher"
-    json_file = "/home/student/nhienht-DE170295/legalhelper-project/vietnamese-law-bot/data/chung.json"
-
-    imp = LawGraphImporter(uri, json_file)
-    imp.import_data()
+    parser = argparse.ArgumentParser(description="Import chung.json into the law graph.")
+    parser.add_argument("--uri", default="bolt://localhost:7687")
+    parser.add_argument("--json", default=str(Path(__file__).parent / "chung.json"))
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--csv", metavar="DIR",
+                        help="write CSVs for neo4j-admin database import instead of importing")
+    parser.add_argument("--indexes-only", action="store_true",
+                        help="only create the indexes (after a neo4j-admin import)")
+    parser.add_argument("--sync", action="store_true",
+                        help="apply only the changes between the JSON and the graph")
+    args = parser.parse_args()
+
+    imp = LawGraphImporter(args.uri, args.json, batch_size=args.batch_size)
+    if args.csv:
+        imp.export_csv(args.csv)
+    elif args.indexes_only:
+        imp.create_indexes()
+    elif args.sync:
+        imp.sync_data()
+    else:
+        imp.import_data()
     imp.close()
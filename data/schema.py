@@ -0,0 +1,227 @@
+# Versioned schema (constraints and indexes) of the two graph models
+#
+#   python schema.py apply [--model civil|law]   create what is missing
+#   python schema.py status                      applied version of each model
+#   python schema.py check                       EXPLAIN every production query
+#
+# tests/test_query_plans.py runs the check against the graph at $NEO4J_TEST_URI.
+#
+# "civil" is the BOOK/CHAPTER/ARTICLE model written by migrate.py and read by
+# src/; "law" is the Root/Law/Chapter/Muc/TieuMuc/Dieu model written by
+# nhien_migrate.py and read by src_nhien/. Both importers apply their model
+# before loading, and every statement is IF NOT EXISTS, so applying twice (or
+# against a graph whose SchemaVersion node was lost) is harmless.
+
+from neo4j import GraphDatabase
+from pathlib import Path
+import argparse
+import ast
+import re
+import sys
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Full-text index used by the keyword retrieval in src_nhien/query_generator.py.
+# "standard-no-stop-words" splits Vietnamese text into syllables and lowercases
+# it while keeping the diacritics, and does not drop English stop words such as
+# "an" or "to" that are also Vietnamese syllables.
+CREATE_FULLTEXT_INDEX_CYPHER = """
+CREATE FULLTEXT INDEX dieu_fulltext IF NOT EXISTS
+FOR (d:Dieu) ON EACH [d.title, d.content]
+OPTIONS {indexConfig: {`fulltext.analyzer`: 'standard-no-stop-words'}}
+"""
+
+# --- MIGRATIONS --- (version, description, statements) of every model, in order.
+# Append a new version rather than editing an applied one.
+MIGRATIONS = {
+    "civil": [
+        (1, "unique names of books, chapters and articles", [
+            "CREATE CONSTRAINT book_name IF NOT EXISTS FOR (b:BOOK) REQUIRE b.name IS UNIQUE",
+            "CREATE CONSTRAINT chapter_name IF NOT EXISTS FOR (c:CHAPTER) REQUIRE c.name IS UNIQUE",
+            "CREATE CONSTRAINT article_name IF NOT EXISTS FOR (a:ARTICLE) REQUIRE a.name IS UNIQUE",
+        ]),
+    ],
+    "law": [
+        # Backing the MATCH/MERGE lookups of the batched writes
+        (1, "lookup indexes of the batched writes", [
+            "CREATE INDEX root_title IF NOT EXISTS FOR (r:Root) ON (r.title)",
+            "CREATE INDEX law_key IF NOT EXISTS FOR (l:Law) ON (l.key)",
+            "CREATE INDEX chapter_law_key IF NOT EXISTS FOR (c:Chapter) ON (c.law, c.key)",
+            "CREATE INDEX muc_law_parent_title IF NOT EXISTS FOR (m:Muc) ON (m.law, m.parent, m.title)",
+            "CREATE INDEX tieumuc_law_parent_title IF NOT EXISTS FOR (t:TieuMuc) ON (t.law, t.parent, t.title)",
+            "CREATE INDEX dieu_law_number IF NOT EXISTS FOR (d:Dieu) ON (d.law, d.dieu_number)",
+        ]),
+        (2, "full-text index of the keyword retrieval", [CREATE_FULLTEXT_INDEX_CYPHER]),
+    ],
+}
+
+SCHEMA_VERSION_CONSTRAINT_CYPHER = (
+    "CREATE CONSTRAINT schema_version_model IF NOT EXISTS "
+    "FOR (s:SchemaVersion) REQUIRE s.model IS UNIQUE")
+READ_VERSION_CYPHER = "MATCH (s:SchemaVersion {model: $model}) RETURN s.version AS version"
+SET_VERSION_CYPHER = """MERGE (s:SchemaVersion {model: $model})
+SET s.version = $version, s.description = $description, s.applied_at = datetime()"""
+
+# --- CHECK --- modules holding the production queries of every model, as
+# module-level *_QUERY / *_CYPHER string constants (or dicts/lists of them)
+QUERY_MODULES = {
+    "civil": ["src/graph/neo4j_backend.py", "data/migrate.py"],
+    "law": ["src_nhien/graph_backend.py", "src_nhien/query_generator.py", "data/nhien_migrate.py"],
+}
+# Queries that scan a label on purpose, and why
+ALLOWED_SCANS = {
+    "civil": {
+        "CHAPTERS_QUERY": "lists every chapter",
+        "REFERENCE_GRAPH_QUERY": "loads the whole reference graph",
+        "CORPUS_VERSION_QUERY": "reads the single BOOK node",
+    },
+    "law": {
+        "CORPUS_VERSION_QUERY": "reads the single Root node",
+        "REFERENCE_GRAPH_QUERY": "loads the whole reference graph",
+        "DELETE_LAWS_CYPHER": "filters the few Law nodes with NOT IN",
+    },
+}
+SCAN_OPERATORS = ("AllNodesScan", "NodeByLabelScan")
+PARAMETER = re.compile(r"\$(\w+)")
+# EXPLAIN plans without running, but still expects every parameter; they are
+# null unless the planner needs a valid value (the full-text call of
+# query_generator.KEYWORD_QUERY needs all of its own)
+PARAMETER_SAMPLES = {
+    "limit": 1,
+    "index": "dieu_fulltext",
+    "search": 'title:"tài sản"^2 OR content:"tài sản"',
+    "law": "luat dan su",
+}
+# Schema statements have no plan; procedure calls such as the full-text
+# search of the keyword retrieval do
+SCHEMA_STATEMENT = re.compile(
+    r"^\s*(?:(?:CREATE|DROP)\s+(?:\w+\s+){0,2}?(?:INDEX|CONSTRAINT)\b|CALL\s+db\.awaitIndexes\b)",
+    re.IGNORECASE,
+)
+
+
+def current_version(session, model: str) -> int:
+    record = session.run(READ_VERSION_CYPHER, model=model).single()
+    return record["version"] if record and record["version"] is not None else 0
+
+
+def apply_schema(session, model: str) -> list[int]:
+    """Apply the migrations of `model` newer than its recorded version; return the applied versions."""
+    session.run(SCHEMA_VERSION_CONSTRAINT_CYPHER).consume()
+    version = current_version(session, model)
+    applied = []
+    for number, description, statements in MIGRATIONS[model]:
+        if number <= version:
+            continue
+        for query in statements:
+            session.run(query).consume()
+        session.run(SET_VERSION_CYPHER, model=model, version=number,
+                    description=description).consume()
+        print(f"Schema {model}: applied v{number} ({description})")
+        applied.append(number)
+    # Population of new indexes runs in the background
+    session.run("CALL db.awaitIndexes()").consume()
+    return applied
+
+
+def _literal_queries(name: str, value) -> dict[str, str]:
+    if isinstance(value, str):
+        return {name: value}
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, (list, tuple)):
+        items = enumerate(value)
+    else:
+        return {}
+    return {f"{name}[{key!r}]": query for key, query in items if isinstance(query, str)}
+
+
+def production_queries(model: str) -> dict[str, str]:
+    """Module-level query constants of the modules of `model`, by qualified name.
+
+    The modules are read with `ast` rather than imported, so that the check
+    does not need the API configuration; constants built by comprehensions
+    (the sync queries of nhien_migrate.py) are rendered by importing the
+    data scripts, which have no import-time side effects. A query of the
+    APIs that is not a literal cannot be checked, and raises ValueError.
+    """
+    queries = {}
+    for path in QUERY_MODULES[model]:
+        tree = ast.parse((ROOT / path).read_text(encoding="utf-8"))
+        module = Path(path).stem
+        for node in tree.body:
+            if not (isinstance(node, ast.Assign) and len(node.targets) == 1
+                    and isinstance(node.targets[0], ast.Name)):
+                continue
+            name = node.targets[0].id
+            if not name.endswith(("_QUERY", "_CYPHER")):
+                continue
+            try:
+                value = ast.literal_eval(node.value)
+            except ValueError:
+                if not path.startswith("data/"):
+                    raise ValueError(
+                        f"{path}: {name} is built at runtime, make it a literal "
+                        "so that its plan can be checked") from None
+                value = getattr(__import__(module), name)
+            for qualified, query in _literal_queries(name, value).items():
+                queries[f"{module}.{qualified}"] = query
+    return queries
+
+
+def _scans(plan) -> list[str]:
+    operator = plan["operatorType"].split("@")[0]
+    found = [operator] if operator.startswith(SCAN_OPERATORS) else []
+    for child in plan.get("children", []):
+        found += _scans(child)
+    return found
+
+
+def check_plans(session, model: str) -> list[str]:
+    """EXPLAIN every production query of `model`; return the unexpected label/all-nodes scans."""
+    failures = []
+    for name, query in production_queries(model).items():
+        if SCHEMA_STATEMENT.match(query):
+            continue
+        base_name = name.split(".", 1)[1].split("[", 1)[0]
+        params = {p: PARAMETER_SAMPLES.get(p) for p in PARAMETER.findall(query)}
+        plan = session.run(f"EXPLAIN {query}", **params).consume().plan
+        scans = _scans(plan)
+        if scans and base_name not in ALLOWED_SCANS[model]:
+            failures.append(f"{name}: {', '.join(scans)}")
+        status = "SCAN" if scans else "ok"
+        if scans and base_name in ALLOWED_SCANS[model]:
+            status = f"scan allowed ({ALLOWED_SCANS[model][base_name]})"
+        print(f"  {name}: {status}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the schema of the graph models.")
+    parser.add_argument("command", choices=["apply", "status", "check"])
+    parser.add_argument("--uri", default="bolt://localhost:7687")
+    parser.add_argument("--model", choices=list(MIGRATIONS), action="append",
+                        help="model to manage (default: all)")
+    args = parser.parse_args()
+    models = args.model or list(MIGRATIONS)
+
+    db = GraphDatabase.driver(args.uri)
+    failures = []
+    with db.session() as session:
+        for model in models:
+            if args.command == "apply":
+                apply_schema(session, model)
+            elif args.command == "status":
+                print(f"{model}: v{current_version(session, model)} "
+                      f"(latest v{MIGRATIONS[model][-1][0]})")
+            else:
+                print(f"{model}:")
+                failures += check_plans(session, model)
+    db.close()
+
+    if failures:
+        print("Label or all-nodes scans where an index seek is expected:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
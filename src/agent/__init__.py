@@ -1,14 +1,33 @@
-from llama_index.core.llms import ChatMessage
-from llama_index.core.agent.workflow import ReActAgent
-from llama_index.core.workflow import Context
+import os
+import asyncio
+import weakref
+from contextlib import nullcontext
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core.agent.workflow import (
+    ReActAgent,
+    AgentStream,
+    ToolCall,
+    ToolCallResult
+)
+from llama_index.core.workflow import Context, JsonSerializer
 from agent.prompt import SYSTEM_PROMPT
+from agent.answer_cache import create_answer_cache
+from agent.citations import cited_articles, format_context, parse_citations
+from agent.history import HistoryCompactor
+from agent.sessions import SessionStore, UnknownSession
 from agent.tools import (
+    tool_cache,
+    get_articles_content,
+    get_articles_content_and_references,
     get_chapters_tool,
     get_articles_tool,
     get_articles_content_and_references_tool,
     get_articles_content_tool
 )
 from configs.gemini import model
+from metrics import FAST_PATH, debug_logger, instrument_llm, sampled
 from agent.models import *
 
 
@@ -19,6 +38,53 @@ agent_configs = {
     "llm": model
 }
 
+# SQLite files of the answer cache and sessions, created on first use
+STATE_DIR = Path(os.getenv("STATE_DIR", Path(__file__).resolve().parents[1] / "state"))
+
+# "memory", "sqlite" or "off"
+answer_cache = create_answer_cache(
+    backend=os.getenv("ANSWER_CACHE_BACKEND", "memory"),
+    path=os.getenv("ANSWER_CACHE_PATH", str(STATE_DIR / "answer_cache.sqlite3")),
+    maxsize=int(os.getenv("ANSWER_CACHE_MAXSIZE", "1024")),
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.85")),
+)
+
+
+async def summarize(prompt: str) -> str:
+    return (await model.acomplete(prompt)).text
+
+
+# Older turns are folded into a rolling summary; tokens of history by plan
+history_compactor = HistoryCompactor(
+    summarize,
+    keep_turns=int(os.getenv("HISTORY_KEEP_TURNS", "3")),
+    summary_tokens=int(os.getenv("HISTORY_SUMMARY_TOKENS", "300")),
+    cache_size=int(os.getenv("HISTORY_SUMMARY_CACHE_SIZE", "4096")),
+)
+HISTORY_TOKEN_LIMITS = {
+    PlanType.FREE: int(os.getenv("HISTORY_TOKEN_LIMIT_FREE", "1000")),
+    PlanType.PRO: int(os.getenv("HISTORY_TOKEN_LIMIT_PRO", "3000")),
+}
+
+# Articles cited in a question ("Điều 651 quy định gì?") are fetched before
+# the agent runs, with references up to the depth of the plan (0 for none)
+CITATION_MAX_ARTICLES = int(os.getenv("CITATION_MAX_ARTICLES", "5"))
+CITATION_REFERENCE_DEPTHS = {
+    PlanType.FREE: int(os.getenv("CITATION_REFERENCE_DEPTH_FREE", "0")),
+    PlanType.PRO: int(os.getenv("CITATION_REFERENCE_DEPTH_PRO", "1")),
+}
+
+# Record the LLM calls (ReAct steps and summaries) in the metrics
+instrument_llm()
+# Share of the requests whose agent memory is logged, 0 to disable
+DEBUG_SAMPLE_RATE = float(os.getenv("DEBUG_SAMPLE_RATE", "0"))
+
+# Server-side conversations (`session_id`), expired after SESSION_TTL seconds idle
+session_store = SessionStore(
+    path=os.getenv("SESSION_STORE_PATH", str(STATE_DIR / "sessions.sqlite3")),
+    ttl=float(os.getenv("SESSION_TTL", "86400")),
+)
+
 
 class Agents:
     def __init__(self):
@@ -42,33 +108,239 @@ class Agents:
             ]
         )
 
-    async def chat(
-        self,
-        question: str,
-        histories: list[ChatHistoryItem] = [],
-        plan_type: PlanType = PlanType.FREE,
-    ) -> str:
-        # 1. Get the agent based on the plan type
-        agent = self.free_agent if plan_type == PlanType.FREE else self.pro_agent
+        # One turn at a time per session
+        self._session_locks = weakref.WeakValueDictionary()
+
+    def _session_lock(self, session_id: Optional[str]):
+        if session_id is None:
+            return nullcontext()
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = self._session_locks[session_id] = asyncio.Lock()
+        return lock
 
-        # 2. Construct the histories
+    async def _compact(
+        self,
+        histories: list[ChatHistoryItem],
+        plan_type: PlanType,
+    ) -> list[ChatMessage]:
+        """Chat messages of the history, older turns summarized."""
+        summary, recent = await history_compactor.compact(
+            histories, HISTORY_TOKEN_LIMITS[plan_type])
         chat_histories = []
-        for history in histories:
+        if summary:
+            chat_histories.append(
+                ChatMessage(
+                    role=MessageRole.USER,
+                    content=f"Tóm tắt cuộc trò chuyện trước đó: {summary}"
+                )
+            )
+        for history in recent:
             chat_histories.append(
                 ChatMessage(
                     role=history.role,
                     content=history.content.strip()
                 )
             )
+        return chat_histories
+
+    async def _prepare(
+        self,
+        histories: list[ChatHistoryItem],
+        plan_type: PlanType,
+        session_id: Optional[str] = None,
+    ) -> tuple[ReActAgent, list[ChatMessage], Context]:
+        # 1. Get the agent based on the plan type
+        agent = self.free_agent if plan_type == PlanType.FREE else self.pro_agent
+
+        # 2. Resume the context of a session with its compacted history,
+        # which includes the tool results of earlier turns
+        if session_id is not None:
+            session = await session_store.aget(session_id)
+            if session is None:
+                raise UnknownSession(session_id)
+            if session["context"] is not None:
+                chat_histories = [ChatMessage(**message) for message in session["history"]]
+                if session["plan_type"] == plan_type.value:
+                    ctx = Context.from_dict(
+                        agent, session["context"], serializer=JsonSerializer())
+                else:
+                    # The plan changed (an upgrade): the context belongs to the
+                    # other agent, the conversation carries over
+                    ctx = Context(agent)
+                return agent, chat_histories, ctx
 
-        # 3. Create a context for the agent
+        # 3. Construct the histories (the first turn of a session may seed it)
+        chat_histories = await self._compact(histories, plan_type)
+
+        # 4. Create a context for the agent
         ctx = Context(agent)
 
-        # 4. Call the agent to get the response
-        response = await agent.run(question, chat_history=chat_histories, ctx=ctx)
+        return agent, chat_histories, ctx
+
+    async def _prefetch_citations(
+        self,
+        question: str,
+        plan_type: PlanType,
+    ) -> Optional[ChatMessage]:
+        """Contents of the articles cited in the question, so that the agent
+        answers without the chapters, articles and contents tool chain."""
+        citations = parse_citations(question)
+        names = cited_articles(citations, CITATION_MAX_ARTICLES)
+        if not names:
+            return None
+
+        # One query for the articles and their references
+        depth = CITATION_REFERENCE_DEPTHS[plan_type]
+        if depth > 0:
+            articles = await get_articles_content_and_references(
+                article_names=names, depth=depth)
+        else:
+            articles = await get_articles_content(article_names=names)
+
+        FAST_PATH.inc(plan_type=plan_type.value,
+                      outcome="prefetched" if articles else "not_found")
+        if not articles:
+            return None
+        return ChatMessage(
+            role=MessageRole.USER,
+            content=format_context(articles, citations)
+        )
+
+    async def _save_session(
+        self,
+        session_id: str,
+        plan_type: PlanType,
+        ctx: Context,
+    ) -> None:
+        """Persist the context and the compacted memory of a session for the next turn."""
+        # The memory is not part of the serialized context
+        memory = await ctx.get("memory")
+        messages = [
+            ChatHistoryItem(role=message.role, content=message.content or "")
+            for message in await memory.aget_all()
+        ]
+        history = [
+            {"role": message.role.value, "content": message.content}
+            for message in await self._compact(messages, plan_type)
+        ]
+
+        # The event logs of the finished runs would grow with every turn
+        context = ctx.to_dict(serializer=JsonSerializer())
+        context["broker_log"] = []
+        context["accepted_events"] = []
+        await session_store.aset(session_id, plan_type.value, context, history)
+
+    async def _log_memory(self, ctx: Context) -> None:
+        """Log the agent memory of a sample of the requests (DEBUG_SAMPLE_RATE)."""
+        if not sampled(DEBUG_SAMPLE_RATE):
+            return
+        memory = await ctx.get("memory")
+        for message in await memory.aget_all():
+            debug_logger.info("%s: %s", message.role.value, message.content)
+
+    async def _cached_answer(
+        self,
+        question: str,
+        histories: list[ChatHistoryItem],
+        plan_type: PlanType,
+    ) -> str | None:
+        """Answer of an already answered (or near-duplicate) question, if any."""
+        if answer_cache is None:
+            return None
+        await tool_cache.check_version()
+        return await answer_cache.aget(question, histories, plan_type, tool_cache.version)
+
+    async def _cache_answer(
+        self,
+        question: str,
+        histories: list[ChatHistoryItem],
+        plan_type: PlanType,
+        answer: str,
+    ) -> None:
+        if answer_cache is not None and answer:
+            await answer_cache.aset(question, histories, plan_type,
+                                    tool_cache.version, answer)
+
+    async def chat(
+        self,
+        question: str,
+        histories: list[ChatHistoryItem] = [],
+        plan_type: PlanType = PlanType.FREE,
+        session_id: Optional[str] = None,
+    ) -> str:
+        # The history of a session is server-side, so its answers are not cached
+        if session_id is None:
+            cached = await self._cached_answer(question, histories, plan_type)
+            if cached is not None:
+                return cached
+
+        async with self._session_lock(session_id):
+            agent, chat_histories, ctx = await self._prepare(
+                histories, plan_type, session_id)
+            cited = await self._prefetch_citations(question, plan_type)
+            if cited is not None:
+                chat_histories.append(cited)
+
+            # 5. Call the agent to get the response
+            response = await agent.run(question, chat_history=chat_histories, ctx=ctx)
+
+            await self._log_memory(ctx)
+            answer = str(response).strip()
+            if session_id is None:
+                await self._cache_answer(question, histories, plan_type, answer)
+            else:
+                await self._save_session(session_id, plan_type, ctx)
+        return answer
+
+    async def stream_chat(
+        self,
+        question: str,
+        histories: list[ChatHistoryItem] = [],
+        plan_type: PlanType = PlanType.FREE,
+        session_id: Optional[str] = None,
+    ) -> AsyncIterator[dict]:
+        """Run the agent and yield tool-call progress and answer tokens as they come."""
+        if session_id is None:
+            cached = await self._cached_answer(question, histories, plan_type)
+            if cached is not None:
+                yield {"type": "answer", "content": cached, "cached": True}
+                return
+
+        async with self._session_lock(session_id):
+            agent, chat_histories, ctx = await self._prepare(
+                histories, plan_type, session_id)
+            cited = await self._prefetch_citations(question, plan_type)
+            if cited is not None:
+                chat_histories.append(cited)
+            handler = agent.run(question, chat_history=chat_histories, ctx=ctx)
 
-        # DEBUG: Print context
-        for c in ctx.data['memory'].chat_store.store['chat_history']:
-            print("\033[90m", c.content, "\033[0m")
+            # Only the text after "Answer:" of a ReAct step is part of the answer
+            emitted = 0
+            async for event in handler.stream_events():
+                if isinstance(event, ToolCallResult):
+                    yield {"type": "tool_result", "tool": event.tool_name}
+                elif isinstance(event, ToolCall):
+                    yield {
+                        "type": "tool_call",
+                        "tool": event.tool_name,
+                        "arguments": event.tool_kwargs
+                    }
+                elif isinstance(event, AgentStream):
+                    _, found, answer = event.response.partition("Answer:")
+                    if not found:
+                        emitted = 0
+                        continue
+                    answer = answer.lstrip()
+                    if len(answer) > emitted:
+                        yield {"type": "token", "content": answer[emitted:]}
+                        emitted = len(answer)
 
-        return str(response).strip()
+            response = await handler
+            await self._log_memory(ctx)
+            answer = str(response).strip()
+            if session_id is None:
+                await self._cache_answer(question, histories, plan_type, answer)
+            else:
+                await self._save_session(session_id, plan_type, ctx)
+        yield {"type": "answer", "content": answer, "session_id": session_id}
@@ -0,0 +1,409 @@
+import re
+import json
+import asyncio
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+NUMBER_PATTERN = re.compile(r"\d+")
+# Words that flip the meaning of a question while barely changing its shingles
+NEGATIONS = frozenset({"không", "chưa", "chẳng", "chả", "đừng", "chớ"})
+# Legal concepts of a question: swapping one ("mất tích" for "chết") changes
+# the articles that answer it, however similar the rest of the wording
+LEGAL_TERMS = (
+    # Persons and family
+    "mất tích", "chết", "mất năng lực hành vi", "hạn chế năng lực hành vi",
+    "giám hộ", "kết hôn", "ly hôn", "con nuôi", "con đẻ", "cấp dưỡng",
+    # Inheritance
+    "thừa kế", "di chúc", "di sản", "từ chối nhận di sản",
+    # Property and obligations
+    "sở hữu", "chiếm hữu", "quyền sử dụng đất", "nhà ở", "hợp đồng", "mua bán",
+    "cho thuê", "thuê", "cho vay", "vay", "tặng cho", "trao đổi", "gửi giữ",
+    "ủy quyền", "vận chuyển", "bảo hiểm", "lãi suất", "phạt vi phạm",
+    "bồi thường", "vô hiệu", "hủy bỏ", "đơn phương chấm dứt", "thời hiệu",
+    # Security interests
+    "cầm cố", "thế chấp", "đặt cọc", "ký cược", "ký quỹ", "bảo lãnh",
+    "tín chấp", "cầm giữ", "bảo lưu quyền sở hữu",
+    # Offences and penalties
+    "trộm cắp", "cướp", "cưỡng đoạt", "lừa đảo", "lạm dụng tín nhiệm",
+    "chiếm đoạt", "gây thương tích", "giết người", "hiếp dâm", "ma túy",
+    "đánh bạc", "tham ô", "hối lộ", "án treo", "phạt tiền", "tù",
+)
+LEGAL_TERM_PATTERN = re.compile(
+    r"\b(?:" + "|".join(sorted(map(re.escape, LEGAL_TERMS), key=len, reverse=True)) + r")\b")
+
+# MinHash permutations h -> (a * h + b) mod p, fixed so that signatures stored
+# in SQLite stay comparable across processes
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(256)
+]
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase a question in NFC form and drop punctuation and extra spaces."""
+    text = unicodedata.normalize("NFC", text).lower()
+    return " ".join(TOKEN_PATTERN.findall(text))
+
+
+def shingles(text: str, k: int = 2) -> set[str]:
+    """Syllable k-grams of a normalized text ("tài sản", "sản cầm", ...)."""
+    words = text.split()
+    if len(words) <= k:
+        return {text} if text else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def minhash(items: Iterable[str], num_perm: int = 64) -> tuple[int, ...]:
+    """MinHash signature of a set of shingles."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "little")
+        for item in items
+    ]
+    if not hashes:
+        return ()
+    return tuple(
+        min((a * h + b) % _PRIME for h in hashes)
+        for a, b in _PERMUTATIONS[:num_perm]
+    )
+
+
+def similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def band_keys(signature: tuple[int, ...], bands: int) -> list[str]:
+    """LSH band keys: two signatures sharing one band are near-duplicate candidates."""
+    if not signature:
+        return []
+    rows = len(signature) // bands
+    return [
+        f"{i}:" + hashlib.blake2b(
+            repr(signature[i * rows:(i + 1) * rows]).encode(), digest_size=8).hexdigest()
+        for i in range(bands)
+    ]
+
+
+class AnswerStore(ABC):
+    """Size-bounded storage of the cached answers."""
+
+    # True if the store does blocking I/O, which the async methods of
+    # AnswerCache then run in a worker thread
+    blocking = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Answer stored under an exact key."""
+
+    @abstractmethod
+    def candidates(self, scope: str, bands: list[str]) -> list[tuple[tuple[int, ...], str]]:
+        """(signature, answer) of the entries of a scope sharing one of the bands."""
+
+    @abstractmethod
+    def put(self, key: str, scope: str, signature: tuple[int, ...], bands: list[str], answer: str) -> None:
+        """Store an answer, evicting the least recently used entries."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every entry."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class MemoryAnswerStore(AnswerStore):
+    """In-process LRU store."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[str, tuple[int, ...], list[str], str]] = OrderedDict()
+        self._bands: dict[tuple[str, str], set[str]] = {}
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[3]
+
+    def candidates(self, scope, bands):
+        keys = set()
+        for band in bands:
+            keys |= self._bands.get((scope, band), set())
+        return [(self._entries[key][1], self._entries[key][3]) for key in keys]
+
+    def put(self, key, scope, signature, bands, answer):
+        self._remove(key)
+        self._entries[key] = (scope, signature, bands, answer)
+        for band in bands:
+            self._bands.setdefault((scope, band), set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        scope, _, bands, _ = entry
+        for band in bands:
+            keys = self._bands.get((scope, band))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._bands[(scope, band)]
+
+    def clear(self):
+        self._entries.clear()
+        self._bands.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteAnswerStore(AnswerStore):
+    """Store kept in a local SQLite file, shared by the workers of a host."""
+
+    blocking = True
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS answers (
+            key TEXT PRIMARY KEY,
+            scope TEXT NOT NULL,
+            signature TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            used_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS answers_used_at ON answers (used_at)",
+        """CREATE TABLE IF NOT EXISTS answer_bands (
+            scope TEXT NOT NULL,
+            band TEXT NOT NULL,
+            key TEXT NOT NULL,
+            PRIMARY KEY (scope, band, key)
+        )""",
+        "CREATE INDEX IF NOT EXISTS answer_bands_key ON answer_bands (key)",
+    ]
+
+    def __init__(self, path: str, maxsize: int = 10000):
+        self.path = path
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Connection opened on first use, so that importing the app creates no file."""
+        with self._open_lock:
+            if self._connection is None:
+                if self.path != ":memory:":
+                    Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+                self._connection = conn
+            return self._connection
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE answers SET used_at = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def candidates(self, scope, bands):
+        if not bands:
+            return []
+        placeholders = ",".join("?" * len(bands))
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT DISTINCT a.signature, a.answer
+                FROM answer_bands b JOIN answers a ON a.key = b.key
+                WHERE b.scope = ? AND b.band IN ({placeholders})""",
+                (scope, *bands)).fetchall()
+        return [(tuple(json.loads(signature)), answer) for signature, answer in rows]
+
+    def put(self, key, scope, signature, bands, answer):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?)",
+                (key, scope, json.dumps(signature), answer, time.time()))
+            self._conn.execute("DELETE FROM answer_bands WHERE key = ?", (key,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO answer_bands VALUES (?, ?, ?)",
+                [(scope, band, key) for band in bands])
+
+            # Evict the least recently used entries above maxsize
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+            if size > self.maxsize:
+                evicted = [row[0] for row in self._conn.execute(
+                    "SELECT key FROM answers ORDER BY used_at LIMIT ?",
+                    (size - self.maxsize,))]
+                self._conn.executemany(
+                    "DELETE FROM answers WHERE key = ?", [(k,) for k in evicted])
+                self._conn.executemany(
+                    "DELETE FROM answer_bands WHERE key = ?", [(k,) for k in evicted])
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.execute("DELETE FROM answer_bands")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def close(self):
+        with self._open_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class AnswerCache:
+    """Final-answer cache with an exact tier and a MinHash near-duplicate tier.
+
+    Entries are scoped by plan type, corpus version, conversation history, the
+    numbers quoted in the question ("Điều 5" must never answer "Điều 6"), its
+    count of negations and its legal terms ("mất tích" must never answer
+    "chết"), so a near-duplicate hit only differs in wording.
+    """
+
+    def __init__(
+        self,
+        store: AnswerStore,
+        threshold: float = 0.85,
+        num_perm: int = 64,
+        bands: int = 16,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.store = store
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def history_fingerprint(histories: Iterable) -> str:
+        h = hashlib.sha256()
+        for item in histories:
+            h.update(f"{getattr(item.role, 'value', item.role)}:{normalize_question(item.content)}\n".encode("utf-8"))
+        return h.hexdigest()[:16]
+
+    def _keys(self, question, histories, plan_type, version) -> tuple[str, str, str]:
+        normalized = normalize_question(question)
+        scope = hashlib.sha256(json.dumps([
+            str(getattr(plan_type, "value", plan_type)),
+            version,
+            self.history_fingerprint(histories),
+            NUMBER_PATTERN.findall(normalized),
+            sum(word in NEGATIONS for word in normalized.split()),
+            sorted(set(LEGAL_TERM_PATTERN.findall(normalized))),
+        ]).encode("utf-8")).hexdigest()[:32]
+        key = hashlib.sha256(f"{scope}\n{normalized}".encode("utf-8")).hexdigest()
+        return normalized, scope, key
+
+    def _signature(self, normalized: str) -> tuple[tuple[int, ...], list[str]]:
+        signature = minhash(shingles(normalized), self.num_perm)
+        return signature, band_keys(signature, self.bands)
+
+    def get(self, question: str, histories: Iterable, plan_type, version) -> Optional[str]:
+        """Cached answer of the question (or of a near-duplicate of it)."""
+        normalized, scope, key = self._keys(question, histories, plan_type, version)
+
+        # 1. Exact tier
+        answer = self.store.get(key)
+        if answer is not None:
+            self.exact_hits += 1
+            return answer
+
+        # 2. Near-duplicate tier
+        signature, bands = self._signature(normalized)
+        best, best_score = None, self.threshold
+        for candidate, candidate_answer in self.store.candidates(scope, bands):
+            score = similarity(signature, candidate)
+            if score >= best_score:
+                best, best_score = candidate_answer, score
+        if best is not None:
+            self.near_hits += 1
+            return best
+
+        self.misses += 1
+        return None
+
+    def set(self, question: str, histories: Iterable, plan_type, version, answer: str) -> None:
+        normalized, scope, key = self._keys(question, histories, plan_type, version)
+        signature, bands = self._signature(normalized)
+        self.store.put(key, scope, signature, bands, answer)
+
+    def clear(self) -> None:
+        self.store.clear()
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.near_hits
+        total = hits + self.misses
+        return {
+            "backend": type(self.store).__name__,
+            "size": len(self.store),
+            "maxsize": self.store.maxsize,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+    async def aget(self, question: str, histories: Iterable, plan_type, version) -> Optional[str]:
+        """`get` for the event loop."""
+        if self.store.blocking:
+            return await asyncio.to_thread(self.get, question, histories, plan_type, version)
+        return self.get(question, histories, plan_type, version)
+
+    async def aset(self, question: str, histories: Iterable, plan_type, version, answer: str) -> None:
+        """`set` for the event loop."""
+        if self.store.blocking:
+            await asyncio.to_thread(self.set, question, histories, plan_type, version, answer)
+        else:
+            self.set(question, histories, plan_type, version, answer)
+
+    async def astats(self) -> dict:
+        """`stats` for the event loop."""
+        if self.store.blocking:
+            return await asyncio.to_thread(self.stats)
+        return self.stats()
+
+
+def create_answer_cache(
+    backend: str = "memory",
+    path: str = "answer_cache.sqlite3",
+    maxsize: int = 1024,
+    threshold: float = 0.85,
+) -> Optional[AnswerCache]:
+    """Build the answer cache for a backend name ("memory", "sqlite" or "off")."""
+    if backend == "off":
+        return None
+    if backend == "memory":
+        return AnswerCache(MemoryAnswerStore(maxsize), threshold=threshold)
+    if backend == "sqlite":
+        return AnswerCache(SQLiteAnswerStore(path, maxsize), threshold=threshold)
+    raise ValueError(f"Unknown answer cache backend: {backend}")
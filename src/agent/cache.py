@@ -0,0 +1,158 @@
+import time
+import inspect
+import functools
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def normalize_arg(value: Any) -> Hashable:
+    """Turn a tool argument into a hashable key, ignoring whitespace and duplicates."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, (list, tuple, set)):
+        return tuple(dict.fromkeys(normalize_arg(v) for v in value))
+    if isinstance(value, dict):
+        return tuple(sorted((k, normalize_arg(v)) for k, v in value.items()))
+    return value
+
+
+_CONTAINERS = (list, dict, tuple, set)
+
+
+def copy_result(value: Any) -> Any:
+    """Copy the lists, dicts and sets of a tool result; strings and numbers are shared."""
+    if isinstance(value, list):
+        return [copy_result(v) if isinstance(v, _CONTAINERS) else v for v in value]
+    if isinstance(value, dict):
+        return {k: copy_result(v) if isinstance(v, _CONTAINERS) else v for k, v in value.items()}
+    if isinstance(value, tuple):
+        return tuple(copy_result(v) for v in value)
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+class ToolCache(TTLCache):
+    """Read-through cache for the async agent tools.
+
+    The whole cache is dropped when the corpus version stamp written by the
+    migration changes. The stamp is re-read at most every `version_check_interval`
+    seconds so that steady-state lookups never touch the database.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        version_fn: Optional[Callable[[], Awaitable[Any]]] = None,
+        version_check_interval: float = 60,
+    ):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.version_fn = version_fn
+        self.version_check_interval = version_check_interval
+        self.version = None
+        self._version_checked_at = float("-inf")
+
+    async def check_version(self) -> None:
+        if self.version_fn is None:
+            return
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_interval:
+            return
+        self._version_checked_at = now
+
+        version = await self.version_fn()
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def stats(self) -> dict:
+        return {**super().stats(), "version": self.version}
+
+    def cached(self, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """Decorate an async tool so that its results are served from the cache.
+
+        Calls are keyed by their bound arguments, defaults applied, so that
+        positional and keyword calls share an entry. Callers get a copy of the
+        containers of the cached result, which they may modify.
+        """
+        signature = inspect.signature(fn)
+        names = tuple(signature.parameters)
+        defaults = {
+            name: param.default for name, param in signature.parameters.items()
+            if param.default is not param.empty
+        }
+        # Without *args, **kwargs or keyword-only parameters, binding is a dict merge
+        simple = all(
+            param.kind is param.POSITIONAL_OR_KEYWORD for param in signature.parameters.values())
+
+        def arguments(args: tuple, kwargs: dict) -> dict:
+            if simple and len(args) <= len(names):
+                merged = {**defaults, **dict(zip(names, args)), **kwargs}
+                if len(merged) == len(names) and not kwargs.keys() & names[:len(args)]:
+                    return merged
+            # Also raises TypeError for invalid calls
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return bound.arguments
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            await self.check_version()
+            key = (fn.__name__, normalize_arg(arguments(args, kwargs)))
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                value = await fn(*args, **kwargs)
+                self.set(key, value)
+            return copy_result(value)
+
+        return wrapper
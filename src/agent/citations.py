@@ -0,0 +1,174 @@
+import re
+import unicodedata
+from typing import NamedTuple, Optional
+
+
+CIVIL_LAW = "dân sự"
+CRIMINAL_LAW = "hình sự"
+OTHER_LAW = "khác"
+
+# Numbers followed by one of these are durations or amounts, not articles
+_NOT_ARTICLE = r"(?!\s*(?:năm|tháng|ngày|giờ|tuổi|lần|người|đồng|triệu|tỷ|%))"
+
+# [điểm a] [khoản 1, 2 [của]] Điều 650[, 651 và 652 | - 655 | đến Điều 655] [khoản 1]
+CITATION_PATTERN = re.compile(
+    r"(?:điểm\s+(?P<point>[a-zđ])\b\s*,?\s*)?"
+    r"(?:khoản\s+(?P<clauses>\d{1,3}(?:\s*(?:,|và)\s*\d{1,3})*)\s*,?\s*(?:của\s+)?)?"
+    r"\b(?:điều|đ\.)\s*(?P<first>\d{1,4})\b" + _NOT_ARTICLE +
+    r"(?P<rest>(?:\s*(?:,|và|hoặc|-|–|đến|tới)\s*(?:điều\s+)?\d{1,4}\b" + _NOT_ARTICLE + r")*)"
+    r"(?:\s*,?\s*khoản\s+(?P<clauses_after>\d{1,3}(?:\s*(?:,|và)\s*\d{1,3})*))?",
+    re.IGNORECASE,
+)
+_REST_PATTERN = re.compile(r"(,|và|hoặc|-|–|đến|tới)\s*(điều\s+)?(\d{1,4})", re.IGNORECASE)
+_RANGE_SEPARATORS = {"-", "–", "đến", "tới"}
+# Longest range expanded; longer ones such as "Điều 1 đến Điều 689" are
+# not citations to prefetch and are dropped with both their ends
+MAX_RANGE = 10
+
+# Words after "luật" that do not name a law: "luật sư", "luật này", "luật quy định"
+_NOT_LAW_NAME = (
+    "sư", "pháp", "gia", "lệ", "này", "đó", "nào", "hiện", "mới", "cũ", "quy", "định",
+    "về", "thì", "là", "có", "không", "và", "hoặc", "của", "cho", "trong", "nói", "chung",
+)
+LAW_PATTERN = re.compile(
+    r"(?P<civil>(?:bộ\s+)?luật\s+dân\s+sự|\bblds\b)"
+    r"|(?P<criminal>(?:bộ\s+)?luật\s+hình\s+sự|\bblhs\b)"
+    # "luật Đất đai", but not "pháp luật" or a "bộ luật" that is not one of the above
+    r"|(?<!pháp\s)(?<!bộ\s)\bluật\s+(?!(?:" + "|".join(_NOT_LAW_NAME) + r")\b)(?P<other>[^\W\d_])",
+    re.IGNORECASE,
+)
+
+
+class Citation(NamedTuple):
+    article: int
+    clauses: tuple[int, ...] = ()
+    point: Optional[str] = None
+    # CIVIL_LAW, CRIMINAL_LAW, OTHER_LAW or None if not said
+    law: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return f"Điều {self.article}"
+
+
+def _numbers(text: Optional[str]) -> tuple[int, ...]:
+    return tuple(int(number) for number in re.findall(r"\d+", text or ""))
+
+
+def _groups(match: re.Match) -> list[tuple[int, int, list[int]]]:
+    """Start, end and articles of the parts of a citation list.
+
+    "Điều 651 và Điều 173 BLHS" repeats the keyword, so it is two parts that
+    may belong to different laws; "Điều 650, 651 và 652" and ranges are one.
+    """
+    groups = [(match.start(), match.end("first"), [int(match.group("first"))])]
+    offset = match.start("rest")
+    for item in _REST_PATTERN.finditer(match.group("rest")):
+        separator, keyword, number = item.group(1).lower(), item.group(2), int(item.group(3))
+        start, _, articles = groups[-1]
+        if separator in _RANGE_SEPARATORS and articles and number > articles[-1]:
+            if number - articles[-1] <= MAX_RANGE:
+                articles.extend(range(articles[-1] + 1, number + 1))
+            else:
+                articles.pop()
+        elif keyword and separator not in _RANGE_SEPARATORS:
+            groups.append((offset + item.start(), offset + item.end(), [number]))
+            continue
+        else:
+            articles.append(number)
+        groups[-1] = (start, offset + item.end(), articles)
+    return groups
+
+
+def _laws(text: str) -> list[tuple[int, str]]:
+    """Start offset and law of every law named in the text."""
+    laws = []
+    for match in LAW_PATTERN.finditer(text):
+        if match.group("civil"):
+            law = CIVIL_LAW
+        elif match.group("criminal"):
+            law = CRIMINAL_LAW
+        else:
+            law = OTHER_LAW
+        laws.append((match.start(), law))
+    return laws
+
+
+def parse_citations(text: str) -> list[Citation]:
+    """Explicit article citations of a question, in order.
+
+    A citation belongs to the law named right after it ("Điều 173 Bộ luật
+    Hình sự", before the next citation), else to the only law named apart
+    from the citations ("Theo Bộ luật Hình sự, Điều 173 ..."), else to no
+    law in particular. Articles listed without repeating "Điều" share the
+    law named after the last one.
+    """
+    # Decomposed diacritics (macOS input) would not match the patterns
+    text = unicodedata.normalize("NFC", text)
+    parts = []
+    for match in CITATION_PATTERN.finditer(text):
+        groups = _groups(match)
+        for i, (start, end, articles) in enumerate(groups):
+            # Clauses before the list are of its first part, after it of its last
+            clauses = _numbers(match.group("clauses")) if i == 0 else ()
+            if i == len(groups) - 1:
+                clauses = clauses or _numbers(match.group("clauses_after"))
+                end = match.end()
+            point = match.group("point") if i == 0 else None
+            parts.append((start, end, articles, clauses, point.lower() if point else None))
+
+    laws = _laws(text)
+    attached = {}
+    for i, (_, end, *_) in enumerate(parts):
+        limit = parts[i + 1][0] if i + 1 < len(parts) else len(text)
+        following = [(start, law) for start, law in laws if end <= start < limit]
+        if following:
+            attached[i] = following[0]
+    unattached = {law for law in laws if law not in attached.values()}
+    named = {law for _, law in unattached}
+
+    citations = []
+    for i, (_, _, articles, clauses, point) in enumerate(parts):
+        if i in attached:
+            law = attached[i][1]
+        elif len(named) == 1:
+            law = next(iter(named))
+        else:
+            law = None
+        for article in articles:
+            citations.append(Citation(article, clauses, point, law))
+    return citations
+
+
+def cited_articles(citations: list[Citation], max_articles: int) -> list[str]:
+    """Names of the cited civil code articles (the corpus of the agent), deduplicated."""
+    names = [
+        citation.name for citation in citations
+        if citation.law in (None, CIVIL_LAW)
+    ]
+    return list(dict.fromkeys(names))[:max_articles]
+
+
+CONTEXT_PROMPT = """Nội dung các điều được trích dẫn trong câu hỏi, đã truy vấn từ cơ sở dữ liệu (không cần gọi lại công cụ cho các điều này):
+{articles}"""
+
+
+def format_context(articles: list[dict], citations: list[Citation]) -> str:
+    """Prefetched articles (tool results) as a message for the agent."""
+    clauses = {}
+    for citation in citations:
+        if citation.clauses:
+            clauses.setdefault(citation.name, set()).update(citation.clauses)
+
+    blocks = []
+    for article in articles:
+        block = article["content"]
+        name = block.split(":", 1)[0]
+        if name in clauses:
+            asked = ", ".join(str(clause) for clause in sorted(clauses[name]))
+            block = f"(Câu hỏi về khoản {asked})\n{block}"
+        references = article.get("references") or []
+        if references:
+            block += "\nCác điều tham chiếu:\n" + "\n".join(references)
+        blocks.append(block)
+    return CONTEXT_PROMPT.format(articles="\n\n".join(blocks))
@@ -0,0 +1,142 @@
+import json
+import asyncio
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+
+class UnknownSession(LookupError):
+    """A session id that the server did not issue, or whose session expired."""
+
+
+class SessionStore:
+    """Agent contexts and compacted histories of server-side conversations,
+    kept in a local SQLite file.
+
+    Session ids are random and issued by `create`; a turn with any other id is
+    rejected, so a conversation cannot be read by guessing its id. A session
+    expires `ttl` seconds after its last turn. Expired sessions are deleted
+    when another session is saved. The a-prefixed methods run their blocking
+    counterparts in a worker thread, for the async API.
+    """
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            plan_type TEXT NOT NULL,
+            context TEXT NOT NULL,
+            history TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)",
+    ]
+
+    def __init__(self, path: str = "sessions.sqlite3", ttl: float = 86400):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Connection opened on first use, so that importing the app creates no file."""
+        with self._open_lock:
+            if self._connection is None:
+                if self.path != ":memory:":
+                    Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+                self._connection = conn
+            return self._connection
+
+    def create(self, plan_type: str) -> str:
+        """Issue the id of a new session, without context until its first turn is saved."""
+        session_id = str(uuid.uuid4())
+        self.set(session_id, plan_type, None, [])
+        return session_id
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM sessions WHERE id = ? AND updated_at >= ?",
+                (session_id, time.time() - self.ttl)).fetchone() is not None
+
+    def get(self, session_id: str) -> Optional[dict]:
+        """Plan type, serialized context (None before the first turn) and history
+        messages of a live session."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT plan_type, context, history FROM sessions WHERE id = ? AND updated_at >= ?",
+                (session_id, time.time() - self.ttl)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        plan_type, context, history = row
+        return {
+            "plan_type": plan_type,
+            "context": json.loads(context),
+            "history": json.loads(history),
+        }
+
+    def set(self, session_id: str, plan_type: str, context: Optional[dict], history: list[dict]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)",
+                (session_id, plan_type, json.dumps(context, ensure_ascii=False),
+                 json.dumps(history, ensure_ascii=False), now))
+            self.expired += self._conn.execute(
+                "DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,)).rowcount
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+        }
+
+    async def acreate(self, plan_type: str) -> str:
+        return await asyncio.to_thread(self.create, plan_type)
+
+    async def aexists(self, session_id: str) -> bool:
+        return await asyncio.to_thread(self.__contains__, session_id)
+
+    async def aget(self, session_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.get, session_id)
+
+    async def aset(self, session_id: str, plan_type: str, context: Optional[dict], history: list[dict]) -> None:
+        await asyncio.to_thread(self.set, session_id, plan_type, context, history)
+
+    async def adelete(self, session_id: str) -> bool:
+        return await asyncio.to_thread(self.delete, session_id)
+
+    async def astats(self) -> dict:
+        return await asyncio.to_thread(self.stats)
+
+    def close(self):
+        with self._open_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,18 @@
+import os
+from pathlib import Path
+from graph import MemoryBackend, Neo4jBackend
+
+# "neo4j" or "memory"
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j")
+LAW_DATA_PATH = os.getenv(
+    "LAW_DATA_PATH",
+    str(Path(__file__).resolve().parents[2] / "data" / "chung.json"),
+)
+
+if GRAPH_BACKEND == "memory":
+    backend = MemoryBackend.from_json(LAW_DATA_PATH)
+elif GRAPH_BACKEND == "neo4j":
+    from configs.neo4j import db
+    backend = Neo4jBackend(db)
+else:
+    raise ValueError(f"Unknown GRAPH_BACKEND: {GRAPH_BACKEND}")
@@ -1,7 +1,17 @@
 import os
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase
 
 HOST = os.getenv("NEO4J_HOST", "localhost")
 PORT = os.getenv("NEO4J_PORT", "7687")
 
-db = GraphDatabase.driver(f"bolt://{HOST}:{PORT}")
+# Connection pool settings
+MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "10"))
+MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "1800"))
+
+db = AsyncGraphDatabase.driver(
+    f"bolt://{HOST}:{PORT}",
+    max_connection_pool_size=MAX_POOL_SIZE,
+    connection_acquisition_timeout=ACQUISITION_TIMEOUT,
+    max_connection_lifetime=MAX_CONNECTION_LIFETIME,
+)
@@ -0,0 +1,4 @@
+from graph.base import GraphBackend
+from graph.memory_backend import MemoryBackend
+from graph.neo4j_backend import Neo4jBackend
+from graph.references import ReferenceGraph
@@ -0,0 +1,39 @@
+from abc import ABC, abstractmethod
+from graph.references import ReferenceGraph
+
+
+class GraphBackend(ABC):
+    """Read-only access to the law graph used by the agent tools.
+
+    Articles are returned as dicts with `name`, `title` and `content` keys,
+    plus `references` (the articles up to `depth` REFERS_TO hops away,
+    nearest first) when requested.
+    """
+
+    @abstractmethod
+    async def get_chapters(self) -> list[str]:
+        """Return the names of all chapters."""
+
+    @abstractmethod
+    async def get_articles(self, chapter_names: list[str]) -> list[dict]:
+        """Return the articles (name and title) of the given chapters."""
+
+    @abstractmethod
+    async def get_articles_content(
+        self,
+        article_names: list[str],
+        references: bool = False,
+        depth: int = 1,
+    ) -> list[dict]:
+        """Return the given articles in request order, skipping unknown names."""
+
+    @abstractmethod
+    async def get_reference_graph(self) -> ReferenceGraph:
+        """Return the REFERS_TO graph of all articles."""
+
+    @abstractmethod
+    async def get_corpus_version(self) -> str | None:
+        """Return the version stamp of the loaded corpus."""
+
+    async def close(self) -> None:
+        """Release the resources held by the backend."""
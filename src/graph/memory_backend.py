@@ -0,0 +1,114 @@
+import re
+import json
+import hashlib
+from pathlib import Path
+from graph.base import GraphBackend
+from graph.references import ReferenceGraph
+
+
+ARTICLE_REF_PATTERN = re.compile(r"(?i)Điều\s+(\d+)")
+
+
+class MemoryBackend(GraphBackend):
+    """Graph backend serving the civil code from memory, loaded from chung.json.
+
+    It mirrors the graph written by data/migrate.py: chapters (or their Mục)
+    holding articles, and REFERS_TO edges between articles. Article fields are
+    kept in parallel lists, chapters as tuples of indexes and the references
+    as a CSR ReferenceGraph over the same indexes.
+    """
+
+    def __init__(self, version: str | None = None):
+        self.version = version
+        self._names: list[str] = []
+        self._titles: list[str] = []
+        self._contents: list[str] = []
+        self._graph = ReferenceGraph([], [])
+        self._index: dict[str, int] = {}
+        self._chapters: dict[str, tuple[int, ...]] = {}
+
+    @classmethod
+    def from_json(cls, path: str | Path, law_key: str = "luat dan su") -> "MemoryBackend":
+        raw = Path(path).read_bytes()
+        backend = cls(version=hashlib.sha256(raw).hexdigest()[:16])
+        backend.load(json.loads(raw)["Luat"]["content"][law_key])
+        return backend
+
+    def load(self, law_content: dict) -> None:
+        chapters: dict[str, list[int]] = {}
+        for chapter in law_content.values():
+            content = chapter["content"]
+            # Chapters split into Mục are stored as one chapter per Mục
+            if "Mục 1" in content:
+                for muc in content.values():
+                    articles = dict(muc.get("dieu") or {})
+                    for tieu_muc in (muc.get("tieu_muc") or {}).values():
+                        articles.update(tieu_muc.get("dieu") or {})
+                    self._add_articles(chapters.setdefault(muc["title"], []), articles)
+            else:
+                self._add_articles(chapters.setdefault(chapter["title"], []), content)
+
+        self._chapters = {name: tuple(ids) for name, ids in chapters.items()}
+        self._graph = ReferenceGraph(
+            self._names,
+            (self._find_refs(idx, content) for idx, content in enumerate(self._contents)),
+        )
+
+    def _add_articles(self, chapter: list[int], articles: dict) -> None:
+        for name, article in articles.items():
+            idx = self._index.get(name)
+            if idx is None:
+                idx = self._index[name] = len(self._names)
+                self._names.append(name)
+                self._titles.append(article["title"])
+                self._contents.append(article["content"])
+            chapter.append(idx)
+
+    def _find_refs(self, idx: int, content: str) -> tuple[int, ...]:
+        refs = {}
+        for number in ARTICLE_REF_PATTERN.findall(content):
+            ref = self._index.get(f"Điều {number}")
+            if ref is not None:
+                refs[ref] = None
+        return tuple(refs)
+
+    def _article(self, idx: int) -> dict:
+        return {
+            "name": self._names[idx],
+            "title": self._titles[idx],
+            "content": self._contents[idx],
+        }
+
+    async def get_chapters(self) -> list[str]:
+        return list(self._chapters)
+
+    async def get_articles(self, chapter_names: list[str]) -> list[dict]:
+        return [
+            {"name": self._names[idx], "title": self._titles[idx]}
+            for name in dict.fromkeys(chapter_names)
+            for idx in self._chapters.get(name, ())
+        ]
+
+    async def get_articles_content(
+        self,
+        article_names: list[str],
+        references: bool = False,
+        depth: int = 1,
+    ) -> list[dict]:
+        articles = []
+        for name in article_names:
+            idx = self._index.get(name)
+            if idx is None:
+                continue
+            article = self._article(idx)
+            if references:
+                article["references"] = [
+                    self._article(ref) for ref in self._graph.closure(idx, depth)]
+            articles.append(article)
+        return articles
+
+    async def get_reference_graph(self) -> ReferenceGraph:
+        return self._graph
+
+    async def get_corpus_version(self) -> str | None:
+        return self.version
@@ -0,0 +1,116 @@
+import asyncio
+from neo4j import AsyncDriver
+from graph.base import GraphBackend
+from graph.references import ReferenceGraph
+from metrics import timed_query
+
+
+CHAPTERS_QUERY = "MATCH (c:CHAPTER) RETURN c.name AS chapter_name"
+
+ARTICLES_QUERY = """
+MATCH (c:CHAPTER)-[:HAS]->(a:ARTICLE)
+WHERE c.name IN $chapter_names
+RETURN a.name AS name, a.title AS title
+"""
+
+ARTICLES_CONTENT_QUERY = """
+UNWIND range(0, size($names) - 1) AS idx
+MATCH (a:ARTICLE {name: $names[idx]})
+RETURN a AS content
+ORDER BY idx
+"""
+
+REFERENCE_GRAPH_QUERY = """
+MATCH (a:ARTICLE)
+OPTIONAL MATCH (a)-[:REFERS_TO]->(ref:ARTICLE)
+RETURN a.name AS name, collect(ref.name) AS refs
+"""
+
+CORPUS_VERSION_QUERY = "MATCH (b:BOOK) RETURN b.version AS version LIMIT 1"
+
+
+def _article(node) -> dict:
+    return {
+        "name": node["name"],
+        "title": node["title"],
+        "content": node["content"],
+    }
+
+
+class Neo4jBackend(GraphBackend):
+    """Graph backend reading the BOOK/CHAPTER/ARTICLE model from Neo4j.
+
+    The REFERS_TO graph is read once into memory and references are expanded
+    there, so the articles and all their references are fetched in a single
+    query whatever the depth. It is reloaded when the corpus version changes.
+    """
+
+    def __init__(self, driver: AsyncDriver):
+        self.driver = driver
+        self._graph: ReferenceGraph | None = None
+        self._graph_lock = asyncio.Lock()
+        self._version = None
+
+    async def _query(self, name: str, query: str, **params) -> list:
+        with timed_query(name):
+            return (await self.driver.execute_query(query, **params)).records
+
+    async def get_chapters(self) -> list[str]:
+        result = await self._query("chapters", CHAPTERS_QUERY)
+        return [record["chapter_name"] for record in result]
+
+    async def get_articles(self, chapter_names: list[str]) -> list[dict]:
+        result = await self._query("articles", ARTICLES_QUERY, chapter_names=chapter_names)
+        return [{"name": record["name"], "title": record["title"]} for record in result]
+
+    async def get_articles_content(
+        self,
+        article_names: list[str],
+        references: bool = False,
+        depth: int = 1,
+    ) -> list[dict]:
+        if not article_names:
+            return []
+
+        # 1. Expand the references in memory
+        names = list(article_names)
+        closures = {}
+        if references:
+            graph = await self.get_reference_graph()
+            for name in article_names:
+                closures[name] = graph.expand([name], depth)
+            names = list(dict.fromkeys(names + [ref for refs in closures.values() for ref in refs]))
+
+        # 2. Fetch the articles and all their references at once
+        result = await self._query("articles_content", ARTICLES_CONTENT_QUERY, names=names)
+        by_name = {record["content"]["name"]: _article(record["content"]) for record in result}
+
+        articles = []
+        for name in article_names:
+            if name not in by_name:
+                continue
+            article = dict(by_name[name])
+            if references:
+                article["references"] = [by_name[ref] for ref in closures[name] if ref in by_name]
+            articles.append(article)
+        return articles
+
+    async def get_reference_graph(self) -> ReferenceGraph:
+        async with self._graph_lock:
+            if self._graph is None:
+                result = await self._query("reference_graph", REFERENCE_GRAPH_QUERY)
+                self._graph = ReferenceGraph.from_names(
+                    {record["name"]: record["refs"] for record in result})
+            return self._graph
+
+    async def get_corpus_version(self) -> str | None:
+        result = await self._query("corpus_version", CORPUS_VERSION_QUERY)
+        version = result[0]["version"] if result else None
+        # A new migration may have changed the references
+        if version != self._version:
+            self._graph = None
+            self._version = version
+        return version
+
+    async def close(self) -> None:
+        await self.driver.close()
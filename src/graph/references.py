@@ -0,0 +1,92 @@
+from array import array
+from functools import lru_cache
+from typing import Iterable
+
+
+class ReferenceGraph:
+    """REFERS_TO edges of the articles in CSR (compressed sparse row) form.
+
+    The references of article `i` are `indices[indptr[i]:indptr[i + 1]]`. The
+    graph is static between two migrations, so k-hop closures are memoized and
+    the articles hit most often are expanded without any traversal.
+    """
+
+    def __init__(
+        self,
+        names: list[str],
+        refs: Iterable[Iterable[int]],
+        closure_cache_size: int = 4096,
+    ):
+        self.names = names
+        self.index = {}
+        for idx, name in enumerate(names):
+            self.index.setdefault(name, idx)
+        self.indptr = array("I", [0])
+        self.indices = array("I")
+        for targets in refs:
+            self.indices.extend(dict.fromkeys(targets))
+            self.indptr.append(len(self.indices))
+        self.closure = lru_cache(maxsize=closure_cache_size)(self._closure)
+
+    @classmethod
+    def from_names(
+        cls,
+        refs_by_name: dict[str, Iterable[str]],
+        closure_cache_size: int = 4096,
+    ) -> "ReferenceGraph":
+        """Build the graph from the referenced names of every article, dropping unknown names."""
+        names = list(refs_by_name)
+        index = {name: idx for idx, name in enumerate(names)}
+        refs = (
+            (index[ref] for ref in targets if ref in index and ref != name)
+            for name, targets in refs_by_name.items()
+        )
+        return cls(names, refs, closure_cache_size)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    def neighbors(self, idx: int) -> memoryview:
+        """Articles directly referenced by article `idx`."""
+        return memoryview(self.indices)[self.indptr[idx]:self.indptr[idx + 1]]
+
+    def _closure(self, idx: int, depth: int) -> tuple[int, ...]:
+        # Breadth-first, so nearer references come first
+        seen = {idx}
+        frontier = [idx]
+        closure = []
+        for _ in range(depth):
+            next_frontier = []
+            for node in frontier:
+                for ref in self.neighbors(node):
+                    if ref not in seen:
+                        seen.add(ref)
+                        closure.append(ref)
+                        next_frontier.append(ref)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return tuple(closure)
+
+    def expand(self, names: Iterable[str], depth: int = 1) -> list[str]:
+        """Articles reachable from any of `names` in at most `depth` hops, excluding `names`."""
+        seeds = [self.index[name] for name in names if name in self.index]
+        expanded = dict.fromkeys(
+            ref for idx in seeds for ref in self.closure(idx, depth))
+        for idx in seeds:
+            expanded.pop(idx, None)
+        return [self.names[idx] for idx in expanded]
+
+    def stats(self) -> dict:
+        info = self.closure.cache_info()
+        return {
+            "articles": len(self.names),
+            "edges": self.edge_count,
+            "closure_hits": info.hits,
+            "closure_misses": info.misses,
+            "closure_size": info.currsize,
+        }
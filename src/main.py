@@ -1,13 +1,36 @@
+import json
 import time
+from typing import AsyncIterator, Optional
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
-from fastapi import FastAPI
-from agent import Agents, PlanType, ChatHistoryItem
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from agent import (
+    Agents,
+    PlanType,
+    ChatHistoryItem,
+    answer_cache,
+    history_compactor,
+    session_store
+)
+from agent.tools import tool_cache
+from configs.graph import backend
+import metrics
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """Release the graph backend (Neo4j connection pool) and session store on shutdown."""
+    yield
+    await backend.close()
+    session_store.close()
 
 
 app = FastAPI(
     title="Vietnamese Law GraphRAG API",
     description="Vietnamese Law GraphRAG API",
     docs_url="/",
+    lifespan=lifespan,
 )
 agent = Agents()
 
@@ -16,6 +39,11 @@ class ChatRequest(BaseModel):
     question: str
     histories: list[ChatHistoryItem] = []
     plan_type: PlanType = PlanType.FREE
+    # Server-side conversation: the history is kept by the server, so follow-up
+    # turns only send the new question. `new_session` starts one, whose id is
+    # returned; ids the server did not issue are rejected.
+    session_id: Optional[str] = None
+    new_session: bool = False
 
 
 @app.get("/healthcheck")
@@ -24,23 +52,85 @@ async def healthcheck():
     return {"response": "ok"}
 
 
+@app.get("/metrics")
+async def metrics_api():
+    """Prometheus metrics: request, LLM, Neo4j and tool latency, ReAct steps and tokens."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters of the agent tool, answer and history summary caches."""
+    return {
+        "tools": tool_cache.stats(),
+        "answers": await answer_cache.astats() if answer_cache else None,
+        "history": history_compactor.stats(),
+        "sessions": await session_store.astats(),
+    }
+
+
+async def _session_id(data: ChatRequest) -> Optional[str]:
+    """Session of a request: a new one, an issued live one or none."""
+    if data.session_id is None:
+        return await session_store.acreate(data.plan_type.value) if data.new_session else None
+    if not await session_store.aexists(data.session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired session_id")
+    return data.session_id
+
+
 @app.post("/chat")
 async def chat_api(data: ChatRequest):
     """API endpoint for chat."""
     _start_time = time.perf_counter()
-    _response = await agent.chat(
-        question=data.question,
-        histories=data.histories,
-        plan_type=data.plan_type
-    )
+    session_id = await _session_id(data)
+    with metrics.track_request("chat", data.plan_type.value):
+        _response = await agent.chat(
+            question=data.question,
+            histories=data.histories,
+            plan_type=data.plan_type,
+            session_id=session_id
+        )
 
     return {
         "response": _response,
+        "session_id": session_id,
         "error": None,
         "time": time.perf_counter() - _start_time
     }
 
 
+async def _sse(events: AsyncIterator[dict], plan_type: PlanType) -> AsyncIterator[str]:
+    """Format events as server-sent events, ending with a `done` event."""
+    _start_time = time.perf_counter()
+    try:
+        # Timed until the last event, not until the response headers
+        with metrics.track_request("chat_stream", plan_type.value):
+            async for event in events:
+                yield f"data: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+    except Exception as exc:
+        yield f"data: {json.dumps({'type': 'error', 'error': str(exc)}, ensure_ascii=False)}\n\n"
+    done = {"type": "done", "time": time.perf_counter() - _start_time}
+    yield f"data: {json.dumps(done)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream_api(data: ChatRequest):
+    """API endpoint for chat, streamed as server-sent events."""
+    events = agent.stream_chat(
+        question=data.question,
+        histories=data.histories,
+        plan_type=data.plan_type,
+        session_id=await _session_id(data)
+    )
+    return StreamingResponse(_sse(events, data.plan_type), media_type="text/event-stream")
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session_api(session_id: str):
+    """End a server-side conversation."""
+    return {"deleted": await session_store.adelete(session_id)}
+
+
 @app.exception_handler(Exception)
 async def exception_handler(_, exc):
     """Global exception handler."""
@@ -0,0 +1,353 @@
+"""Prometheus metrics of the API, exported in the text exposition format on /metrics."""
+import functools
+import logging
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterable, Iterator, Optional
+from pydantic import Field, PrivateAttr
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.span_handlers import BaseSpanHandler
+from llama_index.core.instrumentation.events.llm import (
+    LLMChatEndEvent,
+    LLMChatStartEvent,
+    LLMCompletionEndEvent,
+    LLMCompletionStartEvent,
+)
+
+
+# Seconds, from a cached tool call to a slow LLM answer
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+STEP_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+# Rough size of a token for Vietnamese text with the Gemini tokenizer
+CHARS_PER_TOKEN = 3
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: Optional[tuple] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        """Sample lines of the metric in the exposition format."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples()) + "\n"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            return [
+                f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+                for key, value in sorted(self._values.items())
+            ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label set: observations of every bucket (not cumulative) and their sum
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        idx = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            counts[idx] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds spent in the block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> list[str]:
+        lines = []
+        with self._lock:
+            for key, counts in sorted(self._counts.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    le = ("le", _number(bound))
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(self._sums[key])}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+registry: list[Metric] = []
+
+
+def render() -> str:
+    """All the metrics in the Prometheus text exposition format."""
+    return "".join(metric.render() for metric in registry)
+
+
+REQUEST_SECONDS = Histogram(
+    "legal_request_seconds", "Latency of the chat requests.", ("endpoint", "plan_type", "status"))
+LLM_SECONDS = Histogram(
+    "legal_llm_call_seconds", "Latency of the LLM calls.", ("plan_type",))
+NEO4J_SECONDS = Histogram(
+    "legal_neo4j_query_seconds", "Latency of the Neo4j queries.", ("plan_type", "query"))
+TOOL_SECONDS = Histogram(
+    "legal_agent_tool_seconds", "Latency of the agent tool calls.", ("plan_type", "tool", "status"))
+REACT_STEPS = Histogram(
+    "legal_react_steps", "ReAct steps (LLM calls) per request.", ("plan_type",), STEP_BUCKETS)
+REQUEST_TOKENS = Histogram(
+    "legal_request_tokens", "Estimated LLM tokens (prompt + completion) per request.",
+    ("plan_type",), TOKEN_BUCKETS)
+TOKENS = Counter(
+    "legal_llm_tokens_total", "Estimated LLM tokens.", ("plan_type", "kind"))
+FAST_PATH = Counter(
+    "legal_citation_fast_path_total",
+    "Questions citing articles, by whether the cited articles were prefetched.",
+    ("plan_type", "outcome"))
+
+
+# Plan type of the request being served, read by the nested LLM, tool and
+# query timings, and its usage (LLM calls and tokens) so far
+plan_type_label: ContextVar[str] = ContextVar("plan_type_label", default="none")
+request_usage: ContextVar[Optional[dict]] = ContextVar("request_usage", default=None)
+
+
+@contextmanager
+def track_request(endpoint: str, plan_type: str):
+    """Time a chat request and record its ReAct steps and tokens, labeled by plan type."""
+    usage = {"llm_calls": 0, "tokens": 0}
+    plan_token = plan_type_label.set(plan_type)
+    usage_token = request_usage.set(usage)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield usage
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start, endpoint=endpoint, plan_type=plan_type, status=status)
+        if usage["llm_calls"]:
+            REACT_STEPS.observe(usage["llm_calls"], plan_type=plan_type)
+            REQUEST_TOKENS.observe(usage["tokens"], plan_type=plan_type)
+        plan_type_label.reset(plan_token)
+        request_usage.reset(usage_token)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def record_llm_call(
+    seconds: float,
+    prompt_tokens: int,
+    completion_tokens: int,
+    step: bool = True,
+) -> None:
+    """Record an LLM call of the current request; `step` is False for calls outside the ReAct loop."""
+    plan_type = plan_type_label.get()
+    LLM_SECONDS.observe(seconds, plan_type=plan_type)
+    TOKENS.inc(prompt_tokens, plan_type=plan_type, kind="prompt")
+    TOKENS.inc(completion_tokens, plan_type=plan_type, kind="completion")
+    usage = request_usage.get()
+    if usage is not None:
+        usage["llm_calls"] += step
+        usage["tokens"] += prompt_tokens + completion_tokens
+
+
+class LLMSpanTracker(BaseSpanHandler):
+    """Parents of the open llama_index spans, to tell nested LLM calls apart.
+
+    A dropped span is an LLM call that raised: no end event follows, so its
+    start is forgotten here.
+    """
+
+    parents: dict = Field(default_factory=dict)
+    metrics_handler: Any = None
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LLMSpanTracker"
+
+    def ancestors(self, span_id: Optional[str]) -> Iterator[str]:
+        seen = set()
+        span_id = self.parents.get(span_id)
+        while span_id is not None and span_id not in seen:
+            seen.add(span_id)
+            yield span_id
+            span_id = self.parents.get(span_id)
+
+    def span_enter(self, id_, bound_args, instance=None, parent_id=None, tags=None, **kwargs) -> None:
+        self.parents[id_] = parent_id
+
+    def span_exit(self, id_, bound_args, instance=None, result=None, **kwargs) -> None:
+        self.parents.pop(id_, None)
+
+    def span_drop(self, id_, bound_args, instance=None, err=None, **kwargs) -> None:
+        self.parents.pop(id_, None)
+        self.metrics_handler.drop(id_)
+
+    def new_span(self, *args, **kwargs) -> None:
+        return None
+
+    def prepare_to_exit_span(self, *args, **kwargs) -> None:
+        return None
+
+    def prepare_to_drop_span(self, *args, **kwargs) -> None:
+        return None
+
+
+class LLMMetricsHandler(BaseEventHandler):
+    """Time the LLM calls from the llama_index instrumentation events.
+
+    Chat calls are the ReAct steps of the agent; completion calls are the
+    history summaries. Only the outermost call is recorded, as a chat call of
+    a completion model runs a nested completion call.
+    """
+
+    spans: Any = None
+    # Calls started and not ended yet; a stream that fails midway never ends
+    max_started: int = 1024
+    _started: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LLMMetricsHandler"
+
+    def drop(self, span_id: str) -> None:
+        self._started.pop(span_id, None)
+
+    def handle(self, event, **kwargs) -> None:
+        if isinstance(event, (LLMChatStartEvent, LLMCompletionStartEvent)):
+            if any(span_id in self._started for span_id in self.spans.ancestors(event.span_id)):
+                return
+            if isinstance(event, LLMChatStartEvent):
+                prompt = "".join(message.content or "" for message in event.messages)
+            else:
+                prompt = event.prompt
+            self._started[event.span_id] = (time.perf_counter(), estimate_tokens(prompt))
+            while len(self._started) > self.max_started:
+                self._started.popitem(last=False)
+        elif isinstance(event, (LLMChatEndEvent, LLMCompletionEndEvent)):
+            started = self._started.pop(event.span_id, None)
+            if started is None:
+                return
+            start, prompt_tokens = started
+            if isinstance(event, LLMChatEndEvent):
+                completion = event.response.message.content if event.response else ""
+            else:
+                completion = event.response.text if event.response else ""
+            record_llm_call(
+                time.perf_counter() - start,
+                prompt_tokens,
+                estimate_tokens(completion or ""),
+                step=isinstance(event, LLMChatEndEvent),
+            )
+
+
+def instrument_llm() -> None:
+    """Record the LLM calls made through llama_index."""
+    dispatcher = get_dispatcher()
+    if any(isinstance(handler, LLMMetricsHandler) for handler in dispatcher.event_handlers):
+        return
+    spans = LLMSpanTracker()
+    handler = LLMMetricsHandler(spans=spans)
+    spans.metrics_handler = handler
+    dispatcher.add_span_handler(spans)
+    dispatcher.add_event_handler(handler)
+
+
+def timed_tool(fn):
+    """Time an agent tool of the current request."""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            return await fn(*args, **kwargs)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            TOOL_SECONDS.observe(
+                time.perf_counter() - start,
+                plan_type=plan_type_label.get(), tool=fn.__name__, status=status)
+    return wrapper
+
+
+def timed_query(name: str):
+    """Time a Neo4j query of the current request."""
+    return NEO4J_SECONDS.time(plan_type=plan_type_label.get(), query=name)
+
+
+# Opt-in sampled debug logging of the agent memory (DEBUG_SAMPLE_RATE)
+debug_logger = logging.getLogger("agent.debug")
+debug_logger.setLevel(logging.INFO)
+if not debug_logger.handlers:
+    debug_logger.addHandler(logging.StreamHandler())
+
+
+def sampled(rate: float) -> bool:
+    return rate > 0 and random.random() < rate
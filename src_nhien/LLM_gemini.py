@@ -1,18 +1,65 @@
-import google.generativeai as genai
-from config import GOOGLE_GENAI_API_KEY
+from config import (
+    GOOGLE_GENAI_API_KEY,
+    LLM_MODEL,
+    LLM_TEMPERATURE,
+    LLM_MAX_CONCURRENCY,
+    LLM_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_CACHE_MAXSIZE,
+    LLM_CACHE_TTL
+)
+import time
+from llm_client import GeminiClient
+from llm_cache import LLMCache
+from metrics import record_llm_call
 
 
-def LLM_gemini(prompt):
+# Created once per process and shared by every request
+client = GeminiClient(
+    api_key=GOOGLE_GENAI_API_KEY,
+    model_name=LLM_MODEL,
+    temperature=LLM_TEMPERATURE,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    timeout=LLM_TIMEOUT,
+    max_retries=LLM_MAX_RETRIES
+)
+
+llm_cache = LLMCache(maxsize=LLM_CACHE_MAXSIZE, ttl=LLM_CACHE_TTL)
+
+
+async def LLM_gemini(prompt):
     """
-    This function takes a prompt and generates a Cypher query using the Gemini LLM.
+    This function takes a prompt and generates a response using the Gemini LLM.
     """
-    # Set the API key for Google Generative AI
-    genai.configure(api_key=GOOGLE_GENAI_API_KEY)
-    # Call the Gemini LLM with the provided prompt
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    # Set the model settings (e.g., temperature, max output tokens, etc.)
-    model.temperature = 0.7  # Adjusts randomness of the output
-    # Generate content based on the prompt
-    response = model.generate_content(prompt)
-    response = response.text.strip()
+    start = time.perf_counter()
+    try:
+        response = await client.generate(prompt)
+    except Exception:
+        record_llm_call(time.perf_counter() - start, prompt, "", status="error")
+        raise
+    record_llm_call(time.perf_counter() - start, prompt, response)
     return response
+
+
+async def LLM_gemini_cached(prompt):
+    """
+    Same as LLM_gemini, but memoized and single-flight: identical prompts
+    reuse a cached response or share the call already in flight.
+    """
+    return await llm_cache.call(prompt, client.settings, lambda: LLM_gemini(prompt))
+
+
+async def LLM_gemini_stream(prompt):
+    """
+    Same as LLM_gemini, but yields the generated text chunk by chunk.
+    """
+    start = time.perf_counter()
+    chunks = []
+    status = "error"
+    try:
+        async for chunk in client.stream(prompt):
+            chunks.append(chunk)
+            yield chunk
+        status = "ok"
+    finally:
+        record_llm_call(time.perf_counter() - start, prompt, "".join(chunks), status=status)
@@ -2,7 +2,7 @@
 prompt_builder.py
 """
 
-from LLM_gemini import LLM_gemini
+from LLM_gemini import LLM_gemini, LLM_gemini_stream
 
 
 def build_free_prompt(histories: str,
@@ -102,7 +102,7 @@ def build_premium_prompt(histories: str,
             """
 
 
-def generate_answer(
+def build_prompt(
     question: str,
     histories: str = "",
     results_ds: str = "",
@@ -110,13 +110,13 @@ def generate_answer(
     plan_type: str = "free"
 ) -> str:
     """
-    Generates an answer using the Gemini LLM, selecting prompt style by plan_type.
+    Selects the prompt by plan_type.
 
     If no legal results, falls back to a general assistant prompt.
     """
     # No law data: use general assistant style
     if not results_ds.strip() and not results_hs.strip():
-        general_prompt = f"""
+        return f"""
                         Lịch sử câu hỏi: {histories}
                         ---
                         Câu hỏi: "{question}"
@@ -125,19 +125,49 @@ def generate_answer(
                         Tránh dùng từ ngữ pháp lý, không giả định dữ liệu pháp luật.
                         Trình bày đẹp với Markdown (dùng **in đậm**, _in nghiêng_, 📌 emoji nếu cần). 
                         """
-        return LLM_gemini(general_prompt)
 
     # Choose prompt based on plan_type
     plan = plan_type.lower()
     if plan == 'free':
-        prompt = build_free_prompt(histories, question, results_ds, results_hs)
+        return build_free_prompt(histories, question, results_ds, results_hs)
     elif plan == 'pro':
-        prompt = build_pro_prompt(histories, question, results_ds, results_hs)
+        return build_pro_prompt(histories, question, results_ds, results_hs)
     elif plan == 'premium':
-        prompt = build_premium_prompt(histories, question, results_ds, results_hs)
+        return build_premium_prompt(histories, question, results_ds, results_hs)
     else:
         # default to free
-        prompt = build_free_prompt(histories, question, results_ds, results_hs)
+        return build_free_prompt(histories, question, results_ds, results_hs)
+
+
+async def generate_answer(
+    question: str,
+    histories: str = "",
+    results_ds: str = "",
+    results_hs: str = "",
+    plan_type: str = "free"
+) -> str:
+    """
+    Generates an answer using the Gemini LLM, selecting prompt style by plan_type.
+    """
+    prompt = build_prompt(question, histories, results_ds, results_hs, plan_type)
 
     # Call LLM
-    return LLM_gemini(prompt)
\ No newline at end of file
+    return await LLM_gemini(prompt)
+
+
+async def generate_answer_stream(
+    question: str,
+    histories: str = "",
+    results_ds: str = "",
+    results_hs: str = "",
+    plan_type: str = "free"
+):
+    """
+    Same as generate_answer, but yields the answer chunk by chunk as the LLM
+    produces it.
+    """
+    prompt = build_prompt(question, histories, results_ds, results_hs, plan_type)
+
+    # Call LLM in streaming mode
+    async for chunk in LLM_gemini_stream(prompt):
+        yield chunk
@@ -0,0 +1,299 @@
+"""
+In-process BM25 inverted index over every Điều of chung.json.
+
+The index is built once and saved as a single file that is memory-mapped at
+load time: postings, document lengths and stored fields are read straight from
+the mapping, so a worker starts without parsing the JSON corpus.
+
+File layout (native byte order, recorded in the header):
+    MAGIC | header length (uint32) | header (JSON) | sections, 8-byte aligned
+
+Sections:
+    terms       vocabulary, UTF-8, one term per line, in term-id order
+    term_ptr    uint32[V + 1], postings range of every term
+    post_doc    uint32[P], document ids, ascending within a term
+    post_tf     uint32[P], term frequencies
+    doc_len     uint32[N], number of syllables of every document
+    stored_ptr  uint32[N + 1], byte range of every stored document
+    stored      UTF-8 "number \\x1f title \\x1f content \\x1f refs" (refs joined by \\x1e)
+    numbers     dieu_number of every document, UTF-8, one per line
+    ref_ptr     uint32[N + 1], references range of every document
+    ref_idx     uint32[R], referenced documents, as positions within their law
+
+The numbers and references are the ReferenceGraph of every law in CSR form,
+so that it is loaded without decoding the stored documents.
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import mmap
+import heapq
+import argparse
+import unicodedata
+from array import array
+from pathlib import Path
+from collections import Counter, defaultdict
+from law_corpus import load_corpus
+
+
+MAGIC = b"VNLBM25\x02"
+TOKEN_PATTERN = re.compile(r"\w+")
+FOLD_PREFIX = "~"
+FIELD_SEP = "\x1f"
+REF_SEP = "\x1e"
+
+
+def normalize(text, fold=False):
+    """
+    Lowercases a text in NFC form; with `fold`, also strips Vietnamese diacritics.
+    """
+    text = unicodedata.normalize("NFC", text).lower()
+    if fold:
+        text = unicodedata.normalize("NFD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        text = text.replace("đ", "d")
+    return text
+
+
+def tokenize(text, fold=False):
+    """
+    Splits a text into syllables and syllable bigrams ("tài", "sản", "tài_sản").
+
+    With `fold`, the accent-folded terms are added as well (prefixed by "~"),
+    so that queries typed without diacritics still match.
+    """
+    syllables = TOKEN_PATTERN.findall(normalize(text))
+    terms = syllables + [f"{a}_{b}" for a, b in zip(syllables, syllables[1:])]
+    if fold:
+        folded = TOKEN_PATTERN.findall(normalize(text, fold=True))
+        terms += [FOLD_PREFIX + t for t in folded]
+        terms += [f"{FOLD_PREFIX}{a}_{b}" for a, b in zip(folded, folded[1:])]
+    return terms, len(syllables)
+
+
+def build_index(articles, version=None, fold=False, k1=1.5, b=0.75):
+    """
+    Builds the index file contents from flattened articles (see law_corpus).
+
+    Returns:
+        bytes: The serialized index.
+    """
+    # Documents are grouped by law so that a law is a contiguous id range
+    by_law = defaultdict(list)
+    for article in articles:
+        by_law[article["law"]].append(article)
+
+    postings = defaultdict(list)
+    doc_len = array("I")
+    stored_ptr = array("I", [0])
+    stored = bytearray()
+    ref_ptr = array("I", [0])
+    ref_idx = array("I")
+    laws = []
+
+    for law_key, law_articles in by_law.items():
+        start = len(doc_len)
+        positions = {}
+        for i, article in enumerate(law_articles):
+            positions.setdefault(article["dieu_number"], i)
+        for article in law_articles:
+            doc_id = len(doc_len)
+            terms, length = tokenize(f'{article["title"]}\n{article["content"]}', fold)
+            for term, tf in Counter(terms).items():
+                postings[term].append((doc_id, tf))
+            doc_len.append(length)
+
+            # Only references to articles of the same law are kept
+            refs = dict.fromkeys(r for r in article["refs"] if r in positions)
+            stored += FIELD_SEP.join([
+                article["dieu_number"], article["title"], article["content"], REF_SEP.join(refs)
+            ]).encode("utf-8")
+            stored_ptr.append(len(stored))
+            ref_idx.extend(positions[r] for r in refs)
+            ref_ptr.append(len(ref_idx))
+        laws.append({"key": law_key, "start": start, "end": len(doc_len)})
+
+    terms = sorted(postings)
+    term_ptr = array("I", [0])
+    post_doc = array("I")
+    post_tf = array("I")
+    for term in terms:
+        for doc_id, tf in postings[term]:
+            post_doc.append(doc_id)
+            post_tf.append(tf)
+        term_ptr.append(len(post_doc))
+
+    sections = {
+        "terms": "\n".join(terms).encode("utf-8"),
+        "term_ptr": term_ptr.tobytes(),
+        "post_doc": post_doc.tobytes(),
+        "post_tf": post_tf.tobytes(),
+        "doc_len": doc_len.tobytes(),
+        "stored_ptr": stored_ptr.tobytes(),
+        "stored": bytes(stored),
+        "numbers": "\n".join(a["dieu_number"] for law in by_law.values() for a in law).encode("utf-8"),
+        "ref_ptr": ref_ptr.tobytes(),
+        "ref_idx": ref_idx.tobytes(),
+    }
+    header = {
+        "version": version,
+        "byteorder": sys.byteorder,
+        "fold": fold,
+        "k1": k1,
+        "b": b,
+        "n_docs": len(doc_len),
+        "avgdl": sum(doc_len) / len(doc_len) if doc_len else 0.0,
+        "laws": laws,
+        "sections": {},
+    }
+
+    # Section offsets are relative to the end of the header block
+    offset = 0
+    for name, data in sections.items():
+        header["sections"][name] = [offset, len(data)]
+        offset += _align(len(data))
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    header_bytes += b" " * (_align(len(MAGIC) + 4 + len(header_bytes)) - len(MAGIC) - 4 - len(header_bytes))
+    out = bytearray(MAGIC)
+    out += len(header_bytes).to_bytes(4, "little")
+    out += header_bytes
+    for data in sections.values():
+        out += data
+        out += b"\0" * (_align(len(data)) - len(data))
+    return bytes(out)
+
+
+def _align(n, alignment=8):
+    return (n + alignment - 1) // alignment * alignment
+
+
+class BM25Index:
+    """
+    Read-only BM25 index backed by a memory-mapped index file.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buf = memoryview(self._mmap)
+        self._views = [buf]
+        if buf[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a BM25 index file")
+        header_len = int.from_bytes(buf[len(MAGIC):len(MAGIC) + 4], "little")
+        header_end = len(MAGIC) + 4 + header_len
+        header = json.loads(bytes(buf[len(MAGIC) + 4:header_end]))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was built with {header['byteorder']}-endian byte order")
+
+        self.version = header["version"]
+        self.fold = header["fold"]
+        self.k1 = header["k1"]
+        self.b = header["b"]
+        self.n_docs = header["n_docs"]
+        self.avgdl = header["avgdl"] or 1.0
+        self.laws = {law["key"]: (law["start"], law["end"]) for law in header["laws"]}
+
+        def section(name, typecode="B"):
+            offset, length = header["sections"][name]
+            view = buf[header_end + offset:header_end + offset + length]
+            self._views.append(view)
+            if typecode != "B":
+                view = view.cast(typecode)
+                self._views.append(view)
+            return view
+
+        terms = bytes(section("terms")).decode("utf-8")
+        self.vocab = {term: i for i, term in enumerate(terms.split("\n"))} if terms else {}
+        self.term_ptr = section("term_ptr", "I")
+        self.post_doc = section("post_doc", "I")
+        self.post_tf = section("post_tf", "I")
+        self.doc_len = section("doc_len", "I")
+        self.stored_ptr = section("stored_ptr", "I")
+        self.stored = section("stored")
+        numbers = bytes(section("numbers")).decode("utf-8")
+        self.numbers = numbers.split("\n") if numbers else []
+        self.ref_ptr = section("ref_ptr", "I")
+        self.ref_idx = section("ref_idx", "I")
+
+        # Per-document length normalization, computed once
+        self._norm = array("d", (
+            self.k1 * (1 - self.b + self.b * dl / self.avgdl) for dl in self.doc_len
+        ))
+
+    @classmethod
+    def build(cls, json_path, index_path, fold=False):
+        """
+        Builds the index from chung.json, saves it and returns it loaded.
+        """
+        version, articles = load_corpus(json_path)
+        # Written aside and renamed, as other workers may have the old file mapped
+        tmp_path = Path(f"{index_path}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(build_index(articles, version=version, fold=fold))
+        os.replace(tmp_path, index_path)
+        return cls(index_path)
+
+    def document(self, doc_id):
+        """
+        Returns the stored fields of a document.
+        """
+        raw = bytes(self.stored[self.stored_ptr[doc_id]:self.stored_ptr[doc_id + 1]])
+        number, title, content, refs = raw.decode("utf-8").split(FIELD_SEP)
+        return {
+            "dieu_number": number,
+            "title": title,
+            "content": content,
+            "refs": refs.split(REF_SEP) if refs else [],
+        }
+
+    def search(self, keywords, law_key=None, limit=20):
+        """
+        Ranks the documents (optionally of one law) against the keywords.
+
+        Returns:
+            list: (doc_id, score) pairs, best first.
+        """
+        start, end = self.laws.get(law_key, (0, 0)) if law_key else (0, self.n_docs)
+        terms = set()
+        for kw in keywords:
+            terms.update(tokenize(kw, self.fold)[0])
+
+        scores = defaultdict(float)
+        k1 = self.k1
+        for term in terms:
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            lo, hi = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+            idf = math.log(1 + (self.n_docs - (hi - lo) + 0.5) / (hi - lo + 0.5))
+            for p in range(lo, hi):
+                doc_id = self.post_doc[p]
+                if start <= doc_id < end:
+                    tf = self.post_tf[p]
+                    scores[doc_id] += idf * tf * (k1 + 1) / (tf + self._norm[doc_id])
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._mmap.close()
+
+
+if __name__ == "__main__":
+    from config import LAW_DATA_PATH, BM25_INDEX_PATH, BM25_FOLD
+
+    parser = argparse.ArgumentParser(description="Build the BM25 index of chung.json.")
+    parser.add_argument("json_file", nargs="?", default=LAW_DATA_PATH)
+    parser.add_argument("index_file", nargs="?", default=BM25_INDEX_PATH)
+    parser.add_argument("--fold", action="store_true", default=BM25_FOLD,
+                        help="also index accent-folded terms")
+    args = parser.parse_args()
+
+    index = BM25Index.build(args.json_file, args.index_file, fold=args.fold)
+    print(f"Indexed {index.n_docs} articles, {len(index.vocab)} terms -> {args.index_file}")
+    index.close()
@@ -1,6 +1,82 @@
 import os
+from pathlib import Path
 
 GOOGLE_GENAI_API_KEY = os.getenv("GOOGLE_GENAI_API_KEY")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+# Maximum number of Gemini calls in flight per process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Seconds per call (per chunk when streaming)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+# Retries of rate-limited (429), server (5xx) and timed out calls
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
 HOST = os.getenv("NEO4J_HOST", "localhost")
 PORT = os.getenv("NEO4J_PORT", "7687")
 URI = f"bolt://{HOST}:{PORT}"
+
+# Connection pool of the application-wide Neo4j driver
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "10"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(
+    os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "1800"))
+# Seconds between two background health checks of the graph backend
+HEALTHCHECK_INTERVAL = float(os.getenv("HEALTHCHECK_INTERVAL", "10"))
+# Level of the application logs (retrieval timings, tokens saved by packing)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# Graph backend: "neo4j", "memory" (serves data/chung.json without a database)
+# or "bm25" (memory-mapped BM25 index built from data/chung.json)
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j")
+LAW_DATA_PATH = os.getenv(
+    "LAW_DATA_PATH",
+    str(Path(__file__).resolve().parent.parent / "data" / "chung.json"),
+)
+
+# Maximum number of Điều retrieved per law
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "20"))
+# Token budget of the law context of the answer prompt, by plan
+CONTEXT_BUDGETS = {
+    "free": int(os.getenv("CONTEXT_BUDGET_FREE", "3000")),
+    "pro": int(os.getenv("CONTEXT_BUDGET_PRO", "8000")),
+    "premium": int(os.getenv("CONTEXT_BUDGET_PREMIUM", "16000")),
+}
+# REFERS_TO hops of referenced Điều added to the hits, by plan
+REFERENCE_DEPTHS = {
+    "free": int(os.getenv("REFERENCE_DEPTH_FREE", "0")),
+    "pro": int(os.getenv("REFERENCE_DEPTH_PRO", "2")),
+    "premium": int(os.getenv("REFERENCE_DEPTH_PREMIUM", "2")),
+}
+# History sent with a question: the last HISTORY_KEEP_TURNS turns verbatim,
+# older turns folded into a rolling summary, within a token limit by plan
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "3"))
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "300"))
+HISTORY_SUMMARY_CACHE_SIZE = int(os.getenv("HISTORY_SUMMARY_CACHE_SIZE", "4096"))
+HISTORY_TOKEN_LIMITS = {
+    "free": int(os.getenv("HISTORY_TOKEN_LIMIT_FREE", "1000")),
+    "pro": int(os.getenv("HISTORY_TOKEN_LIMIT_PRO", "3000")),
+    "premium": int(os.getenv("HISTORY_TOKEN_LIMIT_PREMIUM", "6000")),
+}
+# Seconds allowed to the search of each law; a law that times out is skipped
+RETRIEVAL_TIMEOUT = float(os.getenv("RETRIEVAL_TIMEOUT", "5"))
+
+# BM25 index file, built from LAW_DATA_PATH on first use if missing
+BM25_INDEX_PATH = os.getenv(
+    "BM25_INDEX_PATH", str(Path(LAW_DATA_PATH).with_suffix(".bm25")))
+# Also index accent-folded terms so queries without diacritics match
+BM25_FOLD = os.getenv("BM25_FOLD", "false").lower() == "true"
+
+# Final-answer cache: "memory", "sqlite" (shared by the workers of a host) or "off"
+ANSWER_CACHE_BACKEND = os.getenv("ANSWER_CACHE_BACKEND", "memory")
+# SQLite files, created on first use
+STATE_DIR = Path(os.getenv("STATE_DIR", Path(__file__).resolve().parent / "state"))
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", str(STATE_DIR / "answer_cache.sqlite3"))
+ANSWER_CACHE_MAXSIZE = int(os.getenv("ANSWER_CACHE_MAXSIZE", "1024"))
+# Minimum MinHash similarity for a near-duplicate question to reuse an answer
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.85"))
+# Seconds between two reads of the corpus version stamp
+ANSWER_CACHE_VERSION_CHECK_INTERVAL = float(
+    os.getenv("ANSWER_CACHE_VERSION_CHECK_INTERVAL", "60"))
+
+# Memoized LLM calls (keyword extraction), keyed by prompt and model settings
+LLM_CACHE_MAXSIZE = int(os.getenv("LLM_CACHE_MAXSIZE", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
@@ -0,0 +1,121 @@
+"""
+Packs the retrieved Điều into the law context of the answer prompt, within a
+token budget that depends on the plan.
+"""
+
+import re
+
+
+# Rough size of a token for Vietnamese text with the Gemini tokenizer
+CHARS_PER_TOKEN = 3
+# An article is not worth including with less room than this
+MIN_ARTICLE_TOKENS = 40
+# Share of the budget a single article may take, so that one very long
+# article (e.g. Điều 232 BLHS, ~2300 tokens) cannot crowd out the others
+MAX_ARTICLE_SHARE = 0.3
+# Ranking bonus of a hit that other hits refer to, per referring hit
+REFERENCE_BONUS = 0.1
+SENTENCE_END = re.compile(r"(?<=[.;:])\s+")
+
+
+def estimate_tokens(text):
+    """
+    Estimates the number of LLM tokens of a text.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_at_clause(content, max_tokens):
+    """
+    Keeps the leading clauses (lines: "1. ...", "a) ...") of an article that fit
+    in `max_tokens`; a first clause that is too long is cut at a sentence end.
+
+    Returns:
+        str: The truncated content, ending with "…" when something was cut.
+    """
+    if estimate_tokens(content) <= max_tokens:
+        return content
+
+    max_chars = max(max_tokens, 0) * CHARS_PER_TOKEN
+    kept = ""
+    for line in content.split("\n"):
+        candidate = f"{kept}\n{line}" if kept else line
+        if len(candidate) > max_chars:
+            break
+        kept = candidate
+
+    if not kept:
+        for sentence in SENTENCE_END.split(content.split("\n", 1)[0]):
+            candidate = f"{kept} {sentence}" if kept else sentence
+            if len(candidate) > max_chars:
+                break
+            kept = candidate
+    if not kept:
+        kept = content[:max_chars].rsplit(" ", 1)[0]
+    return kept + " …"
+
+
+def pack_context(results, budget):
+    """
+    Fills the token budget with the best retrieved Điều of every law.
+
+    Articles returned more than once are kept once; a hit that other hits
+    refer to is ranked a little higher, as it is likely central to the
+    question. Articles are added best first; an article longer than its share
+    of the budget, or than the room left, is truncated at a clause boundary.
+
+    Args:
+        results (dict): ArticleRecord lists of `GraphBackend.search` by law key.
+        budget (int): Maximum number of tokens of the packed context.
+
+    Returns:
+        tuple: The packed context of every law key ("" when nothing was kept)
+            and statistics (tokens before and after, articles kept, truncated).
+    """
+    # 1. Deduplicate the hits of every law
+    articles = {}
+    for law_key, records in results.items():
+        for article in records or []:
+            key = (law_key, article.number)
+            if key not in articles or articles[key].score < article.score:
+                articles[key] = article
+
+    # 2. Rank, boosting the hits referred to by other hits
+    referred = {}
+    for (law_key, _), article in articles.items():
+        for ref in article.refs:
+            key = (law_key, ref)
+            if key in articles:
+                referred[key] = referred.get(key, 0) + 1
+    top_score = max((a.score for a in articles.values()), default=0) or 1
+    ranked = sorted(
+        articles.items(),
+        key=lambda item: item[1].score / top_score + REFERENCE_BONUS * referred.get(item[0], 0),
+        reverse=True,
+    )
+
+    # 3. Fill the budget, best first
+    packed = {law_key: [] for law_key in results}
+    max_article_tokens = max(int(budget * MAX_ARTICLE_SHARE), MIN_ARTICLE_TOKENS)
+    used, truncated = 0, 0
+    for (law_key, _), article in ranked:
+        room = min(budget - used, max_article_tokens)
+        text = article.render()
+        if estimate_tokens(text) > room:
+            content = truncate_at_clause(
+                article.content, room - estimate_tokens(article.render("")))
+            if estimate_tokens(content) < MIN_ARTICLE_TOKENS:
+                continue
+            text = article.render(content)
+            truncated += 1
+        packed[law_key].append(text)
+        used += estimate_tokens(text) + 1
+
+    stats = {
+        "tokens_before": sum(estimate_tokens(a.render()) + 1 for a in articles.values()),
+        "tokens_after": used,
+        "articles": sum(len(texts) for texts in packed.values()),
+        "articles_found": len(articles),
+        "truncated": truncated,
+    }
+    return {law_key: "\n\n".join(texts) for law_key, texts in packed.items()}, stats
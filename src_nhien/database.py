@@ -1,26 +1,46 @@
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase
+from metrics import timed_query
+from config import (
+    NEO4J_MAX_POOL_SIZE,
+    NEO4J_ACQUISITION_TIMEOUT,
+    NEO4J_MAX_CONNECTION_LIFETIME
+)
 
 
 class LawGraphQuery:
     def __init__(self, uri):
-        self.driver = GraphDatabase.driver(uri)
+        # One driver (and connection pool) per process, see main.lifespan
+        self.driver = AsyncGraphDatabase.driver(
+            uri,
+            max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+            connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+            max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+            keep_alive=True
+        )
 
-    def query(self, query):
-        with self.driver.session() as session:
-            result = session.run(query)
-            return [record for record in result]
+    async def query(self, query, params=None, name="query"):
+        # One session per query, so that concurrent queries run in parallel
+        with timed_query(name):
+            async with self.driver.session() as session:
+                result = await session.run(query, params)
+                return [record async for record in result]
 
-    def close(self):
-        self.driver.close()
+    async def close(self):
+        await self.driver.close()
 
-    def test_connection(self):
+    async def ping(self):
+        """
+        Runs `RETURN 1`, raising if the database cannot be reached.
+        """
+        async with self.driver.session() as session:
+            await (await session.run("RETURN 1")).consume()
+
+    async def test_connection(self):
         """
         Test the connection to the Neo4j database.
         """
         try:
-            with self.driver.session() as session:
-                session.run("RETURN 1")
-            print("Database connection successful!")
+            await self.ping()
             return True
         except Exception as e:
             print(f"Database connection failed: {e}")
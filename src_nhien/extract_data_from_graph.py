@@ -1,31 +1,71 @@
-from database import LawGraphQuery
-from config import URI
+import time
+import asyncio
+from graph_backend import get_backend
+from config import RETRIEVAL_TIMEOUT
 
 
-def extract_data_from_graph(dan_su_query, hinh_su_query):
+# Law searched for each group of extracted keywords
+LAW_KEYWORDS = {
+    "luat dan su": "civil_keywords",
+    "luat hinh su": "criminal_keywords",
+}
+
+
+async def search_law(backend, law_key, keywords, timeout=RETRIEVAL_TIMEOUT, depth=0):
     """
-    Extracts data from the graph database using given queries.
+    Searches one law, adding the Điều referenced by the hits up to `depth`
+    hops away, giving up after `timeout` seconds.
 
-    Args:
-        dan_su_query (str): The query for civil law to be executed on the graph database.
-        hinh_su_query (str): The query for criminal law to be executed on the graph database.
+    A timeout or a database error only fails this law: its status is
+    reported in the timing and no rows are returned.
 
     Returns:
-        tuple: A tuple containing results for civil law and criminal law queries.
+        tuple: The rows found (empty on failure) and the timing of the search.
     """
-    # Create an instance of LawGraphQuery
-    graph_query = LawGraphQuery(URI)
+    async def search():
+        rows = await backend.search(law_key, keywords)
+        if depth > 0:
+            rows = rows + await backend.expand(law_key, [row.number for row in rows], depth)
+        return rows
 
-    # Initialize results
-    results_ds = ""
-    results_hs = ""
+    start = time.perf_counter()
+    timing = {"status": "ok"}
+    try:
+        rows = await asyncio.wait_for(search(), timeout)
+    except asyncio.TimeoutError:
+        rows, timing = [], {"status": "timeout"}
+    except Exception as exc:
+        rows, timing = [], {"status": "error", "error": f"{type(exc).__name__}: {exc}"}
+    timing["time"] = time.perf_counter() - start
+    return rows, timing
+
+
+async def extract_data_from_graph(keywords, timeout=RETRIEVAL_TIMEOUT, depth=0):
+    """
+    Extracts data from the graph backend using the extracted keywords.
 
-    # Execute the query for civil law if not empty
-    if dan_su_query.strip():
-        results_ds = graph_query.query(dan_su_query)
+    The laws are searched concurrently, each with its own timeout, so the
+    retrieval takes as long as the slowest law and a law that times out or
+    fails does not discard the results of the other.
+
+    Args:
+        keywords (dict): Keywords grouped as `civil_keywords` and `criminal_keywords`.
+        depth (int): REFERS_TO hops of referenced Điều added after the hits.
+
+    Returns:
+        tuple: Results for civil law and criminal law queries, and the timing of
+            every searched law.
+    """
+    backend = get_backend()
 
-    # Execute the query for criminal law if not empty
-    if hinh_su_query.strip():
-        results_hs = graph_query.query(hinh_su_query)
+    # Search every law that has keywords
+    searches = {
+        law_key: search_law(backend, law_key, keywords[group], timeout, depth)
+        for law_key, group in LAW_KEYWORDS.items()
+        if keywords.get(group)
+    }
+    found = dict(zip(searches, await asyncio.gather(*searches.values())))
 
-    return results_ds, results_hs
+    results = {law_key: rows for law_key, (rows, _) in found.items()}
+    timings = {law_key: timing for law_key, (_, timing) in found.items()}
+    return results.get("luat dan su", []), results.get("luat hinh su", []), timings
@@ -0,0 +1,323 @@
+import heapq
+import asyncio
+from array import array
+from abc import ABC, abstractmethod
+from pathlib import Path
+from functools import lru_cache
+from database import LawGraphQuery
+from bm25_index import BM25Index
+from law_corpus import ArticleRecord, corpus_version, load_corpus
+from reference_graph import ReferenceGraph
+from query_generator import build_keyword_query
+from config import (
+    BM25_FOLD, BM25_INDEX_PATH, GRAPH_BACKEND, LAW_DATA_PATH, RETRIEVAL_TOP_K, URI
+)
+
+
+# Written on the Root node by data/nhien_migrate.py
+CORPUS_VERSION_QUERY = "MATCH (r:Root) RETURN r.version AS version LIMIT 1"
+
+REFERENCE_GRAPH_QUERY = """
+MATCH (d:Dieu)
+OPTIONAL MATCH (d)-[:REFERS_TO]->(ref:Dieu)
+WHERE ref.law = d.law
+RETURN d.law AS law, d.dieu_number AS number, collect(ref.dieu_number) AS refs
+"""
+
+# Rows in the order of $numbers (nearest references first)
+ARTICLES_BY_NUMBER_QUERY = """
+UNWIND range(0, size($numbers) - 1) AS idx
+MATCH (d:Dieu {law: $law, dieu_number: $numbers[idx]})
+RETURN d.dieu_number AS number, d.title AS title, d.content AS content
+ORDER BY idx
+"""
+
+
+class GraphBackend(ABC):
+    """
+    Interface of the law graph used by the keyword retrieval pipeline.
+
+    `search` returns the best matching Điều of a law, most relevant first,
+    as ArticleRecord objects; `expand` returns the Điều they refer to, up to
+    `depth` REFERS_TO hops away, from the in-memory ReferenceGraph of the law.
+    """
+
+    @abstractmethod
+    async def search(self, law_key: str, keywords: list[str], limit: int = RETRIEVAL_TOP_K) -> list[ArticleRecord]:
+        """
+        The best matching Điều of a law, most relevant first.
+        """
+
+    @abstractmethod
+    async def reference_graph(self, law_key: str) -> ReferenceGraph | None:
+        """
+        The REFERS_TO graph of a law, None if it is not known.
+        """
+
+    @abstractmethod
+    async def articles(self, law_key: str, numbers: list[str]) -> list[ArticleRecord]:
+        """
+        The given Điều of a law, in order, without score.
+        """
+
+    async def expand(self, law_key: str, numbers: list[str], depth: int = 1, limit: int = RETRIEVAL_TOP_K) -> list[ArticleRecord]:
+        """
+        The first `limit` Điều reachable from `numbers` in at most `depth`
+        hops, nearest first, excluding `numbers` themselves.
+        """
+        graph = await self.reference_graph(law_key)
+        if graph is None or depth < 1:
+            return []
+        return await self.articles(law_key, graph.expand(numbers, depth)[:limit])
+
+    async def corpus_version(self) -> str | None:
+        """
+        Version stamp of the loaded corpus, for caches to key on.
+        """
+        return getattr(self, "version", None)
+
+    async def ping(self):
+        """
+        Raises if the backend cannot serve queries.
+        """
+
+    async def test_connection(self) -> bool:
+        return True
+
+    async def close(self):
+        pass
+
+
+class Neo4jGraphBackend(GraphBackend):
+    """
+    Runs the keyword queries against Neo4j.
+
+    The REFERS_TO edges of every law are read once into ReferenceGraphs, so
+    references are looked up in memory rather than traversed per query. They
+    are reloaded when the corpus version changes.
+    """
+
+    def __init__(self, uri):
+        self.graph_query = LawGraphQuery(uri)
+        self._graphs = None
+        self._graphs_lock = asyncio.Lock()
+        self._version = None
+
+    async def reference_graph(self, law_key):
+        async with self._graphs_lock:
+            if self._graphs is None:
+                refs = {}
+                for record in await self.graph_query.query(
+                        REFERENCE_GRAPH_QUERY, name="reference_graph"):
+                    refs.setdefault(record["law"], {})[record["number"]] = record["refs"]
+                self._graphs = {law: ReferenceGraph.from_names(law_refs) for law, law_refs in refs.items()}
+        return self._graphs.get(law_key)
+
+    def _record(self, graph, law_key, number, title, content, score=0.0):
+        refs = []
+        if graph is not None and number in graph.index:
+            refs = [graph.names[ref] for ref in graph.neighbors(graph.index[number])]
+        return ArticleRecord(law_key, number, title, content, refs, score)
+
+    async def search(self, law_key, keywords, limit=RETRIEVAL_TOP_K):
+        query, params = build_keyword_query(law_key, keywords, limit)
+        if not query:
+            return []
+        records = await self.graph_query.query(query, params, name="keyword_search")
+        graph = await self.reference_graph(law_key)
+        return [self._record(graph, law_key, **record.data()) for record in records]
+
+    async def articles(self, law_key, numbers):
+        if not numbers:
+            return []
+        records = await self.graph_query.query(
+            ARTICLES_BY_NUMBER_QUERY, {"law": law_key, "numbers": numbers},
+            name="articles_by_number")
+        graph = await self.reference_graph(law_key)
+        return [self._record(graph, law_key, **record.data()) for record in records]
+
+    async def corpus_version(self):
+        records = await self.graph_query.query(CORPUS_VERSION_QUERY, name="corpus_version")
+        version = records[0]["version"] if records else None
+        # A new migration may have changed the references
+        if version != self._version:
+            self._graphs = None
+            self._version = version
+        return version
+
+    async def ping(self):
+        await self.graph_query.ping()
+
+    async def test_connection(self):
+        return await self.graph_query.test_connection()
+
+    async def close(self):
+        await self.graph_query.close()
+
+
+class _LawIndex:
+    """
+    Articles of one law kept in parallel lists, with REFERS_TO edges stored
+    in a ReferenceGraph over the article indexes.
+    """
+    __slots__ = ("numbers", "titles", "contents", "search_text", "refs", "index", "graph")
+
+    def __init__(self):
+        self.numbers: list[str] = []
+        self.titles: list[str] = []
+        self.contents: list[str] = []
+        self.search_text: list[tuple[str, str]] = []
+        self.refs: list[list[str]] | None = []
+        self.index: dict[str, int] = {}
+        self.graph: ReferenceGraph | None = None
+
+    def add(self, article):
+        self.index.setdefault(article["dieu_number"], len(self.numbers))
+        self.numbers.append(article["dieu_number"])
+        self.titles.append(article["title"])
+        self.contents.append(article["content"])
+        self.search_text.append(
+            (article["title"].lower(), article["content"].lower()))
+        self.refs.append(article["refs"])
+
+    def resolve_refs(self):
+        # Only references to articles of the same law become edges
+        self.graph = ReferenceGraph(self.numbers, (
+            (self.index[ref] for ref in refs if ref in self.index)
+            for refs in self.refs
+        ))
+        self.refs = None
+
+    def record(self, law_key, idx, score=0.0):
+        return ArticleRecord(
+            law_key,
+            self.numbers[idx],
+            self.titles[idx],
+            self.contents[idx],
+            [self.numbers[ref] for ref in self.graph.neighbors(idx)],
+            score
+        )
+
+
+class MemoryGraphBackend(GraphBackend):
+    """
+    Serves the law graph from memory, loaded from chung.json.
+    """
+
+    def __init__(self, path):
+        self.version, articles = load_corpus(path)
+        self.laws: dict[str, _LawIndex] = {}
+
+        for article in articles:
+            self.laws.setdefault(article["law"], _LawIndex()).add(article)
+        for law in self.laws.values():
+            law.resolve_refs()
+
+    async def search(self, law_key, keywords, limit=RETRIEVAL_TOP_K):
+        law = self.laws.get(law_key)
+        keywords = [kw.lower() for kw in keywords if kw.strip()]
+        if law is None or not keywords:
+            return []
+
+        # Rank by keyword occurrences, title matches counting double
+        scores = []
+        for idx, (title, content) in enumerate(law.search_text):
+            score = sum(2 * title.count(kw) + content.count(kw) for kw in keywords)
+            if score:
+                scores.append((score, idx))
+
+        return [law.record(law_key, idx, float(score)) for score, idx in heapq.nlargest(limit, scores, key=lambda s: (s[0], -s[1]))]
+
+    async def reference_graph(self, law_key):
+        law = self.laws.get(law_key)
+        return law.graph if law else None
+
+    async def articles(self, law_key, numbers):
+        law = self.laws.get(law_key)
+        if law is None:
+            return []
+        return [law.record(law_key, law.index[n]) for n in numbers if n in law.index]
+
+
+class Bm25GraphBackend(GraphBackend):
+    """
+    Ranks the Điều with an in-process BM25 index (see bm25_index.py).
+
+    The index file is memory-mapped; it is built from chung.json first if it
+    does not exist yet, and rebuilt if it was built from another version of
+    chung.json or with another `fold`. The ReferenceGraph of a law is read
+    from the CSR arrays of the file, node `i` being the document `start + i`
+    of the law.
+    """
+
+    def __init__(self, index_path, json_path=None, fold=False):
+        self.index = self._load(index_path, json_path, fold)
+        self.version = self.index.version
+        self.graphs = {}
+        for law_key, (start, end) in self.index.laws.items():
+            offset = self.index.ref_ptr[start]
+            self.graphs[law_key] = ReferenceGraph.from_csr(
+                self.index.numbers[start:end],
+                array("I", (ptr - offset for ptr in self.index.ref_ptr[start:end + 1])),
+                array("I", self.index.ref_idx[offset:self.index.ref_ptr[end]]),
+            )
+
+    @staticmethod
+    def _load(index_path, json_path, fold):
+        if json_path is None:
+            return BM25Index(index_path)
+        # Hashing the corpus is cheap next to parsing and indexing it
+        version = corpus_version(Path(json_path).read_bytes())
+        if Path(index_path).exists():
+            try:
+                index = BM25Index(index_path)
+            except ValueError:
+                pass  # Older file format
+            else:
+                if index.version == version and index.fold == fold:
+                    return index
+                index.close()
+        return BM25Index.build(json_path, index_path, fold=fold)
+
+    async def reference_graph(self, law_key):
+        return self.graphs.get(law_key)
+
+    async def articles(self, law_key, numbers):
+        graph = self.graphs.get(law_key)
+        if graph is None:
+            return []
+        start = self.index.laws[law_key][0]
+        records = []
+        for number in numbers:
+            if number in graph.index:
+                doc = self.index.document(start + graph.index[number])
+                records.append(ArticleRecord(
+                    law_key, doc["dieu_number"], doc["title"], doc["content"], doc["refs"]
+                ))
+        return records
+
+    async def search(self, law_key, keywords, limit=RETRIEVAL_TOP_K):
+        records = []
+        for doc_id, score in self.index.search(keywords, law_key=law_key, limit=limit):
+            doc = self.index.document(doc_id)
+            records.append(ArticleRecord(
+                law_key, doc["dieu_number"], doc["title"], doc["content"], doc["refs"], score
+            ))
+        return records
+
+    async def close(self):
+        self.index.close()
+
+
+@lru_cache(maxsize=None)
+def get_backend() -> GraphBackend:
+    """
+    Returns the graph backend selected by the GRAPH_BACKEND env var.
+    """
+    if GRAPH_BACKEND == "memory":
+        return MemoryGraphBackend(LAW_DATA_PATH)
+    if GRAPH_BACKEND == "bm25":
+        return Bm25GraphBackend(BM25_INDEX_PATH, LAW_DATA_PATH, fold=BM25_FOLD)
+    if GRAPH_BACKEND == "neo4j":
+        return Neo4jGraphBackend(URI)
+    raise ValueError(f"Unknown GRAPH_BACKEND: {GRAPH_BACKEND}")
@@ -0,0 +1,73 @@
+"""
+Background liveness monitoring of the graph backend.
+"""
+
+import time
+import asyncio
+
+
+class HealthMonitor:
+    """
+    Probes a backend every `interval` seconds from a background task, so that
+    requests read the last known state instead of probing the database inline.
+
+    `check` is a coroutine function that raises when the backend is down.
+    """
+
+    def __init__(self, check, interval=10, timeout=5):
+        self.check = check
+        self.interval = interval
+        self.timeout = timeout
+        self.healthy = None
+        self.checked_at = None
+        self.latency = None
+        self.error = None
+        self._task = None
+
+    async def probe(self):
+        """
+        Runs one check and records its outcome.
+        """
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.check(), self.timeout)
+            healthy, error = True, None
+        except Exception as exc:
+            healthy, error = False, str(exc) or type(exc).__name__
+
+        if healthy != self.healthy:
+            print(f"Graph backend is {'up' if healthy else 'down'}" + (f": {error}" if error else ""))
+        self.healthy = healthy
+        self.error = error
+        self.latency = time.perf_counter() - start
+        self.checked_at = time.time()
+        return healthy
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.probe()
+
+    async def start(self):
+        """
+        Probes once, then keeps probing in the background.
+        """
+        await self.probe()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self):
+        return {
+            "healthy": self.healthy,
+            "checked_at": self.checked_at,
+            "latency": self.latency,
+            "error": self.error,
+        }
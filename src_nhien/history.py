@@ -0,0 +1,173 @@
+"""
+Compaction of the conversation history sent with every question.
+"""
+
+import hashlib
+import logging
+from collections import OrderedDict
+from context_packer import CHARS_PER_TOKEN, estimate_tokens
+
+
+logger = logging.getLogger(__name__)
+
+
+SUMMARY_PROMPT = """Tóm tắt cuộc trò chuyện tư vấn pháp luật dưới đây trong tối đa {max_words} từ.
+Giữ lại các sự kiện, tình tiết, số liệu và điều luật đã được nhắc đến; bỏ lời chào hỏi.
+Chỉ trả về bản tóm tắt.
+
+Tóm tắt trước đó:
+{summary}
+
+Các tin nhắn tiếp theo:
+{messages}"""
+
+
+def _role(item):
+    return getattr(item.role, "value", item.role)
+
+
+def _truncate(text, max_tokens):
+    max_chars = max(max_tokens, 0) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " …"
+
+
+class HistoryCompactor:
+    """
+    Bounds the conversation history sent with every question.
+
+    The last `keep_turns` turns (user + assistant messages) are kept verbatim
+    and the older messages are folded into a rolling summary. Summaries are
+    cached by a chained hash of the history prefix they cover, so the next
+    turn of a conversation only summarizes the messages added since the
+    previous summary, and the cost of a turn stays flat as the conversation
+    grows. `compact` also enforces a token ceiling on summary + messages.
+    """
+
+    def __init__(
+        self,
+        summarize,
+        keep_turns=3,
+        summary_tokens=300,
+        cache_size=4096,
+    ):
+        self.summarize = summarize
+        self.keep_turns = keep_turns
+        self.summary_tokens = summary_tokens
+        self.cache_size = cache_size
+        self._summaries = OrderedDict()
+        self.hits = 0
+        self.extended = 0
+        self.misses = 0
+        self.failures = 0
+
+    @staticmethod
+    def prefix_hashes(items):
+        """
+        Hashes every prefix `items[:i + 1]`, each chained on the previous one.
+        """
+        hashes, digest = [], b""
+        for item in items:
+            digest = hashlib.blake2b(
+                digest + f"{_role(item)}\x1f{item.content.strip()}\x1e".encode("utf-8"),
+                digest_size=16,
+            ).digest()
+            hashes.append(digest.hex())
+        return hashes
+
+    def _cached(self, key):
+        summary = self._summaries.get(key)
+        if summary is not None:
+            self._summaries.move_to_end(key)
+        return summary
+
+    def _store(self, key, summary):
+        self._summaries[key] = summary
+        self._summaries.move_to_end(key)
+        while len(self._summaries) > self.cache_size:
+            self._summaries.popitem(last=False)
+
+    async def summary_of(self, items):
+        """
+        Summarizes `items`, extending the longest already summarized prefix.
+
+        Returns:
+            str: The rolling summary (None when there is nothing to summarize).
+        """
+        if not items:
+            return None
+        hashes = self.prefix_hashes(items)
+        start, previous = 0, None
+        for idx in range(len(hashes) - 1, -1, -1):
+            previous = self._cached(hashes[idx])
+            if previous is not None:
+                start = idx + 1
+                break
+        if start == len(items):
+            self.hits += 1
+            return previous
+
+        messages = "\n".join(
+            f"{_role(item)}: {item.content.strip()}" for item in items[start:])
+        prompt = SUMMARY_PROMPT.format(
+            max_words=self.summary_tokens,
+            summary=previous or "(chưa có)",
+            messages=messages,
+        )
+        try:
+            summary = (await self.summarize(prompt)).strip()
+        except Exception:
+            # Without a summary the older turns are dropped, not sent verbatim
+            self.failures += 1
+            logger.warning("History summary failed", exc_info=True)
+            return previous
+
+        if previous is None:
+            self.misses += 1
+        else:
+            self.extended += 1
+        summary = _truncate(summary, self.summary_tokens)
+        self._store(hashes[-1], summary)
+        return summary
+
+    async def compact(self, histories, max_tokens):
+        """
+        Splits the history into a summary of the older messages and the
+        recent messages kept verbatim, together within `max_tokens`.
+
+        Returns:
+            tuple: The summary (None if there are no older messages) and the
+                recent ChatHistoryItem list.
+        """
+        items = list(histories)
+        keep = min(len(items), 2 * self.keep_turns)
+
+        # Shrink the verbatim window until it fits next to the summary
+        def recent_tokens(count):
+            return sum(estimate_tokens(item.content) for item in items[len(items) - count:])
+
+        while keep > 1 and recent_tokens(keep) > max_tokens - (
+                self.summary_tokens if keep < len(items) else 0):
+            keep -= 1
+
+        older, recent = items[:len(items) - keep], items[len(items) - keep:]
+        summary = await self.summary_of(older)
+
+        # A single message longer than the ceiling is cut
+        room = max_tokens - (estimate_tokens(summary) if summary else 0)
+        if recent and estimate_tokens(recent[-1].content) > room:
+            recent[-1] = recent[-1].model_copy(
+                update={"content": _truncate(recent[-1].content, room)})
+        return summary, recent
+
+    def stats(self):
+        total = self.hits + self.extended + self.misses
+        return {
+            "size": len(self._summaries),
+            "hits": self.hits,
+            "extended": self.extended,
+            "misses": self.misses,
+            "failures": self.failures,
+            "hit_rate": (self.hits + self.extended) / total if total else 0.0,
+        }
@@ -0,0 +1,108 @@
+import re
+import json
+import hashlib
+from pathlib import Path
+
+
+ARTICLE_REF_PATTERN = re.compile(r"(?i)Điều\s+\d+")
+
+
+class ArticleRecord:
+    """
+    One retrieved Điều: what GraphBackend.search returns, one per row.
+    """
+    __slots__ = ("law", "number", "title", "content", "refs", "score")
+
+    def __init__(self, law, number, title, content, refs=(), score=0.0):
+        self.law = law
+        self.number = number
+        self.title = title
+        self.content = content
+        self.refs = tuple(refs or ())
+        self.score = score or 0.0
+
+    def render(self, content=None) -> str:
+        """
+        Dense citation of the article for the answer prompt:
+
+            Điều N. Title
+            content (or the given truncated content)
+            (Tham chiếu: Điều A, Điều B)
+        """
+        text = f"{self.number}. {self.title}\n{self.content if content is None else content}"
+        if self.refs:
+            text += f"\n(Tham chiếu: {', '.join(self.refs)})"
+        return text
+
+    def __repr__(self):
+        return f"ArticleRecord({self.law!r}, {self.number!r}, score={self.score:.3f})"
+
+
+def find_article_refs(content: str) -> list[str]:
+    """
+    Finds the articles referenced in a text, formatted as 'Điều N'.
+    """
+    return [m.strip().capitalize() for m in ARTICLE_REF_PATTERN.findall(content)]
+
+
+def corpus_version(raw: bytes) -> str:
+    """
+    Returns the version stamp of a corpus file (a short content hash).
+    """
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def iter_articles(data: dict):
+    """
+    Walks the Root -> Law -> Chapter -> Mục -> Tiểu mục -> Điều hierarchy of
+    chung.json the same way data/nhien_migrate.py does.
+
+    Yields:
+        dict: law, chapter, dieu_number, title, content and refs of every Điều.
+    """
+    root = data.get("Luat", {})
+    for law_key, law_data in (root.get("content") or {}).items():
+        if not isinstance(law_data, dict):
+            continue
+
+        chapters = law_data.get("content") or {
+            k: v for k, v in law_data.items() if k != "title"
+        }
+        for chap_key, chap_data in chapters.items():
+            yield from _walk_level(
+                law_key,
+                chap_key,
+                chap_data.get("content")
+                or chap_data.get("muc")
+                or chap_data.get("dieu")
+                or {},
+            )
+
+
+def _walk_level(law, chap, node_dict):
+    for k, v in node_dict.items():
+        if k.startswith("Mục"):
+            yield from _walk_level(law, chap, v.get("tieu_muc") or v.get("dieu") or {})
+
+        elif k.startswith("Tiểu mục"):
+            yield from _walk_level(law, chap, v.get("dieu") or {})
+
+        elif k.startswith("Điều"):
+            dieu_match = re.search(r"\d+", k)
+            content = v.get("content") if isinstance(v, dict) else str(v)
+            yield {
+                "law": law,
+                "chapter": chap,
+                "dieu_number": f"Điều {dieu_match.group()}" if dieu_match else k,
+                "title": v.get("title", k),
+                "content": content,
+                "refs": find_article_refs(content),
+            }
+
+
+def load_corpus(path: str | Path) -> tuple[str, list[dict]]:
+    """
+    Loads chung.json and returns its version stamp and flattened articles.
+    """
+    raw = Path(path).read_bytes()
+    return corpus_version(raw), list(iter_articles(json.loads(raw)))
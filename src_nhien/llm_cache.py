@@ -0,0 +1,112 @@
+"""
+Memoization of LLM calls: an LRU cache with TTL, keyed by the prompt hash and
+the model settings, with single-flight coalescing of concurrent identical calls.
+"""
+
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+
+class LLMCache:
+    """
+    LRU + TTL cache of LLM responses.
+
+    Concurrent calls with the same key share one in-flight call instead of each
+    paying for a round trip (double submits from the UI, client retries).
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_tokens = 0
+        self._data = OrderedDict()
+        self._inflight = {}
+
+    @staticmethod
+    def key(prompt, settings):
+        """
+        Hash of the prompt and of the model settings it is sent with.
+        """
+        h = hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        h.update(b"\0")
+        h.update(prompt.encode("utf-8"))
+        return h.hexdigest()
+
+    def _get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _saved(self, prompt, response):
+        # Rough quota estimate: ~4 characters per token, prompt and response
+        self.saved_tokens += (len(prompt) + len(response)) // 4
+
+    async def call(self, prompt, settings, fn):
+        """
+        Returns the cached response of the prompt, or awaits `fn()` once for
+        all the concurrent callers and caches its result.
+        """
+        key = self.key(prompt, settings)
+
+        # 1. Cached response
+        value = self._get(key)
+        if value is not None:
+            self.hits += 1
+            self._saved(prompt, value)
+            return value
+
+        # 2. Identical call already in flight
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            value = await asyncio.shield(task)
+            self._saved(prompt, value)
+            return value
+
+        # 3. New call; shielded so that a cancelled caller does not cancel
+        # the call for the others waiting on it
+        self.misses += 1
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+
+        def done(t):
+            self._inflight.pop(key, None)
+            if not t.cancelled() and t.exception() is None:
+                self._set(key, t.result())
+
+        task.add_done_callback(done)
+        return await asyncio.shield(task)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        calls = self.hits + self.coalesced + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "saved_calls": self.hits + self.coalesced,
+            "saved_tokens": self.saved_tokens,
+            "hit_rate": (self.hits + self.coalesced) / calls if calls else 0.0,
+        }
@@ -0,0 +1,127 @@
+"""
+Long-lived async Gemini client.
+
+The model is configured once per process and called through the async
+generate API, so an LLM round trip never blocks the event loop. A global
+semaphore bounds the number of calls in flight, every call has a timeout and
+rate-limit (429) and server (5xx) errors are retried with jittered backoff.
+"""
+
+import random
+import asyncio
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def is_retryable(exc):
+    """
+    True for timeouts, rate limits and server errors.
+    """
+    if isinstance(exc, (asyncio.TimeoutError, google_exceptions.RetryError)):
+        return True
+    return getattr(exc, "code", None) in RETRYABLE_STATUS_CODES
+
+
+class GeminiClient:
+    """
+    Gemini model shared by every request of the process.
+    """
+
+    def __init__(
+        self,
+        api_key,
+        model_name="gemini-2.0-flash",
+        temperature=0.7,
+        max_concurrency=16,
+        timeout=60,
+        max_retries=3,
+        backoff_base=0.5,
+        backoff_max=8
+    ):
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.temperature = temperature
+        self.model = genai.GenerativeModel(
+            model_name,
+            generation_config=genai.GenerationConfig(temperature=temperature)
+        )
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def settings(self):
+        """
+        Everything besides the prompt that changes the response.
+        """
+        return {"model": self.model_name, "temperature": self.temperature}
+
+    def _backoff(self, attempt):
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _retry(self, attempt, exc):
+        if attempt >= self.max_retries or not is_retryable(exc):
+            raise exc
+        self.retries += 1
+        await asyncio.sleep(self._backoff(attempt))
+
+    async def generate(self, prompt):
+        """
+        Generates the response text of a prompt.
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    async with asyncio.timeout(self.timeout):
+                        response = await self.model.generate_content_async(prompt)
+                return response.text.strip()
+            except Exception as exc:
+                await self._retry(attempt, exc)
+                attempt += 1
+
+    async def stream(self, prompt):
+        """
+        Yields the response text of a prompt chunk by chunk.
+
+        A call is only retried until its first chunk is received; the timeout
+        applies to the wait for every chunk.
+        """
+        attempt = 0
+        while True:
+            received = False
+            try:
+                async with self._semaphore:
+                    async with asyncio.timeout(self.timeout):
+                        response = await self.model.generate_content_async(prompt, stream=True)
+                    chunks = aiter(response)
+                    while True:
+                        try:
+                            async with asyncio.timeout(self.timeout):
+                                chunk = await anext(chunks)
+                        except StopAsyncIteration:
+                            return
+                        received = True
+                        if chunk.text:
+                            yield chunk.text
+            except Exception as exc:
+                if received:
+                    raise
+                await self._retry(attempt, exc)
+                attempt += 1
+
+    def stats(self):
+        return {
+            "model": self.model_name,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.max_concurrency - self._semaphore._value,
+            "retries": self.retries,
+        }
@@ -1,22 +1,83 @@
 import json
 import time
+import logging
 from enum import Enum
+from typing import AsyncIterator
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from llama_index.core.llms import MessageRole
 from extract_data_from_graph import extract_data_from_graph
-from answer_generator import generate_answer
-from query_generator import generate_cypher_query_from_keywords, extract_keywords_with_llm
-from database import LawGraphQuery
-from config import URI
+from answer_generator import generate_answer, generate_answer_stream
+from query_generator import extract_keywords_with_llm
+from graph_backend import get_backend
+from answer_cache import create_answer_cache
+from context_packer import pack_context
+from health import HealthMonitor
+from history import HistoryCompactor
+import metrics
+from LLM_gemini import client, llm_cache, LLM_gemini_cached
+from config import (
+    ANSWER_CACHE_BACKEND,
+    ANSWER_CACHE_PATH,
+    ANSWER_CACHE_MAXSIZE,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_VERSION_CHECK_INTERVAL,
+    CONTEXT_BUDGETS,
+    REFERENCE_DEPTHS,
+    HEALTHCHECK_INTERVAL,
+    HISTORY_KEEP_TURNS,
+    HISTORY_SUMMARY_TOKENS,
+    HISTORY_SUMMARY_CACHE_SIZE,
+    HISTORY_TOKEN_LIMITS,
+    LOG_LEVEL
+)
+
+
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+
+# Probes the application-wide graph backend (get_backend) in the background
+health = HealthMonitor(lambda: get_backend().ping(), interval=HEALTHCHECK_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """
+    Opens the graph backend (one Neo4j driver and connection pool for the
+    whole application), starts the background health check and releases
+    both on shutdown.
+    """
+    get_backend()
+    await health.start()
+    yield
+    await health.stop()
+    await get_backend().close()
+    get_backend.cache_clear()
 
 
 # Initialize FastAPI app
 app = FastAPI(
-    docs_url="/"
+    docs_url="/",
+    lifespan=lifespan
 )
 
-graph_query = LawGraphQuery(URI)
+answer_cache = create_answer_cache(
+    backend=ANSWER_CACHE_BACKEND,
+    path=ANSWER_CACHE_PATH,
+    maxsize=ANSWER_CACHE_MAXSIZE,
+    threshold=ANSWER_CACHE_THRESHOLD
+)
+_corpus_version = {"value": None, "checked_at": float("-inf")}
+
+history_compactor = HistoryCompactor(
+    LLM_gemini_cached,
+    keep_turns=HISTORY_KEEP_TURNS,
+    summary_tokens=HISTORY_SUMMARY_TOKENS,
+    cache_size=HISTORY_SUMMARY_CACHE_SIZE
+)
 
 
 class PlanType(str, Enum):
@@ -37,6 +98,81 @@ class ChatRequest(BaseModel):
     plan_type: PlanType = PlanType.FREE
 
 
+async def retrieve_context(
+    question: str,
+    histories: list[ChatHistoryItem],
+    plan_type: PlanType
+) -> tuple[dict, dict]:
+    """
+    Extracts the keywords, retrieves the matching articles and returns the
+    arguments of generate_answer along with the per-law retrieval timings.
+    """
+    # Generate Cypher query based on the question
+    with metrics.timed_stage("keywords"):
+        keywords = await extract_keywords_with_llm(question)
+        keywords = json.loads(keywords)
+    print("Keywords extracted:", keywords)
+
+    # Extract data from the graph database using the keywords
+    with metrics.timed_stage("retrieval"):
+        results_ds, results_hs, timings = await extract_data_from_graph(
+            keywords, depth=REFERENCE_DEPTHS.get(plan_type.value, 0))
+    logger.info("Retrieval timings: %s", timings)
+
+    # Keep the best articles within the token budget of the plan
+    with metrics.timed_stage("packing"):
+        context, stats = pack_context(
+            {"luat dan su": results_ds, "luat hinh su": results_hs},
+            CONTEXT_BUDGETS.get(plan_type.value, CONTEXT_BUDGETS["free"])
+        )
+    logger.info(
+        "Context packed: %d/%d articles, %d/%d tokens (saved %d)",
+        stats["articles"], stats["articles_found"], stats["tokens_after"],
+        stats["tokens_before"], stats["tokens_before"] - stats["tokens_after"])
+
+    # Format histories as string, older turns summarized
+    with metrics.timed_stage("history"):
+        summary, recent = await history_compactor.compact(
+            histories, HISTORY_TOKEN_LIMITS.get(plan_type.value, HISTORY_TOKEN_LIMITS["free"]))
+    histories_str = "\n".join(
+        ([f"Tóm tắt trước đó: {summary}"] if summary else [])
+        + [f"{item.role}: {item.content}" for item in recent])
+
+    return {
+        "question": question,
+        "histories": histories_str,
+        "results_ds": context["luat dan su"],
+        "results_hs": context["luat hinh su"],
+        "plan_type": str(plan_type.value)
+    }, timings
+
+
+async def corpus_version():
+    """
+    Corpus version stamp, re-read at most every
+    ANSWER_CACHE_VERSION_CHECK_INTERVAL seconds.
+    """
+    now = time.monotonic()
+    if now - _corpus_version["checked_at"] >= ANSWER_CACHE_VERSION_CHECK_INTERVAL:
+        _corpus_version["value"] = await get_backend().corpus_version()
+        _corpus_version["checked_at"] = now
+    return _corpus_version["value"]
+
+
+async def get_cached_answer(question, histories, plan_type):
+    """
+    Answer of an already answered (or near-duplicate) question, if any.
+    """
+    if answer_cache is None:
+        return None
+    return await answer_cache.aget(question, histories, plan_type, await corpus_version())
+
+
+async def cache_answer(question, histories, plan_type, answer):
+    if answer_cache is not None and answer:
+        await answer_cache.aset(question, histories, plan_type, await corpus_version(), answer)
+
+
 # Function to process a question
 async def process_question(
     question: str,
@@ -46,47 +182,99 @@ async def process_question(
     """
     Function to process a question and return an answer.
     """
-    # Initialize the graph database connection
-    if not graph_query.test_connection():
+    # Last state of the background health check, no probe per request
+    if not health.healthy:
         return "Error: Unable to connect to the database."
 
-    # Generate Cypher query based on the question
-    keywords = extract_keywords_with_llm(question)
-    keywords = json.loads(keywords)
-    print("Keywords extracted:", keywords)
-    dan_su_query, hinh_su_query = generate_cypher_query_from_keywords(keywords)
-
-    # Extract data from the graph database using the generated query
-    results_ds, results_hs = extract_data_from_graph(
-        dan_su_query, hinh_su_query)
+    cached = await get_cached_answer(question, histories, plan_type)
+    if cached is not None:
+        return cached
 
-    # Format histories as string
-    histories_str = "\n".join(
-        [f"{item.role}: {item.content}" for item in histories])
+    answer_inputs, _ = await retrieve_context(question, histories, plan_type)
 
     # Generate an answer based on the question and query results
-    answer = generate_answer(
-        question,
-        histories_str,
-        results_ds=str(results_ds),
-        results_hs=str(results_hs),
-        plan_type=str(plan_type.value)
-    )
+    with metrics.timed_stage("generation"):
+        answer = await generate_answer(**answer_inputs)
+    await cache_answer(question, histories, plan_type, answer)
 
     return answer
 
 
+async def stream_question(
+    question: str,
+    histories: list[ChatHistoryItem] = [],
+    plan_type: PlanType = PlanType.FREE
+) -> AsyncIterator[dict]:
+    """
+    Same as process_question, but yields progress events and the answer
+    tokens as the LLM produces them.
+    """
+    if not health.healthy:
+        yield {"type": "error", "error": "Unable to connect to the database."}
+        return
+
+    cached = await get_cached_answer(question, histories, plan_type)
+    if cached is not None:
+        yield {"type": "answer", "content": cached, "cached": True}
+        return
+
+    yield {"type": "status", "stage": "retrieval"}
+    answer_inputs, timings = await retrieve_context(question, histories, plan_type)
+
+    yield {"type": "status", "stage": "generation", "retrieval": timings}
+    chunks = []
+    with metrics.timed_stage("generation"):
+        async for chunk in generate_answer_stream(**answer_inputs):
+            chunks.append(chunk)
+            yield {"type": "token", "content": chunk}
+    await cache_answer(question, histories, plan_type, "".join(chunks))
+
+
+@app.get("/healthcheck")
+async def healthcheck():
+    """
+    Health check endpoint, reporting the last background database check.
+    """
+    return JSONResponse(
+        {"response": "ok" if health.healthy else "unavailable", "database": health.status()},
+        status_code=200 if health.healthy else 503
+    )
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Prometheus metrics: request, stage, LLM and Neo4j latency, LLM calls and
+    tokens per request.
+    """
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Hit/miss counters of the answer, LLM and history summary caches.
+    """
+    return {
+        "answers": await answer_cache.astats() if answer_cache else None,
+        "history": history_compactor.stats(),
+        "llm": llm_cache.stats(),
+        "llm_client": client.stats()
+    }
+
+
 @app.post("/chat")
 async def process_question_endpoint(data: ChatRequest):
     """
     Endpoint to process a question and return an answer.
     """
     _start_time = time.perf_counter()
-    _response = await process_question(
-        question=data.question,
-        histories=data.histories,
-        plan_type=data.plan_type
-    )
+    with metrics.track_request("chat", data.plan_type.value):
+        _response = await process_question(
+            question=data.question,
+            histories=data.histories,
+            plan_type=data.plan_type
+        )
 
     return {
         "response": _response,
@@ -95,6 +283,35 @@ async def process_question_endpoint(data: ChatRequest):
     }
 
 
+async def _sse(events: AsyncIterator[dict], plan_type: PlanType) -> AsyncIterator[str]:
+    """
+    Formats events as server-sent events, ending with a `done` event.
+    """
+    _start_time = time.perf_counter()
+    try:
+        # Timed until the last event, not until the response headers
+        with metrics.track_request("chat_stream", plan_type.value):
+            async for event in events:
+                yield f"data: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+    except Exception as exc:
+        yield f"data: {json.dumps({'type': 'error', 'error': str(exc)}, ensure_ascii=False)}\n\n"
+    done = {"type": "done", "time": time.perf_counter() - _start_time}
+    yield f"data: {json.dumps(done)}\n\n"
+
+
+@app.post("/chat/stream")
+async def stream_question_endpoint(data: ChatRequest):
+    """
+    Endpoint to process a question, streamed as server-sent events.
+    """
+    events = stream_question(
+        question=data.question,
+        histories=data.histories,
+        plan_type=data.plan_type
+    )
+    return StreamingResponse(_sse(events, data.plan_type), media_type="text/event-stream")
+
+
 @app.exception_handler(Exception)
 async def exception_handler(_, exc):
     """Global exception handler."""
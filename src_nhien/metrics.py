@@ -0,0 +1,219 @@
+"""
+Prometheus metrics of the API, exported in the text exposition format on
+/metrics.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from context_packer import estimate_tokens
+
+
+# Seconds, from an index seek to a slow LLM answer
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+CALL_BUCKETS = (0, 1, 2, 3, 4, 5)
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self):
+        """
+        Sample lines of the metric in the exposition format.
+        """
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples()) + "\n"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [
+                f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+                for key, value in sorted(self._values.items())
+            ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name,
+        documentation,
+        labelnames=(),
+        buckets=LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label set: observations of every bucket (not cumulative) and their sum
+        self._counts = {}
+        self._sums = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        idx = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            counts[idx] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the seconds spent in the block, also when it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        lines = []
+        with self._lock:
+            for key, counts in sorted(self._counts.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    le = ("le", _number(bound))
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(self._sums[key])}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+registry = []
+
+
+def render():
+    """
+    Renders all the metrics in the Prometheus text exposition format.
+    """
+    return "".join(metric.render() for metric in registry)
+
+
+REQUEST_SECONDS = Histogram(
+    "legal_request_seconds", "Latency of the chat requests.", ("endpoint", "plan_type", "status"))
+STAGE_SECONDS = Histogram(
+    "legal_stage_seconds", "Latency of the stages of a request.", ("plan_type", "stage"))
+LLM_SECONDS = Histogram(
+    "legal_llm_call_seconds", "Latency of the LLM calls.", ("plan_type", "status"))
+NEO4J_SECONDS = Histogram(
+    "legal_neo4j_query_seconds", "Latency of the Neo4j queries.", ("plan_type", "query"))
+REQUEST_LLM_CALLS = Histogram(
+    "legal_request_llm_calls", "LLM calls per request (cached calls excluded).",
+    ("plan_type",), CALL_BUCKETS)
+REQUEST_TOKENS = Histogram(
+    "legal_request_tokens", "Estimated LLM tokens (prompt + completion) per request.",
+    ("plan_type",), TOKEN_BUCKETS)
+TOKENS = Counter(
+    "legal_llm_tokens_total", "Estimated LLM tokens.", ("plan_type", "kind"))
+
+
+# Plan type of the request being served, read by the nested LLM and query
+# timings, and its usage (LLM calls and tokens) so far
+plan_type_label = ContextVar("plan_type_label", default="none")
+request_usage = ContextVar("request_usage", default=None)
+
+
+@contextmanager
+def track_request(endpoint, plan_type):
+    """
+    Times a chat request and records its LLM calls and tokens, labeled by
+    plan type.
+    """
+    usage = {"llm_calls": 0, "tokens": 0}
+    plan_token = plan_type_label.set(plan_type)
+    usage_token = request_usage.set(usage)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield usage
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start, endpoint=endpoint, plan_type=plan_type, status=status)
+        if usage["llm_calls"]:
+            REQUEST_LLM_CALLS.observe(usage["llm_calls"], plan_type=plan_type)
+            REQUEST_TOKENS.observe(usage["tokens"], plan_type=plan_type)
+        plan_type_label.reset(plan_token)
+        request_usage.reset(usage_token)
+
+
+def timed_stage(stage):
+    """
+    Times a stage (keywords, retrieval, packing, generation) of the current request.
+    """
+    return STAGE_SECONDS.time(plan_type=plan_type_label.get(), stage=stage)
+
+
+def timed_query(name):
+    """
+    Times a Neo4j query of the current request.
+    """
+    return NEO4J_SECONDS.time(plan_type=plan_type_label.get(), query=name)
+
+
+def record_llm_call(seconds, prompt, completion, status="ok"):
+    """
+    Records an LLM call of the current request.
+    """
+    plan_type = plan_type_label.get()
+    prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(completion)
+    LLM_SECONDS.observe(seconds, plan_type=plan_type, status=status)
+    TOKENS.inc(prompt_tokens, plan_type=plan_type, kind="prompt")
+    TOKENS.inc(completion_tokens, plan_type=plan_type, kind="completion")
+    usage = request_usage.get()
+    if usage is not None:
+        usage["llm_calls"] += 1
+        usage["tokens"] += prompt_tokens + completion_tokens
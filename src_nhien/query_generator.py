@@ -1,8 +1,10 @@
-from LLM_gemini import LLM_gemini
+import re
+from LLM_gemini import LLM_gemini_cached
+from config import RETRIEVAL_TOP_K
 
 
 # Hàm sử dụng LLM để trích xuất từ khóa
-def extract_keywords_with_llm(question):
+async def extract_keywords_with_llm(question):
     """
     Sử dụng LLM để trích xuất từ khóa từ câu hỏi và trả về dưới dạng JSON.
     """
@@ -43,41 +45,51 @@ def extract_keywords_with_llm(question):
     """
     # Thay thế {question} bằng câu hỏi thực tế
     prompt = prompt.replace("question", question)
-    # Gọi LLM để lấy phản hồi
-    response = LLM_gemini(prompt)
+    # Gọi LLM để lấy phản hồi (dùng lại kết quả của các câu hỏi giống hệt)
+    response = await LLM_gemini_cached(prompt)
     # Làm sạch đầu ra để loại bỏ các ký tự không mong muốn
     cleaned_output = response.replace("```json", "").replace("```", "").strip()
     return cleaned_output
 
 
-def generate_cypher_query_from_keywords(keywords):
+# Tên full-text index trên (Dieu.title, Dieu.content), do data/schema.py tạo
+FULLTEXT_INDEX = "dieu_fulltext"
+
+KEYWORD_QUERY = """
+CALL db.index.fulltext.queryNodes($index, $search) YIELD node AS d, score
+WHERE d.law = $law
+WITH d, score
+ORDER BY score DESC
+LIMIT $limit
+RETURN d.dieu_number AS number, d.title AS title, d.content AS content, score
+"""
+
+LUCENE_SPECIAL_CHARS = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+
+def build_fulltext_search(keywords):
     """
-    Tạo truy vấn Cypher từ danh sách từ khóa đã phân loại theo Bộ luật Dân sự và Bộ luật Hình sự.
+    Tạo chuỗi truy vấn Lucene: mỗi từ khóa là một cụm từ, ưu tiên khớp ở tiêu đề.
     """
-    civil_keywords = keywords.get("civil_keywords", [])
-    criminal_keywords = keywords.get("criminal_keywords", [])
+    phrases = []
+    for kw in keywords:
+        kw = " ".join(LUCENE_SPECIAL_CHARS.sub(r"\\\1", kw).split())
+        if kw:
+            phrases.append(f'title:"{kw}"^2 OR content:"{kw}"')
+    return " OR ".join(phrases)
 
-    # Tạo điều kiện WHERE cho Bộ luật Dân sự
-    civil_conditions = " OR ".join(
-        [f'toLower(d.title) CONTAINS "{kw}" OR toLower(d.content) CONTAINS "{kw}"' for kw in civil_keywords]
-    )
-    civil_query = f"""
-    MATCH (r:Root {{title: 'Luat Viet nam'}})-[:HAS_LAW]->(l:Law {{key: 'luat dan su'}})-[:HAS_CHAPTER]->(c:Chapter)-[:HAS_DIEU]->(d:Dieu)
-    WHERE {civil_conditions}
-    OPTIONAL MATCH (d)-[:REFERS_TO]->(ref:Dieu)
-    RETURN d.dieu_number, d.title, d.content, collect(ref.dieu_number) AS referenced_articles
-    """ if civil_conditions else ""
 
-    # Tạo điều kiện WHERE cho Bộ luật Hình sự
-    criminal_conditions = " OR ".join(
-        [f'toLower(d.title) CONTAINS "{kw}" OR toLower(d.content) CONTAINS "{kw}"' for kw in criminal_keywords]
-    )
-    criminal_query = f"""
-    MATCH (r:Root {{title: 'Luat Viet nam'}})-[:HAS_LAW]->(l:Law {{key: 'luat hinh su'}})-[:HAS_CHAPTER]->(c:Chapter)-[:HAS_DIEU]->(d:Dieu)
-    WHERE {criminal_conditions}
-    OPTIONAL MATCH (d)-[:REFERS_TO]->(ref:Dieu)
-    RETURN d.dieu_number, d.title, d.content, collect(ref.dieu_number) AS referenced_articles
-    """ if criminal_conditions else ""
-
-    # Kết hợp các truy vấn bằng UNION
-    return civil_query, criminal_query,
+def build_keyword_query(law_key, keywords, limit=RETRIEVAL_TOP_K):
+    """
+    Tạo truy vấn full-text (kèm tham số) tìm các Điều của một bộ luật khớp với từ khóa,
+    xếp hạng theo độ liên quan và giới hạn top-k.
+    """
+    search = build_fulltext_search(keywords)
+    if not search:
+        return "", {}
+    return KEYWORD_QUERY, {
+        "index": FULLTEXT_INDEX,
+        "search": search,
+        "law": law_key,
+        "limit": limit,
+    }
@@ -0,0 +1,45 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+
+ROOT = Path(__file__).resolve().parents[1]
+# The first example of ui/main.py
+QUESTION = (
+    "Chồng của tôi đã bỏ nhà đi 15 năm mà không liên lạc với gia đình. Hiện tại, tôi không "
+    "biết chồng của tôi đang ở đâu, làm gì, liệu có còn sống không. Vì vậy, tôi muốn hỏi "
+    "trường hợp như chồng tôi đã được coi là mất tích hay chưa? Tài sản mà vợ chồng tôi đã "
+    "có trước khi anh bỏ nhà đi sẽ được chia như thế nào? Xin cảm ơn!"
+)
+
+
+def load(path):
+    spec = importlib.util.spec_from_file_location(f"answer_cache_{path.parent.name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# The answer cache is duplicated in both apps
+@pytest.fixture(params=["src/agent/answer_cache.py", "src_nhien/answer_cache.py"])
+def cache(request):
+    module = load(ROOT / request.param)
+    return module.AnswerCache(module.MemoryAnswerStore(), threshold=0.85)
+
+
+def test_near_duplicate_hit(cache):
+    cache.set(QUESTION, [], "free", "v1", "mất tích")
+    assert cache.get(QUESTION.replace("Xin cảm ơn!", "Cảm ơn luật sư."), [], "free", "v1") == "mất tích"
+    assert cache.near_hits == 1
+
+
+def test_swapped_legal_term_misses(cache):
+    cache.set(QUESTION, [], "free", "v1", "mất tích")
+    assert cache.get(QUESTION.replace("mất tích", "đã chết"), [], "free", "v1") is None
+
+
+def test_number_and_negation_miss(cache):
+    cache.set("Điều 5 quy định gì về hợp đồng?", [], "free", "v1", "Điều 5")
+    assert cache.get("Điều 6 quy định gì về hợp đồng?", [], "free", "v1") is None
+    assert cache.get("Điều 5 không quy định gì về hợp đồng?", [], "free", "v1") is None
@@ -0,0 +1,57 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+
+ROOT = Path(__file__).resolve().parents[1]
+spec = importlib.util.spec_from_file_location("citations", ROOT / "src/agent/citations.py")
+citations = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(citations)
+
+
+def parse(text):
+    return [(c.article, c.clauses, c.point, c.law) for c in citations.parse_citations(text)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Điều 651 quy định gì?", [(651, (), None, None)]),
+    ("khoản 1 và 2 Điều 30 BLDS", [(30, (1, 2), None, "dân sự")]),
+    ("điểm a khoản 1 Điều 357", [(357, (1,), "a", None)]),
+    ("Điều 650 - 652", [(650, (), None, None), (651, (), None, None), (652, (), None, None)]),
+    ("Điều 1 đến Điều 689", []),
+    ("Điều 20 năm tù", []),
+    ("Điều kiện kết hôn là gì?", []),
+])
+def test_parse_citations(text, expected):
+    assert parse(text) == expected
+
+
+def test_law_named_after_a_list_applies_to_all_its_articles():
+    assert parse("Điều 173, 174 BLHS") == [
+        (173, (), None, "hình sự"), (174, (), None, "hình sự")]
+
+
+def test_law_named_after_a_repeated_keyword_applies_to_its_article_only():
+    found = citations.parse_citations("Điều 651 và Điều 173 BLHS")
+    assert [(c.article, c.law) for c in found] == [(651, None), (173, "hình sự")]
+    assert citations.cited_articles(found, 5) == ["Điều 651"]
+
+
+def test_law_named_before_the_citations():
+    assert parse("Theo Bộ luật Hình sự, Điều 173 và 174") == [
+        (173, (), None, "hình sự"), (174, (), None, "hình sự")]
+
+
+@pytest.mark.parametrize("text, law", [
+    ("theo điều 5 luật Đất đai", "khác"),
+    ("theo điều 5 luật đất đai", "khác"),
+    ("Điều 5 luật dân sự", "dân sự"),
+    ("Luật sư cho hỏi Điều 5 quy định gì?", None),
+    ("Điều 5 thì pháp luật quy định ra sao?", None),
+    ("Điều 5 của bộ luật này", None),
+])
+def test_lowercase_law_names(text, law):
+    found = citations.parse_citations(text)
+    assert [(c.article, c.law) for c in found] == [(5, law)]
+    assert citations.cited_articles(found, 5) == ([] if law == "khác" else ["Điều 5"])
@@ -0,0 +1,36 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+
+ROOT = Path(__file__).resolve().parents[1]
+# schema.py imports the data scripts to render their queries
+sys.path.insert(0, str(ROOT / "data"))
+schema = pytest.importorskip("schema")
+
+# e.g. NEO4J_TEST_URI=bolt://localhost:7687
+URI = os.getenv("NEO4J_TEST_URI")
+
+
+@pytest.fixture(scope="module")
+def session():
+    if not URI:
+        pytest.skip("NEO4J_TEST_URI is not set")
+    db = schema.GraphDatabase.driver(URI)
+    with db.session() as session:
+        yield session
+    db.close()
+
+
+@pytest.mark.parametrize("model", list(schema.MIGRATIONS))
+def test_production_queries_use_indexes(session, model):
+    # Every statement is IF NOT EXISTS: plans are only meaningful with the indexes
+    schema.apply_schema(session, model)
+    assert schema.check_plans(session, model) == []
+
+
+def test_production_queries_are_literals():
+    for model in schema.MIGRATIONS:
+        assert schema.production_queries(model)
@@ -0,0 +1,42 @@
+import asyncio
+import importlib.util
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+spec = importlib.util.spec_from_file_location("cache", ROOT / "src/agent/cache.py")
+cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(cache)
+
+
+def test_positional_and_keyword_calls_share_an_entry():
+    tool_cache = cache.ToolCache()
+    calls = []
+
+    @tool_cache.cached
+    async def get_articles_content(article_names, depth=1):
+        calls.append(article_names)
+        return [{"content": name} for name in article_names]
+
+    async def main():
+        await get_articles_content(["Điều 117"])
+        await get_articles_content(article_names=["Điều 117"])
+        await get_articles_content(["Điều 117"], depth=1)
+
+    asyncio.run(main())
+    assert len(calls) == 1
+
+
+def test_modifying_a_result_leaves_the_cache_intact():
+    tool_cache = cache.ToolCache()
+
+    @tool_cache.cached
+    async def get_chapters():
+        return ["Chương I"]
+
+    async def main():
+        chapters = await get_chapters()
+        chapters += ["Chương II"]
+        return await get_chapters()
+
+    assert asyncio.run(main()) == ["Chương I"]
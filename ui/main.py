@@ -1,7 +1,9 @@
+import json
 import gradio as gr
 import requests
 
 API_URL = "http://localhost:8001/chat"
+STREAM_URL = "http://localhost:8001/chat/stream"
 
 EXAMPLES = [
     "Chồng của tôi đã bỏ nhà đi 15 năm mà không liên lạc với gia đình. Hiện tại, tôi không biết chồng của tôi đang ở đâu, làm gì, liệu có còn sống không. Vì vậy, tôi muốn hỏi trường hợp như chồng tôi đã được coi là mất tích hay chưa? Tài sản mà vợ chồng tôi đã có trước khi anh bỏ nhà đi sẽ được chia như thế nào? Xin cảm ơn!",
@@ -10,16 +12,44 @@ EXAMPLES = [
 ]
 
 
+def iter_events(response):
+    """Yield the JSON events of a server-sent event stream."""
+    for line in response.iter_lines(decode_unicode=True):
+        if line and line.startswith("data: "):
+            yield json.loads(line[len("data: "):])
+
+
 def send_message(message, history):
-    # 1. Request to the API
-    response = requests.post(API_URL, json={
-        "question": message,
-        "histories": history,
-    })
+    # 1. Request to the streaming API
+    try:
+        response = requests.post(STREAM_URL, json={
+            "question": message,
+            "histories": history,
+        }, stream=True)
+    except requests.RequestException:
+        yield "Có lỗi xảy ra khi gửi yêu cầu đến API."
+        return
     if response.status_code != 200:
-        return "Có lỗi xảy ra khi gửi yêu cầu đến API."
+        yield "Có lỗi xảy ra khi gửi yêu cầu đến API."
+        return
 
-    return response.json()["response"]
+    # 2. Render the answer as the tokens arrive
+    answer = ""
+    with response:
+        for event in iter_events(response):
+            if event["type"] == "token":
+                answer += event["content"]
+                yield answer
+            elif event["type"] == "answer":
+                answer = event["content"]
+                yield answer
+            elif event["type"] in ("tool_call", "status") and not answer:
+                yield f"_Đang xử lý: {event.get('tool') or event.get('stage')}..._"
+            elif event["type"] == "error":
+                yield answer + "\n\nCó lỗi xảy ra khi gửi yêu cầu đến API."
+                return
+            elif event["type"] == "done":
+                break
 
 
 demo = gr.ChatInterface(fn=send_message, type="messages",